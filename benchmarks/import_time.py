@@ -0,0 +1,124 @@
+"""
+Import-time benchmark for the CLI entry points.
+
+Runs each target in a fresh interpreter with `python -X importtime`, sums the per-module
+self times, and reports the total plus the slowest modules (by cumulative time). Each
+target is run several times and the median is kept, since the first run also pays disk
+cache misses.
+
+Usage:
+    python benchmarks/import_time.py                 # default targets
+    python benchmarks/import_time.py --runs 7 --top 15
+    python benchmarks/import_time.py --json results.json   # machine-readable, for tracking
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# name -> code run with `python -X importtime -c`
+DEFAULT_TARGETS = {
+    'tts-args': 'import functions.tts.args',
+    'podcast_builder': 'import podcast_builder',
+    'podcast_builder --help': (
+        'import sys; sys.argv = ["podcast_builder.py", "--help"]\n'
+        'import podcast_builder\n'
+        'try:\n'
+        '    podcast_builder.parse_tts_arguments()\n'
+        'except SystemExit:\n'
+        '    pass'
+    ),
+}
+
+# Modules that only the --dev GUI / video paths should load
+HEAVY_MODULES = ('tkinter', 'pygame', 'matplotlib', 'moviepy', 'nltk')
+
+
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` output into {module: (self_us, cumulative_us)}.
+    Lines look like 'import time:       123 |        456 |   package.module'.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue # Header line
+        name = parts[2].strip()
+        modules[name] = (int(parts[0]), int(parts[1]))
+    return modules
+
+
+def run_target(code, python=sys.executable):
+    """Runs code once in a fresh interpreter. Returns (wall_seconds, modules dict)."""
+    started = time.perf_counter()
+    result = subprocess.run([python, '-X', 'importtime', '-c', code], cwd=PROJECT_ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        tail = '\n'.join(result.stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"exit code {result.returncode}:\n{tail}")
+    return wall, parse_importtime(result.stderr)
+
+
+def benchmark(name, code, runs, top):
+    walls, totals, last_modules = [], [], {}
+    for _ in range(runs):
+        wall, modules = run_target(code)
+        walls.append(wall)
+        totals.append(sum(self_us for self_us, _ in modules.values()) / 1e6)
+        last_modules = modules
+    slowest = sorted(last_modules.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    heavy = sorted(m for m in last_modules if m in HEAVY_MODULES)
+    return {
+        'target': name,
+        'runs': runs,
+        'wall_s': statistics.median(walls),
+        'import_s': statistics.median(totals),
+        'modules': len(last_modules),
+        'heavy_modules': heavy,
+        'slowest': [{'module': m, 'self_ms': s / 1000, 'cumulative_ms': c / 1000} for m, (s, c) in slowest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure CLI import time with python -X importtime.')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per target; the median is reported (default: 5).')
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to list per target (default: 10).')
+    parser.add_argument('--target', action='append', choices=list(DEFAULT_TARGETS),
+                        help='Target to measure (repeatable; default: all).')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file.')
+    args = parser.parse_args()
+
+    results = []
+    for name in args.target or list(DEFAULT_TARGETS):
+        try:
+            result = benchmark(name, DEFAULT_TARGETS[name], max(1, args.runs), args.top)
+        except RuntimeError as e:
+            print(f"!! {name}: failed ({e})")
+            continue
+        results.append(result)
+        print(f"\n=== {name} ===")
+        print(f"wall {result['wall_s'] * 1000:.0f} ms | imports {result['import_s'] * 1000:.0f} ms "
+              f"| {result['modules']} modules (median of {result['runs']})")
+        if result['heavy_modules']:
+            print(f"!! GUI/video modules loaded: {', '.join(result['heavy_modules'])}")
+        for entry in result['slowest']:
+            print(f"  {entry['cumulative_ms']:8.1f} ms cumulative  {entry['self_ms']:7.1f} ms self  {entry['module']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+        print(f"\n-> Results written to {args.json}")
+    return 0 if results else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
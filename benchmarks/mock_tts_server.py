@@ -0,0 +1,407 @@
+"""
+Mock TTS server for benchmarking the podcast pipeline without a GPU.
+
+Implements the endpoints the Qwen3 and Orpheus providers (and the legacy
+fetch_audio_segment path) call:
+
+    POST /v1/audio/speech   JSON (Orpheus) or form-encoded (Qwen3) body -> WAV
+    POST /speak             legacy {"text", "voice"} -> WAV
+    GET  /health            Qwen3-style health document
+    GET  /v1/models         OpenAI-style model list (Orpheus health check)
+    GET  /v1/models/status  per-model download status
+    GET  /v1/voices         cloned voices
+    POST /v1/voices         clone a voice (multipart upload) -> {"voice_id": "voice_..."}
+    GET  /stats             request counters, for benchmark reports
+
+Audio is synthetic but speech-like and deterministic: the same (voice, text, speed,
+sample rate) always gives the same bytes, so the TTS cache and the enhancement chain
+behave as they would on real output. Each character of the text gets a slice of the
+line; vowels are voiced (a harmonic series on a drifting pitch contour), consonants
+are noise bursts, and spaces and punctuation are short pauses.
+
+Latency, failures and sample rates are configurable, so the client-side retry, timeout,
+hedging and resampling paths can be exercised. Requests are served by at most
+--max-concurrent synthesis slots at once (default 1, like a single-GPU server); the
+rest queue, and queueing time counts towards their latency.
+
+Usage:
+    python benchmarks/mock_tts_server.py --port 8000
+    python benchmarks/mock_tts_server.py --latency lognormal --latency-base 0.3 \\
+        --latency-per-char 0.004 --tail-prob 0.05 --tail-factor 8 --fail-rate 0.02
+    python benchmarks/mock_tts_server.py --sample-rate 24000 44100   # voices alternate rates
+"""
+import argparse
+import hashlib
+import io
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+DEFAULT_MODELS = ('qwen3-tts-1.7b-customvoice', 'qwen3-tts-1.7b-base')
+LATENCY_DISTRIBUTIONS = ('fixed', 'normal', 'lognormal', 'pareto')
+
+VOWELS = set('aeiouyAEIOUY')
+PAUSES = {',': 0.18, ';': 0.2, ':': 0.2, '.': 0.35, '!': 0.35, '?': 0.35, '-': 0.1}
+
+
+def _seed(*parts):
+    """Stable 64-bit seed from strings (Python's hash() is salted per process)."""
+    digest = hashlib.sha256('|'.join(str(p) for p in parts).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def synthesize(text, voice, speed=1.0, samplerate=24000, seconds_per_char=0.065):
+    """
+    Deterministic speech-like audio for text. Returns float32 mono samples in [-1, 1].
+
+    The voice picks the base pitch and formant weights; the text drives the amplitude
+    envelope and the exact pitch wobble. Duration is len(text) * seconds_per_char / speed
+    plus the punctuation pauses.
+    """
+    voice_rng = np.random.default_rng(_seed('voice', voice))
+    base_f0 = voice_rng.uniform(95.0, 230.0)
+    formants = voice_rng.uniform([450.0, 1200.0], [850.0, 2300.0])
+    rng = np.random.default_rng(_seed('line', voice, text, speed, samplerate))
+
+    char_seconds = seconds_per_char / max(0.25, speed)
+    # Per-character segments: (samples, voiced, noisy)
+    segments = []
+    for ch in text or ' ':
+        if ch in PAUSES:
+            segments.append((int(PAUSES[ch] / max(0.25, speed) * samplerate), 0.0, 0.0))
+        elif ch.isspace():
+            segments.append((int(char_seconds * 0.6 * samplerate), 0.0, 0.0))
+        elif ch in VOWELS:
+            segments.append((int(char_seconds * rng.uniform(1.1, 1.6) * samplerate), rng.uniform(0.7, 1.0), 0.05))
+        elif ch.isalpha():
+            segments.append((int(char_seconds * rng.uniform(0.6, 1.0) * samplerate), rng.uniform(0.2, 0.5),
+                             rng.uniform(0.1, 0.4)))
+        else:
+            segments.append((int(char_seconds * samplerate), 0.3, 0.1))
+    total = max(int(0.3 * samplerate), sum(n for n, _, _ in segments))
+    voiced = np.zeros(total, dtype=np.float32)
+    noisy = np.zeros(total, dtype=np.float32)
+    pos = 0
+    for n, v, z in segments:
+        voiced[pos:pos + n] = v
+        noisy[pos:pos + n] = z
+        pos += n
+
+    # Smooth the step envelopes over ~25 ms so syllables ramp instead of clicking
+    window = max(1, int(0.025 * samplerate))
+    kernel = np.hanning(window + 2)[1:-1].astype(np.float32)
+    kernel /= kernel.sum()
+    voiced = np.convolve(voiced, kernel, mode='same')
+    noisy = np.convolve(noisy, kernel, mode='same')
+
+    # Pitch: slow wobble plus declination towards the end of the line
+    t = np.arange(total, dtype=np.float64) / samplerate
+    duration = total / samplerate
+    wobble = 0.08 * np.sin(2 * np.pi * rng.uniform(0.5, 1.2) * t + rng.uniform(0, 2 * np.pi))
+    f0 = base_f0 * (1.0 + wobble - 0.12 * t / duration)
+    phase = 2 * np.pi * np.cumsum(f0) / samplerate
+
+    harmonics = np.zeros(total, dtype=np.float64)
+    for k in range(1, 16):
+        freq = base_f0 * k
+        if freq >= samplerate / 2:
+            break
+        # Harmonic weight: 1/k roll-off with two formant bumps
+        weight = (1.0 / k) * (1.0 + sum(2.0 * math.exp(-((freq - f) / 250.0) ** 2) for f in formants))
+        harmonics += weight * np.sin(k * phase)
+    harmonics /= np.max(np.abs(harmonics)) or 1.0
+
+    noise = np.diff(rng.standard_normal(total + 1)) # First difference tilts the noise towards sibilance
+    audio = voiced * harmonics + noisy * 0.35 * noise
+    peak = np.max(np.abs(audio)) or 1.0
+    return (0.6 * audio / peak).astype(np.float32)
+
+
+def encode_wav(samples, samplerate):
+    """16-bit PCM mono WAV bytes."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(samplerate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+class MockTTSState:
+    """Configuration, shared randomness and counters for one server."""
+
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed) # Latency and failure draws (not the audio)
+        self.random_lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(args.max_concurrent) if args.max_concurrent > 0 else None
+        self.voices = {} # voice_id -> {'voice_id', 'name', 'created'}
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'ok': 0, 'failed': 0, 'hung': 0, 'dropped': 0, 'disconnected': 0,
+                      'chars': 0, 'audio_seconds': 0.0, 'busy_seconds': 0.0, 'in_flight': 0, 'max_in_flight': 0}
+        self.started = time.time()
+
+    def count(self, **deltas):
+        with self.stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+
+    def draw(self):
+        with self.random_lock:
+            return self.random.random()
+
+    def sample_latency(self, chars):
+        """Seconds one request takes, from the configured distribution."""
+        a = self.args
+        mean = a.latency_base + a.latency_per_char * chars
+        with self.random_lock:
+            r = self.random
+            if a.latency == 'normal':
+                value = r.gauss(mean, a.latency_jitter * mean)
+            elif a.latency == 'lognormal':
+                sigma = max(1e-6, a.latency_jitter)
+                value = mean * r.lognormvariate(-sigma * sigma / 2, sigma) # Mean-preserving
+            elif a.latency == 'pareto':
+                alpha = 1.0 + 1.0 / max(1e-3, a.latency_jitter)
+                value = mean * r.paretovariate(alpha) * (alpha - 1) / alpha # Mean-preserving
+            else:
+                value = mean
+            if a.tail_prob and r.random() < a.tail_prob:
+                value *= a.tail_factor
+        return max(0.0, value)
+
+    def samplerate_for(self, voice):
+        rates = self.args.sample_rate
+        return rates[_seed('rate', voice) % len(rates)]
+
+    def snapshot(self):
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['uptime_seconds'] = time.time() - self.started
+        stats['cloned_voices'] = len(self.voices)
+        return stats
+
+
+class MockTTSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Keep-alive, like the real servers
+    state = None # MockTTSState, set by make_server()
+
+    def log_message(self, format, *args):
+        if self.state.args.verbose:
+            sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _read_fields(self):
+        """Request fields from a JSON or form-encoded body."""
+        body = self._read_body()
+        content_type = self.headers.get('Content-Type', '')
+        if 'json' in content_type:
+            try:
+                return json.loads(body or b'{}')
+            except ValueError:
+                return None
+        return {k: v[-1] for k, v in parse_qs(body.decode('utf-8', 'replace')).items()}
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        models = list(self.state.args.models)
+        if path == '/health':
+            self._send_json(200, {'status': 'healthy', 'models_loaded': models, 'device': 'mock'})
+        elif path == '/v1/models':
+            self._send_json(200, {'object': 'list', 'data': [{'id': m, 'object': 'model'} for m in models + ['orpheus']]})
+        elif path == '/v1/models/status':
+            self._send_json(200, [{'model_id': m, 'downloaded': True, 'loaded': True} for m in models])
+        elif path == '/v1/voices':
+            self._send_json(200, {'voices': list(self.state.voices.values())})
+        elif path == '/stats':
+            self._send_json(200, self.state.snapshot())
+        else:
+            self._send_json(404, {'detail': f'Not found: {path}'})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path == '/v1/voices':
+            self._clone_voice()
+        elif path in ('/v1/audio/speech', '/speak'):
+            fields = self._read_fields()
+            if fields is None:
+                self._send_json(400, {'detail': 'Invalid JSON body'})
+                return
+            try:
+                self._speech(fields)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client went away mid-body, e.g. the losing leg of a hedged request
+                self.close_connection = True
+                self.state.count(disconnected=1)
+        else:
+            self._read_body()
+            self._send_json(404, {'detail': f'Not found: {path}'})
+
+    def _clone_voice(self):
+        body = self._read_body()
+        match = re.search(rb'name="name"\r\n\r\n(.*?)\r\n', body)
+        voice_id = f"voice_{hashlib.sha256(body).hexdigest()[:12]}"
+        self.state.voices[voice_id] = {'voice_id': voice_id,
+                                       'name': match.group(1).decode('utf-8', 'replace') if match else voice_id,
+                                       'created': time.time()}
+        self._send_json(201, {'voice_id': voice_id, 'status': 'created'})
+
+    def _speech(self, fields):
+        state, args = self.state, self.state.args
+        text = str(fields.get('input') or fields.get('text') or '')
+        voice = str(fields.get('voice') or 'default')
+        if not text.strip():
+            self._send_json(422, {'detail': 'input must not be empty'})
+            return
+        try:
+            speed = float(fields.get('speed') or 1.0)
+        except ValueError:
+            speed = 1.0
+        streamed = args.stream or str(fields.get('stream', '')).lower() == 'true'
+        state.count(requests=1, chars=len(text))
+
+        # Failure modes are drawn up front so they are independent of the latency draw
+        roll = state.draw()
+        if roll < args.hang_rate:
+            state.count(hung=1)
+            time.sleep(args.hang_seconds) # Lets the client's timeout fire
+            self._send_json(504, {'detail': 'Mock hang'})
+            return
+        roll -= args.hang_rate
+        failing = roll < args.fail_rate
+        dropping = not failing and roll - args.fail_rate < args.drop_rate
+
+        latency = state.sample_latency(len(text))
+        started = time.perf_counter()
+        if state.slots:
+            state.slots.acquire()
+        try:
+            state.count(in_flight=1)
+            if failing:
+                time.sleep(min(latency, args.latency_base))
+                state.count(failed=1)
+                self._send_json(500, {'detail': 'Mock synthesis failure'})
+                return
+            samplerate = state.samplerate_for(voice)
+            audio = synthesize(text, voice, speed, samplerate)
+            body = encode_wav(audio, samplerate)
+            remaining = latency - (time.perf_counter() - started)
+            if not streamed:
+                time.sleep(max(0.0, remaining))
+            self.send_response(200)
+            self.send_header('Content-Type', 'audio/wav')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            sent = body[:len(body) // 2] if dropping else body
+            if streamed:
+                # Header after a quarter of the latency, then the body spread over the rest
+                time.sleep(max(0.0, remaining * 0.25))
+                chunks = max(1, args.stream_chunks)
+                chunk_size = -(-len(body) // chunks)
+                for i in range(0, len(sent), chunk_size):
+                    self.wfile.write(sent[i:i + chunk_size])
+                    self.wfile.flush()
+                    time.sleep(max(0.0, remaining * 0.75 / chunks))
+            else:
+                self.wfile.write(sent)
+            if dropping:
+                # Content-Length promised the whole body; closing now looks like a dropped connection
+                self.wfile.flush()
+                self.close_connection = True
+                state.count(dropped=1)
+                return
+            state.count(ok=1, audio_seconds=len(audio) / samplerate)
+        finally:
+            state.count(in_flight=-1, busy_seconds=time.perf_counter() - started)
+            if state.slots:
+                state.slots.release()
+
+
+def make_server(args):
+    """Creates (not starts) the HTTP server for parsed args. Bind port 0 for a free port."""
+    state = MockTTSState(args)
+    handler = type('BoundMockTTSHandler', (MockTTSHandler,), {'state': state})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Mock Qwen3/Orpheus-compatible TTS server with synthetic audio.')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1).')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000; 0 picks a free one).')
+    parser.add_argument('--sample-rate', type=int, nargs='+', default=[24000],
+                        help='Output sample rate(s). With several, each voice always gets the same one of them '
+                             '(default: 24000).')
+    parser.add_argument('--latency', choices=LATENCY_DISTRIBUTIONS, default='lognormal',
+                        help='Latency distribution (default: lognormal). All are scaled to the mean below.')
+    parser.add_argument('--latency-base', type=float, default=0.2,
+                        help='Mean fixed latency per request in seconds (default: 0.2).')
+    parser.add_argument('--latency-per-char', type=float, default=0.002,
+                        help='Mean extra latency per input character in seconds (default: 0.002).')
+    parser.add_argument('--latency-jitter', type=float, default=0.3,
+                        help='Spread: relative std for normal, sigma for lognormal; pareto uses alpha = 1 + 1/jitter '
+                             '(default: 0.3).')
+    parser.add_argument('--tail-prob', type=float, default=0.0,
+                        help='Probability that a request is a straggler (default: 0).')
+    parser.add_argument('--tail-factor', type=float, default=10.0,
+                        help='Latency multiplier for stragglers (default: 10).')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 500.')
+    parser.add_argument('--drop-rate', type=float, default=0.0,
+                        help='Fraction of requests whose connection is closed halfway through the body.')
+    parser.add_argument('--hang-rate', type=float, default=0.0,
+                        help='Fraction of requests that stall for --hang-seconds (to exercise client timeouts).')
+    parser.add_argument('--hang-seconds', type=float, default=600.0, help='Stall length for --hang-rate (default: 600).')
+    parser.add_argument('--max-concurrent', type=int, default=1,
+                        help='Requests synthesized at once; others queue (default: 1, like one GPU; 0 = unlimited).')
+    parser.add_argument('--stream', action='store_true',
+                        help='Always stream bodies in chunks (clients can also ask with stream=true).')
+    parser.add_argument('--stream-chunks', type=int, default=8, help='Chunks per streamed body (default: 8).')
+    parser.add_argument('--models', nargs='+', default=list(DEFAULT_MODELS),
+                        help='Model ids reported as loaded (default: the Qwen3 models).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for latency and failure draws (default: 0).')
+    parser.add_argument('--verbose', action='store_true', help='Log every request to stderr.')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    server = make_server(args)
+    host, port = server.server_address[:2]
+    print(f"-> Mock TTS server listening on http://{host}:{port} "
+          f"(latency {args.latency}, {args.latency_base}s + {args.latency_per_char * 1000:g} ms/char, "
+          f"sample rate(s) {', '.join(map(str, args.sample_rate))} Hz)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
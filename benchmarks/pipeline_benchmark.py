@@ -0,0 +1,208 @@
+"""
+End-to-end throughput benchmark for podcast_builder against the mock TTS server.
+
+Starts benchmarks/mock_tts_server.py on a free port, writes a synthetic Host/Guest
+script, runs `podcast_builder.py --script ...` against it (TTS cache off, so every line
+is synthesized), and reports:
+
+    lines/sec         script lines per second of builder wall time
+    real-time factor  builder wall time / seconds of podcast audio produced (< 1 is faster
+                      than real time)
+    stages            busy time per pipeline stage from --stage-timings (fetch, process,
+                      resample, synthesis, concatenate) plus the mock server's counters
+
+Arguments after `--` go to podcast_builder unchanged, so configurations can be compared:
+
+    python benchmarks/pipeline_benchmark.py --lines 60
+    python benchmarks/pipeline_benchmark.py --lines 60 -- --tts-concurrency 4 --audio-workers 2
+    python benchmarks/pipeline_benchmark.py --server-arg=--max-concurrent=4 --server-arg=--tail-prob=0.05 \\
+        -- --tts-concurrency 4
+    python benchmarks/pipeline_benchmark.py --runs 3 --json results.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import requests
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+MOCK_SERVER = os.path.join(PROJECT_ROOT, 'benchmarks', 'mock_tts_server.py')
+
+WORDS = ('the model and a podcast about audio latency with speech from two speakers that talk over '
+         'several topics including servers caches networks pipelines and how fast things can go when '
+         'every stage keeps busy while the next line is already being generated').split()
+
+
+def write_script(path, lines, seed=0, min_words=6, max_words=40):
+    """Deterministic Host/Guest script with varied line lengths. Returns the character count."""
+    rng = random.Random(seed)
+    chars = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+            sentence = ' '.join(words).capitalize()
+            if len(words) > 15: # A mid-line comma for some prosody in the mock audio
+                sentence = sentence.replace(' ', ', ', 1)
+            sentence += rng.choice('.?!')
+            chars += len(sentence)
+            f.write(f"{'Host' if i % 2 == 0 else 'Guest'}: {sentence}\n")
+    return chars
+
+
+def start_mock_server(server_args, timeout=20):
+    """Starts the mock server on a free port. Returns (process, port)."""
+    with_port = ['--port', '0'] if not any(a.startswith('--port') for a in server_args) else []
+    process = subprocess.Popen([sys.executable, MOCK_SERVER, *with_port, *server_args],
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, cwd=PROJECT_ROOT)
+    deadline = time.monotonic() + timeout
+    banner = process.stdout.readline()
+    match = re.search(r'http://[^:]+:(\d+)', banner)
+    if not match:
+        process.kill()
+        raise RuntimeError(f"mock server did not start: {banner.strip() or 'no output'}")
+    port = int(match.group(1))
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process, port
+        except requests.exceptions.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"mock server on port {port} never became healthy")
+
+
+def wav_duration(path):
+    with wave.open(path, 'rb') as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def run_builder(script_path, port, builder_args, timings_path, log_path):
+    """Runs podcast_builder once. Returns (wall_seconds, exit_code, output_wav or None)."""
+    command = [sys.executable, os.path.join(PROJECT_ROOT, 'podcast_builder.py'),
+               '--script', script_path, '--tts-provider', 'qwen3', '--api-host', '127.0.0.1',
+               '--qwen3-port', str(port), '--no-tts-cache', '--stage-timings', timings_path]
+    if '--tts-latency-state' not in builder_args:
+        # The mock's port changes every run; keep its latency entries out of the real state file
+        command += ['--tts-latency-state', os.path.join(os.path.dirname(timings_path), 'tts_latency.json')]
+    command += builder_args
+    started = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        result = subprocess.run(command, cwd=PROJECT_ROOT, stdout=log, stderr=subprocess.STDOUT)
+    wall = time.perf_counter() - started
+    output = None
+    with open(log_path, 'r', encoding='utf-8', errors='replace') as log:
+        for line in log:
+            match = re.match(r'Saving concatenated audio to: (.+\.wav)\s*$', line)
+            if match:
+                output = match.group(1)
+    return wall, result.returncode, output
+
+
+def benchmark_once(args, run_index, server_port, work_dir):
+    script_path = os.path.join(work_dir, f"mock_script_{args.lines}.txt")
+    chars = write_script(script_path, args.lines, seed=args.seed)
+    timings_path = os.path.join(work_dir, f"timings_{run_index}.json")
+    log_path = os.path.join(work_dir, f"builder_{run_index}.log")
+    stats_before = requests.get(f"http://127.0.0.1:{server_port}/stats", timeout=5).json()
+    wall, code, output = run_builder(script_path, server_port, args.builder_args, timings_path, log_path)
+    stats_after = requests.get(f"http://127.0.0.1:{server_port}/stats", timeout=5).json()
+    if code != 0 or not output or not os.path.exists(output):
+        raise RuntimeError(f"podcast_builder exited with {code}; see {log_path}")
+
+    audio_seconds = wav_duration(output)
+    if not args.keep_output:
+        os.remove(output)
+    with open(timings_path, 'r', encoding='utf-8') as f:
+        timings = json.load(f)
+    server = {key: stats_after[key] - stats_before.get(key, 0)
+              for key in ('requests', 'ok', 'failed', 'hung', 'dropped', 'disconnected', 'busy_seconds')}
+    server['max_in_flight'] = stats_after['max_in_flight']
+    return {
+        'lines': args.lines,
+        'chars': chars,
+        'wall_s': wall,
+        'audio_s': audio_seconds,
+        'lines_per_s': args.lines / wall,
+        'rtf': wall / audio_seconds if audio_seconds else None,
+        'stages': timings['stages'],
+        'server': server,
+        'log': log_path,
+    }
+
+
+def print_result(result):
+    print(f"wall {result['wall_s']:.2f}s | audio {result['audio_s']:.1f}s | "
+          f"{result['lines_per_s']:.2f} lines/s | RTF {result['rtf']:.3f}")
+    for name, entry in result['stages'].items():
+        share = 100.0 * entry['seconds'] / result['wall_s']
+        print(f"  {name:<12} {entry['seconds']:8.2f}s busy ({share:5.1f}% of wall) "
+              f"over {entry['calls']} call(s), mean {entry['seconds'] / entry['calls']:.3f}s")
+    server = result['server']
+    print(f"  server: {server['requests']} request(s), {server['ok']} ok, {server['failed']} failed, "
+          f"{server['dropped']} dropped, {server['hung']} hung, {server['disconnected']} abandoned by the client, "
+          f"{server['busy_seconds']:.2f}s busy, max {server['max_in_flight']} in flight")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark podcast_builder end to end against the mock TTS server.',
+        epilog='Arguments after -- are passed to podcast_builder.py.')
+    parser.add_argument('--lines', type=int, default=40, help='Script lines to synthesize (default: 40).')
+    parser.add_argument('--runs', type=int, default=1, help='Builder runs; medians are reported (default: 1).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the generated script (default: 0).')
+    parser.add_argument('--server-arg', action='append', default=[],
+                        help='Argument for mock_tts_server.py (repeatable), e.g. --server-arg=--fail-rate=0.05.')
+    parser.add_argument('--keep-output', action='store_true', help='Keep the generated podcast WAV(s).')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file.')
+    argv = sys.argv[1:]
+    builder_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, builder_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+    args.builder_args = builder_args
+
+    server_process, port = start_mock_server(args.server_arg)
+    print(f"-> Mock TTS server on port {port}; podcast_builder args: {' '.join(builder_args) or '(defaults)'}")
+    results = []
+    work_dir = tempfile.mkdtemp(prefix='pipeline_benchmark_')
+    try:
+        for run_index in range(max(1, args.runs)):
+            print(f"\n=== Run {run_index + 1}/{max(1, args.runs)}: {args.lines} lines ===")
+            try:
+                result = benchmark_once(args, run_index, port, work_dir)
+            except RuntimeError as e:
+                print(f"!! {e}")
+                return 1
+            results.append(result)
+            print_result(result)
+    finally:
+        server_process.terminate()
+        try:
+            server_process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            server_process.kill()
+
+    if len(results) > 1:
+        print(f"\n=== Median of {len(results)} runs ===")
+        print(f"{statistics.median(r['lines_per_s'] for r in results):.2f} lines/s | "
+              f"RTF {statistics.median(r['rtf'] for r in results):.3f}")
+    print(f"\n-> Builder logs and stage timings in {work_dir}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'builder_args': builder_args,
+                       'server_args': args.server_arg, 'results': results}, f, indent=2)
+        print(f"-> Results written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
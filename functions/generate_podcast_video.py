@@ -15,6 +15,11 @@ import uuid # For unique filenames
 import shutil # For audio copy
 import subprocess # For FFmpeg noise reduction AND concatenation
 import shlex # For safe command string formatting for printing
+import wave # For cheap WAV header duration probes
+import contextlib
+import hashlib # For content-addressed render caches
+import bisect # For nearest-keyframe lookups in render manifests
+from multiprocessing import shared_memory # For zero-copy decoded images shared with workers
 # Removed soundfile and noisereduce imports as they weren't used in v3's active code path
 
 # Override print function to force immediate flushing for real-time output
@@ -32,6 +37,20 @@ TEXT_FONTSIZE = 24
 TEXT_COLOR = 'white'
 TEXT_BG_COLOR = 'black' # Optional background for text
 FADE_DURATION = 1.0 # Seconds for fade in/out (updated by args)
+RENDER_ENGINES = ['moviepy', 'ffmpeg'] # Segment render engines selectable via --engine
+SEGMENT_AUDIO_RATE = 44100 # Matches MoviePy's default audio fps so both engines concat identically
+DEFAULT_INTRO_OUTRO_DURATION = 5.0 # Used when intro/outro music is missing or unreadable
+DRAFT_PRESET = 'ultrafast' # Encoder settings for --draft previews
+DRAFT_CRF = 32
+MASTER_AUDIO_CHUNK_SIZE = 200 # Max audio inputs per FFmpeg process when building the single-pass master WAV
+
+# --- Cache Locations ---
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DEFAULT_COMPOSITE_CACHE_DIR = os.path.join(PROJECT_ROOT, 'outputs', 'cache', 'composites')
+COMPOSITE_CACHE_VERSION = 1 # Bump when the compositing logic changes to invalidate old frames
+SEGMENT_CACHE_VERSION = 1 # Bump when segment rendering changes to invalidate cached segment MP4s
+KEYFRAME_SNAP_WINDOW = 0.25 # Max seconds between a segment's laid-out start and the keyframe recorded for it
+VOICE_SETTINGS_DIR = os.path.join(PROJECT_ROOT, 'settings', 'voices') # Per-voice YAML, incl. optional video_audio_filter
 
 # --- Helper Functions ---
 # (Helper functions resize_image_with_pil, create_image_clip, create_character_clip remain unchanged)
@@ -47,6 +66,9 @@ def resize_image_with_pil(image_path, target_size, method=Image.Resampling.LANCZ
 
 def create_image_clip(image_path, duration, screen_size):
     """Creates an ImageClip, resizing using PIL LANCZOS to fit screen_size."""
+    shared_array = _SHARED_IMAGES.get(('bg', os.path.abspath(image_path), tuple(screen_size)))
+    if shared_array is not None:
+        return ImageClip(shared_array, duration=duration).set_position('center')
     try:
         img = Image.open(image_path)
         original_size = img.size
@@ -64,6 +86,9 @@ def create_image_clip(image_path, duration, screen_size):
 
 def create_character_clip(image_path, duration, screen_size, position):
     """Creates a scaled and positioned ImageClip for a character using PIL LANCZOS."""
+    shared_array = _SHARED_IMAGES.get(('char', os.path.abspath(image_path), CHARACTER_SCALE))
+    if shared_array is not None:
+        return ImageClip(shared_array, duration=duration, transparent=True).set_position(position)
     try:
         img = Image.open(image_path)
         original_size = img.size
@@ -80,6 +105,926 @@ def create_character_clip(image_path, duration, screen_size, position):
         print(f"Error creating character clip for {image_path}: {e}")
         return None
 
+# --- Shared-Memory Decoded Images ---
+_SHARED_IMAGES = {} # (kind, abspath, size/scale) -> read-only array mapped from shared memory (worker side)
+_SHARED_IMAGE_HANDLES = [] # Keeps the worker's SharedMemory mappings alive for the life of the process
+
+def decode_image_for_clip(image_path, kind, screen_size):
+    """Decodes an image exactly as create_image_clip ('bg') or create_character_clip ('char') would."""
+    with Image.open(image_path) as img:
+        if kind == 'bg':
+            img = img.copy()
+            if img.width > screen_size[0] or img.height > screen_size[1]:
+                img.thumbnail(screen_size, Image.Resampling.LANCZOS)
+            return np.array(img)
+        new_size = tuple(int(dim * CHARACTER_SCALE) for dim in img.size)
+        return np.array(img.resize(new_size, Image.Resampling.LANCZOS))
+
+def share_decoded_images(tasks, screen_size):
+    """
+    Decodes every unique image the tasks will use once, in the parent, into
+    multiprocessing.shared_memory blocks. Returns (blocks, descriptors): the parent keeps
+    the blocks (and releases them after the pool), workers attach via the descriptors.
+    """
+    wanted = {}
+    for task in tasks:
+        bg_path, host_path, guest_path = segment_visual_layers(task)
+        if bg_path and os.path.exists(bg_path):
+            wanted[('bg', os.path.abspath(bg_path), tuple(screen_size))] = bg_path
+        for char_path in (host_path, guest_path):
+            if char_path and os.path.exists(char_path):
+                wanted[('char', os.path.abspath(char_path), CHARACTER_SCALE)] = char_path
+
+    blocks, descriptors = [], []
+    for key, image_path in wanted.items():
+        try:
+            array = decode_image_for_clip(image_path, key[0], screen_size)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        except Exception as e:
+            print(f"  Warning: Could not share decoded image {os.path.basename(image_path)}: {e}. Workers will decode it themselves.")
+            continue
+        blocks.append(block)
+        descriptors.append((key, block.name, array.shape, array.dtype.str))
+    return blocks, descriptors
+
+def release_shared_images(blocks):
+    """Closes and unlinks the parent's shared image blocks once the pool has finished."""
+    for block in blocks:
+        try:
+            block.close()
+            block.unlink()
+        except Exception as e:
+            print(f"  Warn: Could not release shared image block {block.name}: {e}")
+
+def init_shared_image_worker(descriptors, character_scale):
+    """
+    Pool initializer: maps the parent's decoded images as read-only arrays (no decode, no copy).
+    Pool workers report to the parent's resource tracker (fork shares it, spawn and forkserver
+    are handed its fd), so they attach without unregistering: the parent's unlink() clears
+    the registration, and the tracker still removes the blocks if the parent dies.
+    """
+    global CHARACTER_SCALE
+    CHARACTER_SCALE = character_scale
+    for key, name, shape, dtype in descriptors:
+        try:
+            block = shared_memory.SharedMemory(name=name)
+        except Exception as e:
+            print(f"  [Worker {os.getpid()}] Warning: Could not attach shared image {name}: {e}")
+            continue
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        _SHARED_IMAGE_HANDLES.append(block)
+        _SHARED_IMAGES[key] = array
+
+# --- Composite Layer Cache ---
+_file_digests = {} # (path, size, mtime) -> sha256 hex, so each image is hashed once per run
+
+def file_digest(path):
+    """Returns the sha256 hex digest of a file's contents (memoised on path/size/mtime)."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _file_digests.get(memo_key)
+    if digest is None:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        _file_digests[memo_key] = digest
+    return digest
+
+def _existing_path(path):
+    """Returns path if it points to an existing file, else None (workers treat missing art as absent)."""
+    return path if path and os.path.exists(path) else None
+
+def composite_cache_key(bg_path, host_path, guest_path, character_scale, screen_size):
+    """Content-addressed key for one flattened (background, host, guest) frame."""
+    parts = [f"v{COMPOSITE_CACHE_VERSION}", f"{screen_size[0]}x{screen_size[1]}", f"scale={character_scale}"]
+    for role, path in (('bg', bg_path), ('host', host_path), ('guest', guest_path)):
+        parts.append(f"{role}={file_digest(path) if path else 'none'}")
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+def render_composite_frame(bg_path, host_path, guest_path, screen_size, output_path, character_scale=None):
+    """
+    Flattens background + host + guest into one RGB frame of screen_size, using the same
+    placement rules as the per-segment clips (background shrunk to fit and centred,
+    characters scaled with LANCZOS and pinned bottom-left / bottom-right).
+    Writes atomically so concurrent runs never see a half-written PNG.
+    """
+    scale = CHARACTER_SCALE if character_scale is None else character_scale
+    canvas = Image.new('RGB', screen_size, (0, 0, 0))
+    if bg_path:
+        with Image.open(bg_path) as bg_img:
+            bg = bg_img.convert('RGB')
+            if bg.width > screen_size[0] or bg.height > screen_size[1]:
+                bg.thumbnail(screen_size, Image.Resampling.LANCZOS)
+            canvas.paste(bg, ((screen_size[0] - bg.width) // 2, (screen_size[1] - bg.height) // 2))
+    for char_path, align in ((host_path, 'left'), (guest_path, 'right')):
+        if not char_path:
+            continue
+        with Image.open(char_path) as char_img:
+            char = char_img.convert('RGBA')
+            new_size = tuple(int(dim * scale) for dim in char.size)
+            char = char.resize(new_size, Image.Resampling.LANCZOS)
+            x = 0 if align == 'left' else screen_size[0] - char.width
+            canvas.paste(char, (x, screen_size[1] - char.height), char)
+
+    tmp_path = f"{output_path}.{os.getpid()}.{uuid.uuid4().hex}.tmp.png"
+    canvas.save(tmp_path, format='PNG')
+    os.replace(tmp_path, output_path)
+    return output_path
+
+def prepare_composite_frames(tasks, screen_size, cache_dir, character_scale=None):
+    """
+    Pre-pass run once in main(): composites every unique (bg, host, guest) combination
+    into a cached frame and stores its path on each task as 'composite_image'.
+    Workers then load a single image instead of resizing/compositing three per segment.
+    Returns (unique_combinations, cache_hits, frames_built).
+    """
+    scale = CHARACTER_SCALE if character_scale is None else character_scale
+    os.makedirs(cache_dir, exist_ok=True)
+    frames_by_combo = {}
+    hits = built = 0
+    for task in tasks:
+        combo = (_existing_path(task.get('bg_image')), _existing_path(task.get('host_image')), _existing_path(task.get('guest_image')))
+        if combo not in frames_by_combo:
+            frame_path = None
+            try:
+                key = composite_cache_key(*combo, scale, screen_size)
+                frame_path = os.path.join(cache_dir, f"{key}.png")
+                if os.path.exists(frame_path):
+                    hits += 1
+                else:
+                    render_composite_frame(*combo, screen_size, frame_path, character_scale=scale)
+                    built += 1
+            except Exception as e:
+                print(f"  Warning: Could not build composite frame for {[os.path.basename(p) if p else None for p in combo]}: {e}. Segments will composite layers individually.")
+                frame_path = None
+            frames_by_combo[combo] = frame_path
+        if frames_by_combo[combo]:
+            task['composite_image'] = frames_by_combo[combo]
+    return len(frames_by_combo), hits, built
+
+def segment_visual_layers(task_data):
+    """Returns (bg, host, guest) image paths for a task, collapsing to the cached composite when present."""
+    composite_path = task_data.get('composite_image')
+    if composite_path and os.path.exists(composite_path):
+        return composite_path, None, None
+    return task_data.get('bg_image'), task_data.get('host_image'), task_data.get('guest_image')
+
+_video_audio_filters = {} # speaker -> configured video_audio_filter (or None), read once per process
+
+def video_audio_filter_for(speaker):
+    """
+    Returns the `video_audio_filter` FFmpeg chain configured for a voice in
+    settings/voices/<voice>.yaml (default.yaml if the voice has no file), or None.
+    """
+    if speaker in _video_audio_filters:
+        return _video_audio_filters[speaker]
+    audio_filter = None
+    voice_path = os.path.join(VOICE_SETTINGS_DIR, f"{speaker}.yaml") if speaker else None
+    config_path = voice_path if voice_path and os.path.exists(voice_path) else os.path.join(VOICE_SETTINGS_DIR, 'default.yaml')
+    if os.path.exists(config_path):
+        try:
+            import yaml
+            with open(config_path, 'r', encoding='utf-8') as f:
+                voice_config = yaml.safe_load(f) or {}
+            audio_filter = voice_config.get('video_audio_filter') or None
+        except Exception as e:
+            print(f"  Warning: Could not read video_audio_filter from {os.path.basename(config_path)}: {e}")
+    _video_audio_filters[speaker] = audio_filter
+    return audio_filter
+
+def effective_video_audio_filter(task_data):
+    """
+    The video-side audio chain that will run for a task: None when the TTS stage already
+    enhanced the audio (segment JSON carries 'audio_enhancement'), else the voice's configured chain.
+    """
+    audio_path = task_data.get('audio_path')
+    if task_data.get('type') != 'speech' or not audio_path or not audio_path.lower().endswith('.wav'):
+        return None
+    if task_data.get('audio_enhancement'):
+        return None
+    return video_audio_filter_for(task_data.get('speaker'))
+
+def apply_video_audio_filter(task_data, work_dir):
+    """
+    Runs the voice's video-side audio chain on a speech segment, skipping audio the TTS
+    stage already enhanced. Output is cached in work_dir by audio content + chain hash.
+    Returns the path of the processed audio, or the original path if skipped or failed.
+    """
+    original_audio_path = task_data.get('audio_path')
+    speaker = task_data.get('speaker')
+    enhancement = task_data.get('audio_enhancement')
+    if enhancement:
+        chain_hash = enhancement.get('sha256', '') if isinstance(enhancement, dict) else str(enhancement)
+        print(f"  Audio for segment {task_data['index']+1} ({speaker}) already enhanced by TTS stage (chain {chain_hash[:12]}). Skipping video-side processing.")
+        return original_audio_path
+    audio_filter = effective_video_audio_filter(task_data)
+    if not audio_filter:
+        return original_audio_path
+
+    cache_key = hashlib.sha256(f"{file_digest(original_audio_path)}|{audio_filter}".encode('utf-8')).hexdigest()
+    cache_dir = os.path.join(work_dir, 'video_audio_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    cleaned_audio_filepath = os.path.join(cache_dir, f"{cache_key}.wav")
+    if os.path.exists(cleaned_audio_filepath) and os.path.getsize(cleaned_audio_filepath) > 0:
+        print(f"  Reusing processed {speaker} audio for {os.path.basename(original_audio_path)} ({cache_key[:12]}).")
+        return cleaned_audio_filepath
+
+    tmp_path = f"{cleaned_audio_filepath}.{os.getpid()}.tmp.wav"
+    try:
+        print(f"  Applying video_audio_filter for {speaker}: {os.path.basename(original_audio_path)}...")
+        ffmpeg_command = ['ffmpeg', '-i', original_audio_path, '-af', audio_filter, '-y', tmp_path]
+        print(f"    Attempting to run FFmpeg command: {' '.join(shlex.quote(arg) for arg in ffmpeg_command)}")
+        result = subprocess.run(ffmpeg_command, capture_output=True, text=True, check=False)
+        if result.returncode == 0 and os.path.exists(tmp_path) and os.path.getsize(tmp_path) > 0:
+            os.replace(tmp_path, cleaned_audio_filepath)
+            print(f"    -> SUCCESS: Saved processed audio to: {os.path.basename(cleaned_audio_filepath)}")
+            return cleaned_audio_filepath
+        print(f"  Warning: FFmpeg processing failed or produced empty file for {original_audio_path}. Using original.")
+        if result.stderr: print(f"    FFmpeg stderr:\n{result.stderr.strip()}")
+    except FileNotFoundError:
+        print(f"  Error: 'ffmpeg' command not found. Using original audio.")
+    except Exception as ffmpeg_e:
+        print(f"  Warning: Error running FFmpeg processing for {original_audio_path}: {ffmpeg_e}. Using original.")
+    if os.path.exists(tmp_path):
+        try: os.remove(tmp_path)
+        except OSError: pass
+    return original_audio_path
+
+def probe_audio_duration(audio_path):
+    """
+    Returns the duration of an audio file in seconds, or 0.0 if it cannot be determined.
+    Reads only the header for PCM WAVs; falls back to soundfile, then ffprobe, for anything else.
+    """
+    if not audio_path or not os.path.exists(audio_path):
+        return 0.0
+    if audio_path.lower().endswith('.wav'):
+        try:
+            with contextlib.closing(wave.open(audio_path, 'rb')) as wav_file:
+                rate = wav_file.getframerate()
+                if rate > 0:
+                    return wav_file.getnframes() / float(rate)
+        except (wave.Error, EOFError, OSError):
+            pass # e.g. float WAVs, which the wave module does not parse
+        try:
+            import soundfile as sf
+            info = sf.info(audio_path)
+            if info.samplerate > 0:
+                return info.frames / float(info.samplerate)
+        except Exception:
+            pass
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', audio_path],
+            capture_output=True, text=True, check=False
+        )
+        if result.returncode == 0 and result.stdout.strip():
+            return float(result.stdout.strip())
+    except (FileNotFoundError, ValueError):
+        pass
+    except Exception as e:
+        print(f"  Warning: Could not probe duration of {audio_path}: {e}")
+    return 0.0
+
+def build_ffmpeg_segment_command(task_data, screen_size, args, audio_path, duration, output_path):
+    """
+    Builds a single FFmpeg command that renders one static segment: looped background,
+    host/guest overlays and the segment audio, encoded with -tune stillimage.
+    Output matches the MoviePy engine (libx264/yuv420p video, 44.1kHz stereo PCM audio)
+    so the final `-c:v copy` concat step works unchanged.
+    """
+    segment_type = task_data['type']
+    bg_path, host_path, guest_path = segment_visual_layers(task_data)
+    width, height = screen_size
+    fps = args.fps if args else 24
+    fade_duration = min(getattr(args, 'video_fade', FADE_DURATION) if args else FADE_DURATION, duration)
+
+    command = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error']
+    filters = []
+    input_idx = 0
+
+    # Background (or black canvas): only ever shrunk to fit, then centred, like create_image_clip
+    if bg_path and os.path.exists(bg_path):
+        command += ['-loop', '1', '-framerate', str(fps), '-i', bg_path]
+        filters.append(f"[{input_idx}:v]scale=w='min(iw,{width})':h='min(ih,{height})':force_original_aspect_ratio=decrease:flags=lanczos,"
+                       f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black,setsar=1[base0]")
+    else:
+        command += ['-f', 'lavfi', '-i', f"color=c=black:s={width}x{height}:r={fps}"]
+        filters.append(f"[{input_idx}:v]setsar=1[base0]")
+    input_idx += 1
+    current_base = 'base0'
+
+    # Characters: scaled by CHARACTER_SCALE and pinned bottom-left / bottom-right
+    for char_path, x_expr in ((host_path, '0'), (guest_path, 'W-w')):
+        if char_path and os.path.exists(char_path):
+            command += ['-loop', '1', '-framerate', str(fps), '-i', char_path]
+            char_label = f"char{input_idx}"
+            next_base = f"base{input_idx}"
+            filters.append(f"[{input_idx}:v]format=rgba,scale=w='trunc(iw*{CHARACTER_SCALE})':h='trunc(ih*{CHARACTER_SCALE})':flags=lanczos[{char_label}]")
+            filters.append(f"[{current_base}][{char_label}]overlay=x={x_expr}:y=H-h:format=auto[{next_base}]")
+            current_base = next_base
+            input_idx += 1
+
+    video_tail = []
+    if segment_type == 'intro' and fade_duration > 0:
+        video_tail.append(f"fade=t=in:st=0:d={fade_duration:.3f}")
+    elif segment_type == 'outro' and fade_duration > 0:
+        video_tail.append(f"fade=t=out:st={max(duration - fade_duration, 0):.3f}:d={fade_duration:.3f}")
+    video_tail.append('format=yuv420p')
+    filters.append(f"[{current_base}]{','.join(video_tail)}[vout]")
+
+    # Audio: segment audio (with intro/outro music fades), or generated silence
+    audio_idx = input_idx
+    if audio_path and os.path.exists(audio_path):
+        command += ['-i', audio_path]
+        audio_filters = [f"aresample={SEGMENT_AUDIO_RATE}", 'aformat=channel_layouts=stereo']
+        if segment_type == 'intro':
+            fadeout_duration = min(args.audio_fadeout if args else 5.0, duration)
+            if fadeout_duration > 0:
+                audio_filters.append(f"afade=t=out:st={max(duration - fadeout_duration, 0):.3f}:d={fadeout_duration:.3f}")
+        elif segment_type == 'outro':
+            fadein_duration = min(args.audio_fadein if args else 5.0, duration)
+            if fadein_duration > 0:
+                audio_filters.append(f"afade=t=in:st=0:d={fadein_duration:.3f}")
+        filters.append(f"[{audio_idx}:a]{','.join(audio_filters)}[aout]")
+    else:
+        command += ['-f', 'lavfi', '-i', f"anullsrc=r={SEGMENT_AUDIO_RATE}:cl=stereo"]
+        filters.append(f"[{audio_idx}:a]anull[aout]")
+
+    command += [
+        '-filter_complex', ';'.join(filters),
+        '-map', '[vout]', '-map', '[aout]',
+        '-t', f"{duration:.6f}",
+        '-r', str(fps),
+        '-c:v', 'libx264',
+        '-preset', args.intermediate_preset if args else 'medium',
+        '-tune', 'stillimage',
+        '-crf', str(args.intermediate_crf if args else 23),
+        '-threads', str(getattr(args, 'encoder_threads', 1) if args else 1), # Per-worker share of the CPU from the render plan
+        '-c:a', 'pcm_s16le', '-ar', str(SEGMENT_AUDIO_RATE), '-ac', '2',
+        output_path
+    ]
+    return command
+
+def resolve_segment_audio(task_data, work_dir):
+    """
+    Returns (audio_path, duration) for a task as the FFmpeg-based renderers use it:
+    speech audio after any video-side audio filter, intro/outro music or (None, default
+    duration) when the music is missing. Returns (None, None) if a speech segment is unusable.
+    """
+    segment_type = task_data['type']
+    audio_path = task_data.get('audio_path')
+
+    if segment_type == 'speech':
+        if not audio_path or not os.path.exists(audio_path):
+            print(f"  Warning (Worker): Original audio file missing or invalid: {audio_path}. Skipping segment.")
+            return None, None
+        audio_path = apply_video_audio_filter(task_data, work_dir)
+        duration = probe_audio_duration(audio_path)
+        if duration <= 0:
+            print(f"  Warning: Audio file {audio_path} has zero or negative duration. Skipping.")
+            return None, None
+    else:
+        clip_type = "Intro" if segment_type == 'intro' else "Outro"
+        duration = probe_audio_duration(audio_path) if audio_path else 0.0
+        if duration <= 0:
+            if audio_path:
+                print(f"  Warning: {clip_type} music {audio_path} has zero duration or could not be read. Using default {DEFAULT_INTRO_OUTRO_DURATION}s.")
+            else:
+                print(f"  Info: No music path provided for {clip_type}. Using default duration {DEFAULT_INTRO_OUTRO_DURATION}s.")
+            audio_path = None
+            duration = DEFAULT_INTRO_OUTRO_DURATION
+    return audio_path, duration
+
+def render_segment_with_ffmpeg(task_data, screen_size, args, temp_dir, work_dir):
+    """
+    Renders a speech/intro/outro segment with one FFmpeg process instead of MoviePy.
+    No frame ever passes through Python. Returns the segment path, or None if it failed.
+    """
+    segment_type = task_data['type']
+    segment_idx = task_data['index']
+    audio_path, duration = resolve_segment_audio(task_data, work_dir)
+    if duration is None:
+        return None
+
+    temp_filename = f"segment_{segment_idx+1:04d}_{segment_type}_{uuid.uuid4()}.mp4" # Padded index for sorting
+    temp_video_path = os.path.join(temp_dir, temp_filename)
+    ffmpeg_command = build_ffmpeg_segment_command(task_data, screen_size, args, audio_path, duration, temp_video_path)
+
+    print(f"  [Worker {os.getpid()}] FFmpeg engine: segment {segment_idx+1} ({segment_type}, {duration:.2f}s)")
+    try:
+        result = subprocess.run(ffmpeg_command, capture_output=True, text=True, check=False)
+    except FileNotFoundError:
+        print("  Error: 'ffmpeg' command not found. Make sure FFmpeg is installed and in your system PATH.")
+        return None
+
+    if result.returncode != 0 or not os.path.exists(temp_video_path) or os.path.getsize(temp_video_path) == 0:
+        print(f"!!! FFmpeg engine failed for segment {segment_idx+1} ({segment_type}), return code {result.returncode}")
+        print(f"    Command: {' '.join(shlex.quote(arg) for arg in ffmpeg_command)}")
+        if result.stderr: print(f"    FFmpeg stderr:\n{result.stderr.strip()}")
+        if os.path.exists(temp_video_path):
+            try: os.remove(temp_video_path)
+            except OSError: pass
+        return None
+    return temp_video_path
+
+
+# --- Single-Pass Episode Render ---
+def _ffconcat_quote(path):
+    """Quotes a path for an FFmpeg concat-demuxer script."""
+    return "'" + path.replace("'", "'\\''") + "'"
+
+def _run_ffmpeg_step(description, command):
+    """Runs one FFmpeg step of the single-pass render. Returns True on success."""
+    print(f"Running FFmpeg ({description}): {' '.join(shlex.quote(arg) for arg in command)}")
+    step_start_time = time.time()
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', errors='replace', check=False)
+    except FileNotFoundError:
+        print("\nERROR: 'ffmpeg' command not found. Make sure FFmpeg is installed and in your system PATH.")
+        return False
+    if result.returncode != 0:
+        print(f"\nERROR: FFmpeg {description} failed with return code {result.returncode}")
+        print("--- FFmpeg stderr ---")
+        print(result.stderr if result.stderr else "<No stderr>")
+        return False
+    print(f"  -> {description} finished in {time.time() - step_start_time:.2f} seconds.")
+    return True
+
+def build_master_audio(entries, args, work_dir, output_path):
+    """
+    Concatenates every segment's audio into one 44.1kHz stereo PCM WAV with a single
+    FFmpeg concat filter. Each entry is trimmed/padded to exactly its sample count so
+    the image timeline (built from the same counts) never drifts. Inputs are processed
+    in chunks of MASTER_AUDIO_CHUNK_SIZE to stay under the open-file limit on very long
+    episodes; the chunk WAVs are then joined with a stream copy.
+    """
+    chunk_paths = []
+    for chunk_start in range(0, len(entries), MASTER_AUDIO_CHUNK_SIZE):
+        chunk = entries[chunk_start:chunk_start + MASTER_AUDIO_CHUNK_SIZE]
+        command = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error']
+        filters = []
+        labels = []
+        input_idx = 0
+        for entry_idx, entry in enumerate(chunk):
+            segment_type = entry['task']['type']
+            duration = entry['duration']
+            chain = [f"aformat=sample_fmts=fltp:sample_rates={SEGMENT_AUDIO_RATE}:channel_layouts=stereo"]
+            if entry['audio_path']:
+                command += ['-i', entry['audio_path']]
+                source = f"[{input_idx}:a]aresample={SEGMENT_AUDIO_RATE}"
+                input_idx += 1
+                if segment_type == 'intro':
+                    fadeout_duration = min(args.audio_fadeout if args else 5.0, duration)
+                    if fadeout_duration > 0:
+                        chain.append(f"afade=t=out:st={max(duration - fadeout_duration, 0):.3f}:d={fadeout_duration:.3f}")
+                elif segment_type == 'outro':
+                    fadein_duration = min(args.audio_fadein if args else 5.0, duration)
+                    if fadein_duration > 0:
+                        chain.append(f"afade=t=in:st=0:d={fadein_duration:.3f}")
+            else:
+                source = f"anullsrc=r={SEGMENT_AUDIO_RATE}:cl=stereo"
+            chain += ['apad', f"atrim=end_sample={entry['samples']}", 'asetpts=N/SR/TB']
+            label = f"a{entry_idx}"
+            filters.append(f"{source},{','.join(chain)}[{label}]")
+            labels.append(f"[{label}]")
+        filters.append(f"{''.join(labels)}concat=n={len(labels)}:v=0:a=1[aout]")
+
+        chunk_number = chunk_start // MASTER_AUDIO_CHUNK_SIZE + 1
+        filter_script_path = os.path.join(work_dir, f"single_pass_audio_{chunk_number:03d}.filter")
+        chunk_path = os.path.join(work_dir, f"single_pass_audio_{chunk_number:03d}.wav")
+        with open(filter_script_path, 'w', encoding='utf-8') as f:
+            f.write(';\n'.join(filters))
+        command += ['-filter_complex_script', filter_script_path, '-map', '[aout]',
+                    '-c:a', 'pcm_s16le', '-ar', str(SEGMENT_AUDIO_RATE), '-ac', '2', chunk_path]
+        ok = _run_ffmpeg_step(f"master audio chunk {chunk_number}", command)
+        if not (args and args.keep_temp_files):
+            try: os.remove(filter_script_path)
+            except OSError: pass
+        if not ok:
+            return False
+        chunk_paths.append(chunk_path)
+
+    if len(chunk_paths) == 1:
+        os.replace(chunk_paths[0], output_path)
+        return True
+
+    list_path = os.path.join(work_dir, "single_pass_audio_chunks.txt")
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for chunk_path in chunk_paths:
+            f.write(f"file {_ffconcat_quote(os.path.abspath(chunk_path))}\n")
+    ok = _run_ffmpeg_step("master audio join", ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+                                                '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', output_path])
+    if not (args and args.keep_temp_files):
+        for path in chunk_paths + [list_path]:
+            try: os.remove(path)
+            except OSError: pass
+    return ok
+
+def write_image_timeline(entries, timeline_path):
+    """
+    Writes an FFmpeg concat-demuxer script that shows each segment's composite frame for
+    exactly its audio duration. The last frame is listed twice because the demuxer
+    ignores the duration of the final entry.
+    """
+    with open(timeline_path, 'w', encoding='utf-8') as f:
+        f.write("ffconcat version 1.0\n")
+        for entry in entries:
+            f.write(f"file {_ffconcat_quote(os.path.abspath(entry['frame']))}\n")
+            f.write(f"duration {entry['samples'] / SEGMENT_AUDIO_RATE:.6f}\n")
+        f.write(f"file {_ffconcat_quote(os.path.abspath(entries[-1]['frame']))}\n")
+
+def render_episode_single_pass(tasks, screen_size, args, work_dir, output_path):
+    """
+    Renders the whole episode without a worker pool or intermediate MP4s: one master WAV,
+    one image timeline of composite frames, and a single libx264/AAC encode.
+    Only valid for static-art episodes (every segment is one still frame).
+    Returns True on success.
+    """
+    fps = args.fps if args else 24
+    fade_setting = getattr(args, 'video_fade', FADE_DURATION) if args else FADE_DURATION
+
+    # Every segment needs a flattened frame; build any the composite pre-pass did not provide
+    missing_frames = [task for task in tasks if not _existing_path(task.get('composite_image'))]
+    if missing_frames:
+        frames_dir = os.path.join(work_dir, 'single_pass_frames')
+        prepare_composite_frames(missing_frames, screen_size, frames_dir)
+
+    print(f"\nResolving audio for {len(tasks)} segments...")
+    entries = []
+    for task in tasks:
+        frame_path = _existing_path(task.get('composite_image'))
+        if not frame_path:
+            print(f"  Skipping segment {task['index']+1} ({task['type']}): no frame could be built.")
+            continue
+        audio_path, duration = resolve_segment_audio(task, work_dir)
+        if duration is None:
+            print(f"  Skipping segment {task['index']+1} ({task['type']}) in single-pass timeline.")
+            continue
+        samples = max(int(round(duration * SEGMENT_AUDIO_RATE)), 1)
+        entries.append({'task': task, 'frame': frame_path, 'audio_path': audio_path,
+                        'duration': duration, 'samples': samples})
+    if not entries:
+        print("Error: No valid segments available for the single-pass render.")
+        return False
+
+    # Video fades for intro/outro, placed on the episode timeline at the segment's offset
+    video_filters = [f"fps={fps}", 'setsar=1']
+    offset = 0.0
+    for entry in entries:
+        segment_duration = entry['samples'] / SEGMENT_AUDIO_RATE
+        fade_duration = min(fade_setting, segment_duration)
+        if fade_duration > 0 and entry['task']['type'] == 'intro':
+            video_filters.append(f"fade=t=in:st={offset:.3f}:d={fade_duration:.3f}:enable='between(t,{offset:.3f},{offset + fade_duration:.3f})'")
+        elif fade_duration > 0 and entry['task']['type'] == 'outro':
+            fade_start = offset + segment_duration - fade_duration
+            video_filters.append(f"fade=t=out:st={fade_start:.3f}:d={fade_duration:.3f}:enable='between(t,{fade_start:.3f},{offset + segment_duration:.3f})'")
+        offset += segment_duration
+    video_filters.append('format=yuv420p')
+    total_duration = offset
+
+    master_audio_path = os.path.join(work_dir, "single_pass_master.wav")
+    timeline_path = os.path.join(work_dir, "single_pass_timeline.ffconcat")
+    try:
+        print(f"\nBuilding master audio track ({len(entries)} segments, {total_duration:.2f}s)...")
+        if not build_master_audio(entries, args, work_dir, master_audio_path):
+            return False
+
+        write_image_timeline(entries, timeline_path)
+        print(f"Image timeline written: {timeline_path} ({len(entries)} frames)")
+
+        ffmpeg_command = [
+            'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+            '-f', 'concat', '-safe', '0', '-i', timeline_path,
+            '-i', master_audio_path,
+            '-filter_complex', f"[0:v]{','.join(video_filters)}[vout]",
+            '-map', '[vout]', '-map', '1:a',
+            '-t', f"{total_duration:.6f}",
+            '-c:v', 'libx264',
+            '-preset', args.intermediate_preset if args else 'medium',
+            '-tune', 'stillimage',
+            '-crf', str(args.intermediate_crf if args else 23),
+            '-c:a', 'aac',
+            '-b:a', args.final_audio_bitrate if args else '192k',
+            '-movflags', '+faststart',
+            output_path
+        ]
+        if not _run_ffmpeg_step("single-pass encode", ffmpeg_command):
+            return False
+        print(f"✅ Video successfully generated: {output_path}")
+        return True
+    finally:
+        if not (args and args.keep_temp_files):
+            for path in (master_audio_path, timeline_path):
+                if os.path.exists(path):
+                    try: os.remove(path)
+                    except OSError as rem_e: print(f"  Warn: Could not remove {path}: {rem_e}")
+
+
+# --- Render Manifest & Patch Splicing ---
+def manifest_path_for(video_path):
+    """Sidecar manifest recording each segment's cache key and position in a final video."""
+    return f"{video_path}.manifest.json"
+
+def probe_video_duration(video_path, container=False):
+    """
+    Duration of the first video stream in seconds (falls back to the container duration), or 0.0.
+    container=True returns the container duration (the longest stream, usually the AAC track).
+    """
+    for entries in (('format=duration',) if container else ('stream=duration', 'format=duration')):
+        command = ['ffprobe', '-v', 'error']
+        if entries.startswith('stream'):
+            command += ['-select_streams', 'v:0']
+        command += ['-show_entries', entries, '-of', 'default=noprint_wrappers=1:nokey=1', video_path]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, check=False)
+            value = result.stdout.strip().splitlines()[0] if result.stdout.strip() else ''
+            if result.returncode == 0 and value and value != 'N/A':
+                return float(value)
+        except (FileNotFoundError, ValueError):
+            pass
+    return 0.0
+
+def probe_keyframe_times(video_path):
+    """Presentation times (seconds, ascending) of the first video stream's keyframes, or [] if ffprobe fails."""
+    command = ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+               '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=False)
+    except FileNotFoundError:
+        return []
+    if result.returncode != 0:
+        return []
+    times = []
+    for line in result.stdout.splitlines():
+        fields = line.strip().split(',')
+        if len(fields) >= 2 and 'K' in fields[1] and fields[0] not in ('', 'N/A'):
+            try: times.append(float(fields[0]))
+            except ValueError: pass
+    return sorted(times)
+
+def nearest_keyframe(keyframes, position):
+    """The keyframe time in the sorted list closest to position, or None if the list is empty."""
+    i = bisect.bisect_left(keyframes, position)
+    candidates = keyframes[max(i - 1, 0):i + 1]
+    return min(candidates, key=lambda t: abs(t - position)) if candidates else None
+
+def align_manifest_entries(entries, video_path):
+    """
+    Moves laid-out manifest entries onto the keyframes of the finished video.
+
+    The concat demuxer does not advance by exactly the probed segment durations and the
+    first frame need not sit at 0, so summed durations drift from where segments really
+    are. Every segment starts on a keyframe, so each start becomes the keyframe nearest
+    the previous start plus that segment's duration, and durations become the gaps
+    between starts. Entries with no keyframe within KEYFRAME_SNAP_WINDOW keep their
+    estimate; --patch refuses to cut at those.
+    """
+    keyframes = probe_keyframe_times(video_path)
+    if not keyframes:
+        print(f"Warning: Could not probe keyframes of {video_path}; manifest positions are estimates and --patch will not reuse them.")
+        return entries
+    aligned, position = [], keyframes[0]
+    for entry in entries:
+        keyframe = nearest_keyframe(keyframes, position)
+        if abs(keyframe - position) <= KEYFRAME_SNAP_WINDOW:
+            position = keyframe
+        else:
+            print(f"  Warning: No keyframe near {position:.3f}s for segment {entry['index']+1} in {video_path}; recording the estimate.")
+        aligned.append(dict(entry, start=round(position, 6)))
+        position += entry['duration']
+    for current, following in zip(aligned, aligned[1:]):
+        current['duration'] = round(following['start'] - current['start'], 6)
+    return aligned
+
+def write_render_manifest(output_path, entries, screen_size, args):
+    """Writes the manifest used by --patch. entries: dicts with index, type, key, start, duration."""
+    manifest = {
+        'version': SEGMENT_CACHE_VERSION,
+        'screen_size': list(screen_size),
+        'fps': args.fps if args else 24,
+        'segments': entries,
+    }
+    try:
+        with open(manifest_path_for(output_path), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        print(f"Render manifest saved: {manifest_path_for(output_path)}")
+    except Exception as e:
+        print(f"Warning: Could not write render manifest for {output_path}: {e}")
+
+def build_manifest_entries(tasks, segment_paths, known_durations=None):
+    """
+    Lays segments out back to back, probing the container duration of each segment file
+    unless known (the concat demuxer advances by the container, not the video stream).
+    Pass the result through align_manifest_entries before recording it.
+    """
+    entries, position = [], 0.0
+    for task_data in tasks:
+        idx = task_data['index']
+        if idx not in segment_paths:
+            continue
+        duration = (known_durations or {}).get(idx) or probe_video_duration(segment_paths[idx], container=True)
+        entries.append({'index': idx, 'type': task_data['type'], 'key': task_data.get('segment_key'),
+                        'start': round(position, 6), 'duration': round(duration, 6)})
+        position += duration
+    return entries
+
+def plan_patch(existing_video, tasks, screen_size, args):
+    """
+    Matches the episode's segment keys against the existing video's manifest.
+    Returns {task index: (start, duration)} for segments that can be cut from the existing
+    video unchanged, or None if the existing video cannot be patched.
+    """
+    manifest_file = manifest_path_for(existing_video)
+    if not os.path.exists(existing_video) or not os.path.exists(manifest_file):
+        print(f"Error: --patch needs {existing_video} and its manifest {manifest_file} (written by a previous full render).")
+        return None
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except Exception as e:
+        print(f"Error: Could not read manifest {manifest_file}: {e}")
+        return None
+    if list(manifest.get('screen_size', [])) != list(screen_size) or manifest.get('fps') != (args.fps if args else 24):
+        print(f"Error: {existing_video} was rendered at {manifest.get('screen_size')} @ {manifest.get('fps')} fps; "
+              f"cannot splice {screen_size} @ {args.fps if args else 24} fps segments into it.")
+        return None
+
+    # Match by content key rather than index so inserted/removed lines do not invalidate the rest
+    available = {}
+    for entry in manifest.get('segments', []):
+        if entry.get('key'):
+            available.setdefault(entry['key'], []).append((entry['start'], entry['duration']))
+    reused = {}
+    for task_data in tasks:
+        positions = available.get(task_data.get('segment_key'))
+        if positions:
+            reused[task_data['index']] = positions.pop(0)
+
+    # Stream-copy cuts can only start on a keyframe; a start anywhere else would pull in the previous segment
+    if reused:
+        keyframes = probe_keyframe_times(existing_video)
+        half_frame = 0.5 / (args.fps if args else 24)
+        for idx, (start, _) in sorted(reused.items()):
+            keyframe = nearest_keyframe(keyframes, start)
+            if keyframe is None or abs(keyframe - start) > half_frame:
+                where = f"nearest keyframe is at {keyframe:.6f}s" if keyframe is not None else "no keyframes could be probed"
+                print(f"Error: Manifest start {start:.6f}s of segment {idx+1} is not on a keyframe of {existing_video} ({where}); "
+                      f"re-render it in full instead of patching.")
+                return None
+    return reused
+
+def splice_patched_video(existing_video, tasks, reused_ranges, new_segment_paths, output_path, args, temp_dir):
+    """
+    Builds the patched video: unchanged runs are cut from the existing video and new
+    segments are taken from their segment files. Both are stream-copied (segment
+    boundaries are keyframes). Only the AAC audio track is re-encoded.
+    Returns the manifest entries of the result, or None on failure.
+    """
+    fps = args.fps if args else 24
+    half_frame = 0.5 / fps
+    pieces = [] # {'kind': 'existing'|'segment', 'start', 'duration', 'path', 'tasks': [(task, duration)]}
+    for task_data in tasks:
+        idx = task_data['index']
+        if idx in reused_ranges:
+            start, duration = reused_ranges[idx]
+            last = pieces[-1] if pieces else None
+            if last and last['kind'] == 'existing' and abs(last['start'] + last['duration'] - start) < half_frame:
+                last['duration'] += duration
+                last['tasks'].append((task_data, duration))
+            else:
+                pieces.append({'kind': 'existing', 'start': start, 'duration': duration, 'tasks': [(task_data, duration)]})
+        elif new_segment_paths.get(idx):
+            duration = probe_video_duration(new_segment_paths[idx])
+            pieces.append({'kind': 'segment', 'path': new_segment_paths[idx], 'duration': duration, 'tasks': [(task_data, duration)]})
+        else:
+            print(f"  Skipping segment {idx+1} ({task_data['type']}) in patched video as it failed processing.")
+    if not pieces:
+        print("Error: Nothing to splice.")
+        return None
+
+    work_files = []
+    list_file_path = os.path.join(temp_dir, f"patch_concat_{uuid.uuid4().hex}.txt")
+    audio_script_path = os.path.join(temp_dir, f"patch_audio_{uuid.uuid4().hex}.filter")
+    spliced_output = output_path if os.path.abspath(output_path) != os.path.abspath(existing_video) else f"{output_path}.patching.mp4"
+    try:
+        # Video-only pieces, all stream copies
+        video_pieces = []
+        for piece_idx, piece in enumerate(pieces):
+            piece_path = os.path.join(temp_dir, f"patch_piece_{piece_idx:04d}_{uuid.uuid4().hex}.mp4")
+            work_files.append(piece_path)
+            if piece['kind'] == 'existing':
+                # Seek a hair past the boundary so the demuxer lands on the segment's own keyframe
+                command = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+                           '-ss', f"{piece['start'] + 0.001:.6f}", '-i', existing_video,
+                           '-t', f"{max(piece['duration'] - half_frame, half_frame):.6f}",
+                           '-map', '0:v:0', '-c', 'copy', '-avoid_negative_ts', 'make_zero', piece_path]
+                description = f"cut {piece['duration']:.2f}s at {piece['start']:.2f}s from existing video"
+            else:
+                command = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+                           '-i', piece['path'], '-map', '0:v:0', '-c', 'copy', piece_path]
+                description = f"video of new segment {piece['tasks'][0][0]['index']+1}"
+            if not _run_ffmpeg_step(description, command):
+                return None
+            video_pieces.append(piece_path)
+        with open(list_file_path, 'w', encoding='utf-8') as f:
+            for piece_path in video_pieces:
+                f.write(f"file {_ffconcat_quote(os.path.abspath(piece_path))}\n")
+
+        # Audio: decode each piece's audio, concatenate, encode AAC once
+        command = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', list_file_path]
+        filters, labels = [], []
+        for piece_idx, piece in enumerate(pieces):
+            input_idx = piece_idx + 1
+            if piece['kind'] == 'existing':
+                command += ['-ss', f"{piece['start']:.6f}", '-t', f"{piece['duration']:.6f}", '-i', existing_video]
+            else:
+                command += ['-i', piece['path']]
+            filters.append(f"[{input_idx}:a]aresample={SEGMENT_AUDIO_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo,"
+                           f"apad,atrim=0:{piece['duration']:.6f},asetpts=N/SR/TB[a{piece_idx}]")
+            labels.append(f"[a{piece_idx}]")
+        filters.append(f"{''.join(labels)}concat=n={len(labels)}:v=0:a=1[aout]")
+        with open(audio_script_path, 'w', encoding='utf-8') as f:
+            f.write(';\n'.join(filters))
+        command += ['-filter_complex_script', audio_script_path,
+                    '-map', '0:v', '-map', '[aout]', '-c:v', 'copy',
+                    '-c:a', 'aac', '-b:a', args.final_audio_bitrate if args else '192k',
+                    '-movflags', '+faststart', spliced_output]
+        if not _run_ffmpeg_step("splice + AAC encode", command):
+            return None
+        if spliced_output != output_path:
+            os.replace(spliced_output, output_path)
+    finally:
+        if not (args and args.keep_temp_files):
+            for path in work_files + [list_file_path, audio_script_path]:
+                if os.path.exists(path):
+                    try: os.remove(path)
+                    except OSError: pass
+
+    entries, position = [], 0.0
+    for piece in pieces:
+        for task_data, duration in piece['tasks']:
+            entries.append({'index': task_data['index'], 'type': task_data['type'], 'key': task_data.get('segment_key'),
+                            'start': round(position, 6), 'duration': round(duration, 6)})
+            position += duration
+    entries = align_manifest_entries(entries, output_path)
+    reused_count = sum(len(p['tasks']) for p in pieces if p['kind'] == 'existing')
+    print(f"✅ Patched video written: {output_path} ({reused_count} segment(s) stream-copied from {os.path.basename(existing_video)}, "
+          f"{len(entries) - reused_count} re-rendered)")
+    return entries
+
+
+# --- Draft / Proxy Render ---
+def parse_segment_range(text):
+    """Parses '10-25', '10-' or '12' (1-based, inclusive) into (start, end); end is None for open ranges."""
+    text = str(text).strip()
+    if '-' in text:
+        start_text, end_text = text.split('-', 1)
+        start = int(start_text) if start_text.strip() else 1
+        end = int(end_text) if end_text.strip() else None
+    else:
+        start = end = int(text)
+    if start < 1 or (end is not None and end < start):
+        raise ValueError(f"invalid segment range '{text}'")
+    return start, end
+
+def draft_output_path(output_path):
+    """Preview renders never overwrite a full render: 'episode.mp4' -> 'episode_draft.mp4'."""
+    base, ext = os.path.splitext(output_path)
+    return f"{base}_draft{ext or '.mp4'}"
+
+def render_draft_preview(tasks, screen_size, args, work_dir, output_path):
+    """
+    Fast preview for checking pacing and art placement: composites the frames at a fraction
+    of the resolution and runs the single-pass render at 1-5 fps with an ultrafast encode
+    and low-bitrate audio. Returns the preview path, or None if it failed.
+    """
+    scale = min(max(getattr(args, 'draft_scale', 0.25), 0.05), 1.0)
+    draft_size = (max(2, int(screen_size[0] * scale) // 2 * 2), max(2, int(screen_size[1] * scale) // 2 * 2)) # libx264 needs even dims
+    draft_fps = min(max(getattr(args, 'draft_fps', 2), 1), 5)
+    draft_audio_bitrate = getattr(args, 'draft_audio_bitrate', '48k')
+    preview_path = draft_output_path(output_path)
+    print(f"\nDraft render: {draft_size[0]}x{draft_size[1]} @ {draft_fps} fps, audio {draft_audio_bitrate}, "
+          f"{len(tasks)} segment(s) -> {preview_path}")
+
+    frames_dir = os.path.join(work_dir, 'draft_frames')
+    for task in tasks:
+        task.pop('composite_image', None)
+    prepare_composite_frames(tasks, draft_size, frames_dir, character_scale=CHARACTER_SCALE * scale)
+
+    draft_args = argparse.Namespace(**vars(args))
+    draft_args.fps = draft_fps
+    draft_args.intermediate_preset = DRAFT_PRESET
+    draft_args.intermediate_crf = DRAFT_CRF
+    draft_args.final_audio_bitrate = draft_audio_bitrate
+    if render_episode_single_pass(tasks, draft_size, draft_args, work_dir, preview_path):
+        return preview_path
+    return None
+
 
 # --- Clip Creation Functions (for individual segments) ---
 # (create_intro_outro_clip_object remains mostly unchanged)
@@ -88,56 +1033,20 @@ def create_character_clip(image_path, duration, screen_size, position):
 def create_speech_segment_clip_object(task_data, screen_size, work_dir, trim_amount=0.0):
     """
     Creates a MoviePy clip object for a single podcast speech segment using task_data.
-    Applies noise reduction to audio if applicable.
+    Applies the voice's video-side audio filter if the audio was not already enhanced.
     Trims audio *before* creating visuals to maintain sync.
     Handles resource cleanup carefully.
     """
     original_audio_path = task_data.get('audio_path')
-    speaker = task_data.get('speaker')
-    bg_path = task_data.get('bg_image')
-    host_path = task_data.get('host_image')
-    guest_path = task_data.get('guest_image')
+    bg_path, host_path, guest_path = segment_visual_layers(task_data)
     processed_audio_path = original_audio_path # Start assuming we use the original
     if not original_audio_path or not os.path.exists(original_audio_path):
         print(f"  Warning (Worker): Original audio file missing or invalid: {original_audio_path}. Skipping segment.")
         return None
 
-    # --- Noise Reduction ---
-    # (Noise reduction logic using FFmpeg remains unchanged)
-    print(f"  [Debug] Checking segment: speaker='{speaker}', audio='{original_audio_path}'")
-    if speaker in ['tara', 'leo'] and original_audio_path and original_audio_path.lower().endswith('.wav'):
-        cleaned_audio_filename = f"{os.path.splitext(os.path.basename(original_audio_path))[0]}_ffmpeg_cleaned.wav"
-        cleaned_audio_filepath = os.path.join(work_dir, cleaned_audio_filename)
-        try:
-            print(f"  Applying FFmpeg processing (de-ess, NR, norm) to {speaker} audio: {os.path.basename(original_audio_path)}...")
-            ffmpeg_command = [
-                'ffmpeg',
-                '-i', original_audio_path,
-                '-af', 'asplit [main][side]; [side] bandpass=f=6000:width_type=h:w=4000 [sidechain]; [main][sidechain] sidechaincompress=threshold=0.03:ratio=12:attack=10:release=100, afftdn=nr=30, dynaudnorm=f=150:g=15',
-                '-y', # Overwrite output
-                cleaned_audio_filepath
-            ]
-            print(f"    Attempting to run FFmpeg command: {' '.join(ffmpeg_command)}")
-            result = subprocess.run(ffmpeg_command, capture_output=True, text=True, check=False)
-
-            print(f"    FFmpeg process finished.")
-            print(f"    Return Code: {result.returncode}")
-            if result.stdout: print(f"    FFmpeg stdout:\n{result.stdout.strip()}")
-            if result.stderr: print(f"    FFmpeg stderr:\n{result.stderr.strip()}")
-
-            if result.returncode == 0 and os.path.exists(cleaned_audio_filepath) and os.path.getsize(cleaned_audio_filepath) > 0:
-                processed_audio_path = cleaned_audio_filepath
-                print(f"    -> SUCCESS: Saved FFmpeg cleaned audio to: {cleaned_audio_filename}")
-            else:
-                print(f"  Warning: FFmpeg processing failed or produced empty file for {original_audio_path}. Using original.")
-                processed_audio_path = original_audio_path
-        except FileNotFoundError:
-            print(f"  Error: 'ffmpeg' command not found. Using original audio.")
-            processed_audio_path = original_audio_path
-        except Exception as ffmpeg_e:
-             print(f"  Warning: Error running FFmpeg processing for {original_audio_path}: {ffmpeg_e}. Using original.")
-             processed_audio_path = original_audio_path
-    # --- End Noise Reduction ---
+    # --- Video-side Audio Processing (skipped if already enhanced by TTS) ---
+    processed_audio_path = apply_video_audio_filter(task_data, work_dir)
+    # --- End Audio Processing ---
 
     # --- Load and Trim Audio FIRST ---
     audio_clip_to_use = None # This will hold the final audio clip (trimmed or original)
@@ -258,9 +1167,7 @@ def create_intro_outro_clip_object(task_data, screen_size, is_intro=True, args=N
     """Creates the intro or outro MoviePy clip object using task_data."""
     clip_type = "Intro" if is_intro else "Outro"
     music_path = task_data.get('audio_path') # Might be None
-    bg_path = task_data.get('bg_image')
-    host_path = task_data.get('host_image')
-    guest_path = task_data.get('guest_image')
+    bg_path, host_path, guest_path = segment_visual_layers(task_data)
 
     audio_clip = None # This will hold the final audio clip for the intro/outro
     audio_clip_temp = None # Temporary holder during loading
@@ -363,10 +1270,100 @@ def create_intro_outro_clip_object(task_data, screen_size, is_intro=True, args=N
                   except: pass
         return None
 
+# --- Segment Render Cache ---
+def segment_cache_key(task_data, screen_size, args):
+    """
+    Content-addressed key for one rendered segment: audio bytes, image paths/mtimes
+    (or the content-addressed composite frame) and every parameter that changes the encode.
+    """
+    parts = [
+        f"v{SEGMENT_CACHE_VERSION}",
+        f"type={task_data['type']}",
+        f"speaker={task_data.get('speaker')}",
+        f"engine={getattr(args, 'engine', 'moviepy')}",
+        f"fps={args.fps if args else 24}",
+        f"preset={args.intermediate_preset if args else 'medium'}",
+        f"crf={args.intermediate_crf if args else 23}",
+        f"size={screen_size[0]}x{screen_size[1]}",
+        f"scale={CHARACTER_SCALE}",
+    ]
+    if task_data['type'] in ['intro', 'outro']:
+        parts.append(f"video_fade={getattr(args, 'video_fade', FADE_DURATION) if args else FADE_DURATION}")
+        parts.append(f"audio_fadein={args.audio_fadein if args else 5.0}")
+        parts.append(f"audio_fadeout={args.audio_fadeout if args else 5.0}")
+
+    audio_path = _existing_path(task_data.get('audio_path'))
+    parts.append(f"audio={file_digest(audio_path) if audio_path else 'none'}")
+    audio_filter = effective_video_audio_filter(task_data) if audio_path else None
+    parts.append(f"audio_filter={hashlib.sha256(audio_filter.encode('utf-8')).hexdigest() if audio_filter else 'none'}")
+
+    composite_path = _existing_path(task_data.get('composite_image'))
+    if composite_path:
+        parts.append(f"composite={os.path.basename(composite_path)}") # File name is already its content key
+    else:
+        for role in ('bg_image', 'host_image', 'guest_image'):
+            image_path = _existing_path(task_data.get(role))
+            if image_path:
+                parts.append(f"{role}={os.path.abspath(image_path)}@{os.stat(image_path).st_mtime_ns}")
+            else:
+                parts.append(f"{role}=none")
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+def store_segment_in_cache(task_data, temp_video_path):
+    """Moves a freshly rendered segment into the segment cache when the task asks for it."""
+    cache_path = task_data.get('cache_path')
+    if not temp_video_path or not cache_path:
+        return temp_video_path
+    try:
+        os.replace(temp_video_path, cache_path)
+    except OSError:
+        try:
+            shutil.move(temp_video_path, cache_path)
+        except Exception as cache_e:
+            print(f"  Warn: Could not store segment {task_data['index']+1} in cache ({cache_e}). Using temp file.")
+            return temp_video_path
+    return cache_path
+
 # --- Worker Function for Multiprocessing ---
 def process_segment_worker(task_data, screen_size, args, temp_dir, work_dir):
     """
-    Worker function using task_data dictionary. Creates clip object, writes to temp file.
+    Worker function using task_data dictionary. Renders the segment with the selected
+    engine and, if the task carries a 'cache_path', moves the result into the segment cache.
+    Returns the path to the generated video file, or None if failed.
+    """
+    if getattr(args, 'engine', 'moviepy') == 'ffmpeg':
+        try:
+            temp_video_path = render_segment_with_ffmpeg(task_data, screen_size, args, temp_dir, work_dir)
+        except Exception as e:
+            print(f"!!! Error in worker processing segment {task_data['index']+1} ({task_data['type']}): {e}")
+            temp_video_path = None
+    else:
+        temp_video_path = render_segment_with_moviepy(task_data, screen_size, args, temp_dir, work_dir)
+    return store_segment_in_cache(task_data, temp_video_path)
+
+def process_segment_worker_indexed(task_data, screen_size, args, temp_dir, work_dir):
+    """
+    imap_unordered wrapper around process_segment_worker: results arrive in completion
+    order, so the task index travels with the path for reassembly in main().
+    """
+    return task_data['index'], process_segment_worker(task_data, screen_size, args, temp_dir, work_dir)
+
+def estimate_task_duration(task_data):
+    """Cheap duration estimate for scheduling (WAV header probe; default length for missing intro/outro music)."""
+    duration = probe_audio_duration(task_data.get('audio_path'))
+    if duration <= 0 and task_data['type'] in ['intro', 'outro']:
+        duration = DEFAULT_INTRO_OUTRO_DURATION
+    return duration
+
+def emit_progress_event(event_type, **fields):
+    """Prints a one-line JSON event; the control panel forwards any such line to the browser as-is."""
+    event = {'type': event_type}
+    event.update(fields)
+    print(json.dumps(event))
+
+def render_segment_with_moviepy(task_data, screen_size, args, temp_dir, work_dir):
+    """
+    Creates the MoviePy clip object for a task and writes it to a temp file.
     Handles creation of speech, intro, or outro segments.
     Returns the path to the generated temporary video file, or None if failed.
     """
@@ -397,7 +1394,7 @@ def process_segment_worker(task_data, screen_size, args, temp_dir, work_dir):
                 'audio_codec': 'pcm_s16le', # Use uncompressed PCM for intermediate audio
                 'temp_audiofile': os.path.join(temp_dir, f'temp-audio-worker-{os.getpid()}-{uuid.uuid4()}.wav'), # Changed extension
                 'remove_temp': True, 'verbose': False, 'logger': None,
-                'threads': 1, # Limit threads for intermediate writes
+                'threads': getattr(args, 'encoder_threads', 1) if args else 1, # Per-worker share of the CPU from the render plan
                 'ffmpeg_params': ['-crf', str(args.intermediate_crf if args else 23)] # Use arg for CRF
             }
             temp_filename = f"segment_{segment_idx+1:04d}_{segment_type}_{uuid.uuid4()}.mp4" # Padded index for sorting
@@ -436,6 +1433,94 @@ def process_segment_worker(task_data, screen_size, args, temp_dir, work_dir):
     # Return the path to the generated temp file (or None)
     return temp_video_path
 
+# --- Render Resource Planning ---
+def parse_memory_size(text):
+    """Parses sizes like '8G', '1536M', '2.5GiB' or plain bytes. Returns bytes, or None for 'auto'/empty."""
+    if text is None:
+        return None
+    value = str(text).strip().lower().replace('ib', '').rstrip('b')
+    if value in ('', 'auto'):
+        return None
+    multipliers = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+    if value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(float(value))
+
+def available_memory_bytes():
+    """MemAvailable from /proc/meminfo, falling back to sysconf; None if neither is readable."""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def estimate_worker_memory(screen_size, engine, max_segment_duration, encoder_threads=1):
+    """
+    Rough peak RSS of one render worker plus its FFmpeg child, in bytes.
+    MoviePy holds several RGB frames plus float64 masks per composite and reads the
+    segment's audio as float arrays; libx264 keeps ~2 raw frames of lookahead per thread.
+    """
+    width, height = screen_size
+    rgb_frame = width * height * 3
+    encoder_bytes = 40 * 1024 ** 2 + int(width * height * 1.5) * (10 + 2 * encoder_threads)
+    if engine == 'ffmpeg':
+        return encoder_bytes + 20 * 1024 ** 2 # Filtergraph frames on top of the encoder
+    moviepy_base = 180 * 1024 ** 2 # Interpreter + numpy/moviepy imports
+    composite_bytes = rgb_frame * 6 + width * height * 8 * 2 # Frames in flight + float64 character masks
+    audio_bytes = int(max_segment_duration * SEGMENT_AUDIO_RATE * 2 * 8) # float64 stereo
+    return moviepy_base + composite_bytes + audio_bytes + encoder_bytes
+
+def plan_render_resources(screen_size, tasks, args):
+    """
+    Chooses pool size and per-worker encoder threads from CPU count, resolution, the longest
+    segment and a memory budget (--memory-budget, else 75% of available RAM).
+    Returns (num_workers, encoder_threads, plan_description).
+    """
+    cpu_total = multiprocessing.cpu_count()
+    engine = getattr(args, 'engine', 'moviepy') if args else 'moviepy'
+    max_duration = max((t.get('estimated_duration', 0.0) for t in tasks), default=0.0)
+    available = available_memory_bytes()
+    try:
+        budget = parse_memory_size(getattr(args, 'memory_budget', None) if args else None)
+    except ValueError:
+        print(f"Warning: Invalid --memory-budget '{args.memory_budget}', using automatic budget.")
+        budget = None
+    budget_source = 'requested'
+    if budget is None and available:
+        budget, budget_source = int(available * 0.75), 'auto, 75% of available'
+
+    requested_workers = args.workers if args and args.workers is not None and args.workers > 0 else None
+    per_worker = estimate_worker_memory(screen_size, engine, max_duration)
+    if requested_workers:
+        num_workers = requested_workers
+        if budget and num_workers * per_worker > budget:
+            print(f"Warning: {num_workers} workers need ~{num_workers * per_worker / 1024 ** 3:.1f} GiB, "
+                  f"over the {budget / 1024 ** 3:.1f} GiB memory budget. Keeping --workers as requested.")
+    else:
+        memory_cap = max(1, budget // per_worker) if budget else cpu_total
+        num_workers = max(1, min(cpu_total, memory_cap, len(tasks) or 1))
+
+    # Hand spare cores to each worker's encoder when memory, not CPU, limits the pool
+    encoder_threads = max(1, cpu_total // num_workers)
+    if encoder_threads > 1:
+        per_worker = estimate_worker_memory(screen_size, engine, max_duration, encoder_threads)
+        while encoder_threads > 1 and budget and num_workers * per_worker > budget:
+            encoder_threads -= 1
+            per_worker = estimate_worker_memory(screen_size, engine, max_duration, encoder_threads)
+
+    budget_text = f"{budget / 1024 ** 3:.1f} GiB ({budget_source})" if budget else "unknown"
+    available_text = f"{available / 1024 ** 3:.1f} GiB" if available else "unknown"
+    description = (f"{num_workers} worker(s) x {encoder_threads} encoder thread(s) on {cpu_total} CPU(s); "
+                   f"~{per_worker / 1024 ** 2:.0f} MiB/worker at {screen_size[0]}x{screen_size[1]} ({engine}, "
+                   f"longest segment {max_duration:.1f}s); memory budget {budget_text}, available {available_text}")
+    return num_workers, encoder_threads, description
+
 # --- FFmpeg Padding Generation Helper Removed ---
 
 
@@ -457,6 +1542,7 @@ def main(config_path, output_path, args):
         FADE_DURATION = args.video_fade
         print(f"Settings: Character Scale={CHARACTER_SCALE}, Video Fade={FADE_DURATION}")
         print(f"Intermediate Encoding: Preset={args.intermediate_preset}, CRF={args.intermediate_crf}, FPS={args.fps}") # Log intermediate settings
+        print(f"Segment Render Engine: {getattr(args, 'engine', 'moviepy')}")
         print(f"Final Audio Encoding: Codec=aac, Bitrate={args.final_audio_bitrate}") # Log final audio bitrate
     else: print("Warning: Args object not provided, using default constants.")
 
@@ -522,12 +1608,24 @@ def main(config_path, output_path, args):
             'type': segment_type, 'index': i,
             'speaker': segment_info_original.get('voice'),
             'audio_path': copied_audio_path,
+            'audio_enhancement': segment_info_original.get('audio_enhancement'),
             'bg_image': segment_info_original.get('bg_image'),
             'host_image': segment_info_original.get('host_image'),
             'guest_image': segment_info_original.get('guest_image')
         }
         tasks_for_workers.append(task_data)
 
+    # --- Segment Range Selection ---
+    if args and getattr(args, 'segments', None):
+        try:
+            range_start, range_end = parse_segment_range(args.segments)
+        except ValueError as range_e:
+            print(f"Error: {range_e}. Expected e.g. '10-25', '10-' or '12'.")
+            return
+        tasks_for_workers = [t for t in tasks_for_workers
+                             if t['index'] + 1 >= range_start and (range_end is None or t['index'] + 1 <= range_end)]
+        print(f"Limiting render to segments {range_start}-{range_end if range_end is not None else 'end'}: {len(tasks_for_workers)} segment(s).")
+
     # --- Padding Calculation Removed ---
     # Padding is now assumed to be included in the audio files generated by orpheus_ttsv2.py
 
@@ -554,41 +1652,167 @@ def main(config_path, output_path, args):
         except Exception as e: print(f"Warning: Could not read size from {first_bg}, using default {screen_size}. Error: {e}")
     else: print(f"Warning: No valid background found, using default {screen_size}.")
 
+    # --- Draft / Proxy Render ---
+    if args and getattr(args, 'draft', False):
+        draft_start_time = time.time()
+        preview_path = render_draft_preview(tasks_for_workers, screen_size, args, work_dir, output_path)
+        if preview_path:
+            print(f"\nDraft preview ready in {time.time() - draft_start_time:.2f} seconds: {preview_path}")
+        print(f"\nTotal execution time: {time.time() - start_time:.2f} seconds.")
+        return
+
+    # --- Composite Layer Pre-pass ---
+    # Episodes only use a handful of (bg, host, guest) combinations, so flatten each once
+    # into a content-addressed cache and let workers load a single frame per segment.
+    if args and getattr(args, 'no_composite_cache', False):
+        print("\nComposite layer cache disabled; workers will composite layers per segment.")
+    else:
+        composite_cache_dir = getattr(args, 'composite_cache_dir', None) or DEFAULT_COMPOSITE_CACHE_DIR
+        composite_start_time = time.time()
+        try:
+            unique_combos, composite_hits, composite_built = prepare_composite_frames(tasks_for_workers, screen_size, composite_cache_dir)
+            print(f"\nComposite layer cache ({composite_cache_dir}): {unique_combos} unique layer combination(s) "
+                  f"across {len(tasks_for_workers)} segments, {composite_hits} cached, {composite_built} built "
+                  f"in {time.time() - composite_start_time:.2f} seconds.")
+        except Exception as composite_e:
+            print(f"Warning: Composite layer pre-pass failed ({composite_e}). Workers will composite layers per segment.")
+
+    # --- Single-Pass Render ---
+    # Static-art episodes need no per-segment encodes: one master WAV, one image
+    # timeline and a single final encode replace the worker pool and the concat step.
+    if args and getattr(args, 'single_pass', False):
+        print("\nSingle-pass render: master audio + image timeline, no intermediate segment files.")
+        single_pass_start_time = time.time()
+        if render_episode_single_pass(tasks_for_workers, screen_size, args, work_dir, output_path):
+            print(f"\nSingle-pass render finished in {time.time() - single_pass_start_time:.2f} seconds.")
+        else:
+            print(f"\nERROR: Single-pass render failed after {time.time() - single_pass_start_time:.2f} seconds "
+                  f"(see the errors above); {output_path} was not generated.")
+        print(f"\nTotal execution time: {time.time() - start_time:.2f} seconds.")
+        return
+
+    # --- Segment Render Cache Lookup ---
+    # Segments whose audio, art and encoding params are unchanged are reused from the
+    # persistent cache, so an edit to one line costs one segment encode plus the concat.
+    for task_data in tasks_for_workers:
+        try:
+            task_data['segment_key'] = segment_cache_key(task_data, screen_size, args)
+        except Exception as key_e:
+            print(f"  Warn: Could not compute cache key for segment {task_data['index']+1}: {key_e}. Rendering without cache.")
+            task_data['segment_key'] = None
+
+    # --- Patch Plan ---
+    # With --patch, segments whose key matches the existing video's manifest are cut from
+    # that video by stream copy; only the rest go through the cache/worker pool below.
+    patch_source = getattr(args, 'patch', None) if args else None
+    reused_ranges = {}
+    segment_tasks = tasks_for_workers
+    if patch_source:
+        reused_ranges = plan_patch(patch_source, tasks_for_workers, screen_size, args)
+        if reused_ranges is None:
+            return
+        segment_tasks = [t for t in tasks_for_workers if t['index'] not in reused_ranges]
+        print(f"\nPatch mode: {len(reused_ranges)} of {len(tasks_for_workers)} segments unchanged in {patch_source}; "
+              f"{len(segment_tasks)} to render.")
+
+    cached_segment_map = {} # task index -> cached segment path
+    tasks_to_render = segment_tasks
+    segment_cache_enabled = not (args and getattr(args, 'no_segment_cache', False))
+    if segment_cache_enabled:
+        segment_cache_dir = getattr(args, 'segment_cache_dir', None) or os.path.join(base_temp_dir, 'segment_cache')
+        os.makedirs(segment_cache_dir, exist_ok=True)
+        tasks_to_render = []
+        for task_data in segment_tasks:
+            cache_key = task_data['segment_key']
+            if not cache_key:
+                tasks_to_render.append(task_data)
+                continue
+            cached_path = os.path.join(segment_cache_dir, f"segment_{cache_key}.mp4")
+            if os.path.exists(cached_path) and os.path.getsize(cached_path) > 0:
+                cached_segment_map[task_data['index']] = cached_path
+            else:
+                task_data['cache_path'] = cached_path
+                tasks_to_render.append(task_data)
+        print(f"\nSegment render cache ({segment_cache_dir}): {len(cached_segment_map)} of {len(segment_tasks)} segments already rendered.")
+    else:
+        print("\nSegment render cache disabled; every segment will be encoded.")
+
     # --- Create Segment Clips in Parallel ---
-    num_workers = args.workers if args and args.workers is not None and args.workers > 0 else multiprocessing.cpu_count()
-    print(f"\nCreating {len(tasks_for_workers)} main segment clips using up to {num_workers} worker processes...")
+    # Longest-job-first: dispatch the longest segments first so a long intro or monologue
+    # queued at the end of the script cannot leave every other core idle.
+    for task_data in tasks_to_render:
+        task_data['estimated_duration'] = estimate_task_duration(task_data)
+    tasks_to_render = sorted(tasks_to_render, key=lambda t: t['estimated_duration'], reverse=True)
+
+    num_workers, encoder_threads, render_plan = plan_render_resources(screen_size, tasks_to_render, args)
+    if args:
+        args.encoder_threads = encoder_threads
+    print(f"\nRender plan: {render_plan}")
+    print(f"Creating {len(tasks_to_render)} main segment clips using up to {num_workers} worker processes...")
     print(f"(Writing temporary segment files to: {temp_segments_dir})")
 
-    worker_func = partial(process_segment_worker, screen_size=screen_size, args=args, temp_dir=temp_segments_dir, work_dir=work_dir)
+    worker_func = partial(process_segment_worker_indexed, screen_size=screen_size, args=args, temp_dir=temp_segments_dir, work_dir=work_dir)
+    total_render_seconds = sum(t['estimated_duration'] for t in tasks_to_render)
+    tasks_by_index = {t['index']: t for t in tasks_to_render}
 
-    returned_temp_segment_paths = []
+    rendered_segment_map = {} # task index -> rendered path (None if the segment failed)
+    shared_image_blocks = []
     pool_start_time = time.time()
     try:
-        # Set start method explicitly before creating the pool
-        start_method = 'fork' if os.name == 'posix' else 'spawn'
-        try:
-            current_method = multiprocessing.get_start_method(allow_none=True)
-            if current_method is None or current_method != start_method:
-                 multiprocessing.set_start_method(start_method, force=True)
-            print(f"Attempting to use multiprocessing start method: '{multiprocessing.get_start_method()}' for pool")
-        except Exception as start_method_e:
-             print(f"Warning: Could not set multiprocessing start method to '{start_method}'. Using default. Error: {start_method_e}")
-
-        with multiprocessing.Pool(processes=num_workers) as pool:
-            returned_temp_segment_paths = pool.map(worker_func, tasks_for_workers)
+        if not tasks_to_render:
+            print("All segments were served from the segment render cache; skipping worker pool.")
+        else:
+            # Set start method explicitly before creating the pool
+            start_method = 'fork' if os.name == 'posix' else 'spawn'
+            try:
+                current_method = multiprocessing.get_start_method(allow_none=True)
+                if current_method is None or current_method != start_method:
+                     multiprocessing.set_start_method(start_method, force=True)
+                print(f"Attempting to use multiprocessing start method: '{multiprocessing.get_start_method()}' for pool")
+            except Exception as start_method_e:
+                 print(f"Warning: Could not set multiprocessing start method to '{start_method}'. Using default. Error: {start_method_e}")
+
+            print(f"Dispatching longest segments first ({total_render_seconds:.1f}s of audio to render).")
+            completed_seconds = 0.0
+            # Decode each unique image once into shared memory; MoviePy workers map it zero-copy
+            pool_initializer, pool_initargs = None, ()
+            if getattr(args, 'engine', 'moviepy') == 'moviepy' and not (args and getattr(args, 'no_shared_images', False)):
+                share_start_time = time.time()
+                shared_image_blocks, shared_descriptors = share_decoded_images(tasks_to_render, screen_size)
+                shared_bytes = sum(block.size for block in shared_image_blocks)
+                print(f"Shared {len(shared_image_blocks)} decoded image(s) ({shared_bytes / (1024 * 1024):.1f} MiB) with workers "
+                      f"in {time.time() - share_start_time:.2f} seconds.")
+                pool_initializer, pool_initargs = init_shared_image_worker, (shared_descriptors, CHARACTER_SCALE)
+
+            with multiprocessing.Pool(processes=num_workers, initializer=pool_initializer, initargs=pool_initargs) as pool:
+                for segment_index, segment_path in pool.imap_unordered(worker_func, tasks_to_render, chunksize=1):
+                    rendered_segment_map[segment_index] = segment_path
+                    task_data = tasks_by_index[segment_index]
+                    completed_seconds += task_data['estimated_duration']
+                    elapsed = time.time() - pool_start_time
+                    remaining_seconds = total_render_seconds - completed_seconds
+                    eta = elapsed * remaining_seconds / completed_seconds if completed_seconds > 0 else None
+                    emit_progress_event('video_segment_progress',
+                                        completed=len(rendered_segment_map), total=len(tasks_to_render),
+                                        index=segment_index + 1, segment_type=task_data['type'],
+                                        ok=segment_path is not None,
+                                        elapsed_seconds=round(elapsed, 1),
+                                        eta_seconds=round(eta, 1) if eta is not None else None)
     except Exception as pool_e:
          print(f"\n!!! Error during multiprocessing pool execution: {pool_e}")
     finally:
-         # Add paths created by workers to the main cleanup list
-         temp_segment_paths_created.extend(p for p in returned_temp_segment_paths if p is not None)
+         release_shared_images(shared_image_blocks)
+         # Add paths created by workers to the main cleanup list (cached segments are kept)
+         temp_segment_paths_created.extend(p for idx, p in rendered_segment_map.items()
+                                           if p is not None and p != tasks_by_index[idx].get('cache_path'))
 
     pool_end_time = time.time()
     print(f"\nMultiprocessing pool finished in {pool_end_time - pool_start_time:.2f} seconds.")
 
     # Filter out None paths which indicate failed segments
-    valid_temp_segment_paths = [p for p in returned_temp_segment_paths if p is not None]
-    if len(valid_temp_segment_paths) != len(tasks_for_workers):
-         print(f"Warning: {len(tasks_for_workers) - len(valid_temp_segment_paths)} segment(s) failed during processing.")
+    valid_temp_segment_paths = [p for p in rendered_segment_map.values() if p is not None]
+    if len(valid_temp_segment_paths) != len(tasks_to_render):
+         print(f"Warning: {len(tasks_to_render) - len(valid_temp_segment_paths)} segment(s) failed during processing.")
 
     # --- Prepare Final List for FFmpeg Concat (Main Segments Only) ---
     final_concat_paths = []
@@ -597,10 +1821,17 @@ def main(config_path, output_path, args):
     try:
         print(f"\nPreparing FFmpeg concat list (using main segments only)...")
 
-        # Map original task index to the path of the successfully created segment file
-        successful_segment_map = {task_data['index']: path
-                                  for task_data, path in zip(tasks_for_workers, returned_temp_segment_paths)
-                                  if path is not None}
+        # Map original task index to the path of the successfully created (or cached) segment file
+        successful_segment_map = dict(cached_segment_map)
+        successful_segment_map.update({idx: path for idx, path in rendered_segment_map.items() if path is not None})
+
+        if patch_source:
+            print(f"\nSplicing {len(successful_segment_map)} rendered segment(s) into {patch_source}...")
+            patched_entries = splice_patched_video(patch_source, tasks_for_workers, reused_ranges, successful_segment_map,
+                                                   output_path, args, temp_segments_dir)
+            if patched_entries:
+                write_render_manifest(output_path, patched_entries, screen_size, args)
+            return # Cleanup happens in finally
 
         # Iterate through the original task list to maintain order
         for i, task_data in enumerate(tasks_for_workers):
@@ -654,6 +1885,8 @@ def main(config_path, output_path, args):
             print(result.stderr if result.stderr else "<No stderr>")
             print(f"\nFFmpeg concatenation successful in {ffmpeg_end_time - ffmpeg_start_time:.2f} seconds.")
             print(f"✅ Video successfully generated: {output_path}")
+            manifest_entries = build_manifest_entries(tasks_for_workers, successful_segment_map)
+            write_render_manifest(output_path, align_manifest_entries(manifest_entries, output_path), screen_size, args)
 
         except FileNotFoundError:
              print("\nERROR: 'ffmpeg' command not found. Make sure FFmpeg is installed and in your system PATH.")
@@ -706,6 +1939,10 @@ def main(config_path, output_path, args):
         # Optionally remove temp dir if empty? For now, keep it.
 
         print("Cleanup finished.")
+        if segment_cache_enabled:
+            newly_cached = sum(1 for idx, p in rendered_segment_map.items()
+                               if p is not None and p == tasks_by_index[idx].get('cache_path'))
+            print(f"\nSegment render cache stats: {len(cached_segment_map)} hit(s), {len(tasks_to_render)} miss(es), {newly_cached} newly cached.")
         end_time = time.time()
         print(f"\nTotal execution time: {end_time - start_time:.2f} seconds.")
 
@@ -734,6 +1971,8 @@ if __name__ == "__main__":
                             help="Encoding preset for intermediate libx264 segments (e.g., ultrafast, medium, slow, veryslow). Slower presets = better quality/compression.")
     encode_group.add_argument("--intermediate-crf", type=int, default=23,
                             help="CRF value for intermediate libx264 segments (0-51). Lower is higher quality. 18-24 is typical range. 0 is lossless.")
+    encode_group.add_argument("--engine", choices=RENDER_ENGINES, default='moviepy',
+                            help="Segment render engine. 'ffmpeg' builds each static segment with one FFmpeg overlay filtergraph (-tune stillimage) instead of compositing every frame in MoviePy.")
     # Final Audio Encoding
     audio_group = parser.add_argument_group('Final Audio Encoding Options')
     audio_group.add_argument("--final-audio-bitrate", default='192k',
@@ -743,24 +1982,44 @@ if __name__ == "__main__":
     visual_group.add_argument("--character-scale", type=float, default=1.0, help="Scale factor for characters")
     visual_group.add_argument("--resolution", default="1280x720", help="Default resolution if no background (WxH)")
     visual_group.add_argument("--video-fade", type=float, default=1.0, help="Video fade duration (for intro/outro segments)")
+    # Draft / Preview
+    draft_group = parser.add_argument_group('Draft Preview Options')
+    draft_group.add_argument("--draft", action='store_true',
+                             help="Render a fast low-resolution preview (<output>_draft.mp4) for checking pacing and art placement.")
+    draft_group.add_argument("--draft-scale", type=float, default=0.25, help="Resolution scale for --draft previews (0.05-1.0)")
+    draft_group.add_argument("--draft-fps", type=int, default=2, help="Frame rate for --draft previews (1-5)")
+    draft_group.add_argument("--draft-audio-bitrate", default='48k', help="AAC bitrate for --draft previews")
+    draft_group.add_argument("--segments", type=str, default=None,
+                             help="Only render this 1-based, inclusive range of episode segments, e.g. '10-25', '10-' or '12'. Works with or without --draft.")
     # Intro/Outro Audio
     io_audio_group = parser.add_argument_group('Intro/Outro Audio Options')
     io_audio_group.add_argument("--audio-fadein", type=float, default=5.0, help="Audio fade-in duration for outro")
     io_audio_group.add_argument("--audio-fadeout", type=float, default=5.0, help="Audio fade-out duration for intro")
     # Performance
     perf_group = parser.add_argument_group('Performance and Debugging Options')
-    perf_group.add_argument("--workers", type=int, default=None, help="Number of worker processes for parallel clip generation. Defaults to CPU count.")
+    perf_group.add_argument("--single-pass", action='store_true',
+                            help="Render static-art episodes in one FFmpeg encode (master WAV + image timeline) instead of encoding and concatenating per-segment MP4s. Ignores --engine, --workers and the segment cache.")
+    perf_group.add_argument("--workers", type=int, default=None, help="Number of worker processes for parallel clip generation. Defaults to a plan based on CPU count, resolution and --memory-budget.")
+    perf_group.add_argument("--memory-budget", type=str, default=None,
+                            help="Memory the render pool may use (e.g. 8G, 1536M). Defaults to 75%% of available RAM. Used to size the pool and per-worker encoder threads.")
+    perf_group.add_argument("--composite-cache-dir", type=str, default=None,
+                            help=f"Directory for the content-addressed cache of flattened background/character frames. Defaults to {DEFAULT_COMPOSITE_CACHE_DIR}.")
+    perf_group.add_argument("--no-composite-cache", action='store_true', help="Disable the composite layer pre-pass and composite background/characters per segment.")
+    perf_group.add_argument("--segment-cache-dir", type=str, default=None,
+                            help="Directory for the persistent, content-addressed cache of rendered segment MP4s. Defaults to <temp-output-dir>/segment_cache.")
+    perf_group.add_argument("--no-segment-cache", action='store_true', help="Disable the segment render cache and encode every segment.")
+    perf_group.add_argument("--no-shared-images", action='store_true',
+                            help="Do not pre-decode images into shared memory; each MoviePy worker decodes its own copies.")
+    perf_group.add_argument("--patch", type=str, default=None, metavar="EXISTING_MP4",
+                            help="Re-render only segments that changed since EXISTING_MP4 was rendered (per its .manifest.json) and splice them in by stream copy; only the AAC audio is re-encoded.")
     perf_group.add_argument("--keep-temp-files", action='store_true', help="Keep temporary audio/video segment/padding files and list file after completion.")
     perf_group.add_argument("--temp-output-dir", type=str, default=None, help="Optional: Base directory for temporary work and segment files. Defaults to output_video's directory.")
 
     args = parser.parse_args()
 
     # --- Determine Worker Count ---
-    if args.workers is None:
-        try: args.workers = multiprocessing.cpu_count()
-        except NotImplementedError: args.workers = 1
-        print(f"Number of workers not specified, defaulting to CPU count: {args.workers}")
-    elif args.workers <= 0:
+    # When --workers is not given, main() sizes the pool from CPU count, resolution and memory budget.
+    if args.workers is not None and args.workers <= 0:
          print(f"Warning: Invalid number of workers ({args.workers}), defaulting to 1.")
          args.workers = 1
 
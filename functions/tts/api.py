@@ -1,17 +1,20 @@
 import requests
 import soundfile as sf
 import io
-import numpy as np
 import os
-import tempfile
-import shutil
-import shlex
-import subprocess # Added for subprocess.run
 import time # Added for retry delays
+import hashlib # For enhancement chain signatures
 from typing import Optional, Tuple
+from urllib.parse import urlsplit
 
 from functions.tts.utils import load_voice_config
 from functions.tts.providers import get_provider, TTSProvider
+from functions.tts.cache import get_tts_cache
+from functions.tts.processing import process_audio_data
+from functions.tts.streaming import WavStreamDecoder, RequestCancelled, cancellable_request, read_streamed_body
+from functions.tts.sessions import get_shared_session
+from functions.tts.latency import request_timeout, record_latency, retry_delay
+from functions.tts.timing import timed_stage
 
 # Override print function to force immediate flushing for real-time output
 original_print = print
@@ -19,12 +22,36 @@ def print(*args, **kwargs):
     kwargs.setdefault('flush', True)
     return original_print(*args, **kwargs)
 
+# Enhancement chains applied in this process, keyed by output path. podcast_builder copies
+# them into the segment JSON so the video stage knows the audio is already processed.
+_enhancement_records = {}
+
+
+def record_audio_enhancement(audio_path, audio_filter):
+    """Remembers the enhancement chain applied to a generated segment (no-op if none was applied)."""
+    if audio_path and audio_filter:
+        _enhancement_records[os.path.abspath(audio_path)] = {
+            'chain': audio_filter,
+            'sha256': hashlib.sha256(audio_filter.encode('utf-8')).hexdigest(),
+        }
+
+
+def get_audio_enhancement(audio_path):
+    """
+    Returns {'chain': ..., 'sha256': ...} for a segment enhanced by this process,
+    or None if it was not enhanced (or was generated elsewhere).
+    """
+    if not audio_path:
+        return None
+    return _enhancement_records.get(os.path.abspath(audio_path))
+
+
 # Global provider instance (initialized lazily)
 _tts_provider: Optional[TTSProvider] = None
 
 
 def get_tts_provider(provider_name: str = "qwen3", api_host: str = "127.0.0.1",
-                     api_port: Optional[int] = None, **kwargs) -> TTSProvider:
+                     api_port: Optional[int] = None, endpoints=None, **kwargs) -> TTSProvider:
     """
     Get or initialize the TTS provider singleton.
     
@@ -32,7 +59,10 @@ def get_tts_provider(provider_name: str = "qwen3", api_host: str = "127.0.0.1",
         provider_name: 'qwen3' or 'orpheus'
         api_host: API hostname
         api_port: API port (uses provider default if None)
-        **kwargs: Additional provider options
+        endpoints: Several 'host:port' servers to load-balance over (PooledTTSProvider);
+            api_host/api_port are ignored when given
+        **kwargs: Additional provider options (model; pool options health_interval,
+            failure_threshold, cooldown, slow_factor, hedge, hedge_quantile)
         
     Returns:
         TTSProvider instance
@@ -46,6 +76,15 @@ def get_tts_provider(provider_name: str = "qwen3", api_host: str = "127.0.0.1",
         if api_port is None:
             api_port = 8000 if provider_name == 'qwen3' else 5005
         
+        if endpoints:
+            pool_options = {k: kwargs[k] for k in ('health_interval', 'failure_threshold', 'cooldown', 'slow_factor',
+                                                   'hedge', 'hedge_quantile') if k in kwargs}
+            if provider_name == 'qwen3' and 'model' in kwargs:
+                pool_options['model'] = kwargs['model']
+            _tts_provider = get_provider(provider_name, endpoints=endpoints, **pool_options)
+            print(f"-> Initialized pooled TTS Provider: {provider_name} over {_tts_provider.base_url}")
+            return _tts_provider
+
         # Pass model for Qwen3
         if provider_name == 'qwen3' and 'model' in kwargs:
             _tts_provider = get_provider(
@@ -65,18 +104,26 @@ def get_tts_provider(provider_name: str = "qwen3", api_host: str = "127.0.0.1",
 def reset_tts_provider():
     """Reset the TTS provider singleton (useful for testing)."""
     global _tts_provider
+    if _tts_provider is not None and hasattr(_tts_provider, 'close'):
+        _tts_provider.close()
     _tts_provider = None
 
-def make_tts_request_with_retry(api_url, payload, headers, max_retries=3, timeout=180):
+def make_tts_request_with_retry(api_url, payload, headers, max_retries=3, timeout=180, decoder=None):
     """
-    Makes a TTS API request with retry logic and exponential backoff.
+    Makes a TTS API request with retry logic and backoff.
+    The body is streamed in chunks and fed to `decoder` as it arrives. Once the latency
+    model has seen this endpoint/voice/model, the timeout is derived from the text length
+    (and doubled after each timeout); a timed-out attempt is retried after 1s instead of
+    the exponential backoff used for connection/HTTP errors.
     
     Args:
         api_url (str): The API endpoint URL
         payload (dict): Request payload
         headers (dict): Request headers
         max_retries (int): Maximum number of retry attempts (default: 3)
-        timeout (int): Request timeout in seconds (default: 180)
+        timeout (int): Request timeout in seconds until the latency model has data (default: 180)
+        decoder (WavStreamDecoder, optional): Incremental decoder; reset on every attempt.
+            Cancelling it aborts the attempt in flight and raises RequestCancelled.
     
     Returns:
         requests.Response: Successful response object
@@ -84,20 +131,36 @@ def make_tts_request_with_retry(api_url, payload, headers, max_retries=3, timeou
     Raises:
         requests.exceptions.RequestException: If all retries fail
     """
+    decoder = decoder or WavStreamDecoder()
+    endpoint = urlsplit(api_url).netloc
+    text = payload.get('input') or payload.get('text') or ''
+    model = payload.get('model', 'legacy')
+    timed_out = False
+    timeouts = 0
     for attempt in range(max_retries + 1):  # +1 for initial attempt
+        response = None
         try:
             if attempt > 0:
-                # Exponential backoff: wait 2^attempt seconds (2, 4, 8 seconds)
-                wait_time = 2 ** attempt
+                # Exponential backoff (2, 4, 8 seconds), or a short pause after a timeout
+                wait_time = retry_delay(attempt, timed_out)
                 print(f"   Retry attempt {attempt}/{max_retries} in {wait_time} seconds...")
-                time.sleep(wait_time)
+                decoder.pause(wait_time)
             
-            print(f"-> Making TTS request to {api_url} (attempt {attempt + 1}/{max_retries + 1})")
+            timed_out = False
+            attempt_timeout = request_timeout(endpoint, payload.get('voice'), model, text, timeout, timeouts)
+            timeout_note = f", timeout {attempt_timeout:.0f}s from recent latency" if attempt_timeout != timeout else ""
+            print(f"-> Making TTS request to {api_url} (attempt {attempt + 1}/{max_retries + 1}{timeout_note})")
             # Use form data (multipart/form-data) for Qwen3 API compatibility
-            response = requests.post(api_url, data=payload, headers=headers, timeout=timeout)
-            response.raise_for_status()
+            decoder.reset()
+            started = time.monotonic()
+            with cancellable_request(decoder): # decoder.cancel() aborts the connection
+                response = get_shared_session().post(api_url, data=payload, headers=headers, timeout=attempt_timeout, stream=True)
+                response.raise_for_status()
+                read_streamed_body(response, decoder)
+            response._content = decoder.body() # Keep response.content usable for callers
             
             if response.content and len(response.content) > 44:  # Valid audio response
+                record_latency(endpoint, payload.get('voice'), model, text, time.monotonic() - started)
                 print(f"   ✅ SUCCESS on attempt {attempt + 1}")
                 return response
             else:
@@ -105,18 +168,24 @@ def make_tts_request_with_retry(api_url, payload, headers, max_retries=3, timeou
                 
         except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
             print(f"   ❌ Network error on attempt {attempt + 1}: {e}")
+            if isinstance(e, requests.exceptions.Timeout):
+                timed_out = True
+                timeouts += 1
             if attempt == max_retries:
                 raise e
             continue
             
         except requests.exceptions.HTTPError as e:
             print(f"   ❌ HTTP error on attempt {attempt + 1}: {e}")
-            if response and response.text:
+            if response is not None and response.text: # Reading the body also frees the pooled connection
                 print(f"   Response content: {response.text}")
             if attempt == max_retries:
                 raise e
             continue
             
+        except RequestCancelled:
+            raise # Cancelled on purpose; neither an error to report nor one to retry
+
         except requests.exceptions.RequestException as e:
             print(f"   ❌ Request error on attempt {attempt + 1}: {e}")
             if attempt == max_retries:
@@ -126,41 +195,27 @@ def make_tts_request_with_retry(api_url, payload, headers, max_retries=3, timeou
     # This should never be reached, but just in case
     raise requests.exceptions.RequestException(f"All {max_retries + 1} attempts failed")
 
-def generate_audio_segment(input_text, voice, speed, api_host, api_port, temp_dir,
-                           # Parameters that can be overridden by function call
-                           apply_deesser=None, # Boolean toggle (True/False/None)
-                           deesser_freq=None,  # Explicit frequency or None
-                           gain_factor=None,   # Explicit gain or None
-                           trim_end_ms=None,   # Explicit trim or None
-                           pad_end_ms=0,       # Explicit padding (defaults to 0)
-                           apply_ffmpeg_enhancement=None, # Boolean toggle (True/False/None)
-                           nr_level=None,         # Explicit NR level or None
-                           compress_thresh=None,  # Explicit threshold or None
-                           compress_ratio=None,   # Explicit ratio or None
-                           norm_frame_len=None,   # Explicit frame len or None
-                           norm_gauss_size=None,  # Explicit gauss size or None
-                           max_retries=3,         # Maximum retry attempts
-                           timeout=180):          # Request timeout in seconds
+@timed_stage('fetch')
+def fetch_audio_segment(input_text, voice, speed, api_host, api_port,
+                        max_retries=3,         # Maximum retry attempts
+                        timeout=180,           # Request timeout in seconds
+                        use_cache=True,        # Reuse/store raw audio in the TTS cache
+                        refresh_cache=False,   # Skip the cache lookup but store the new take
+                        on_frames=None,        # Called with (frames, samplerate) while the body downloads
+                        decoder=None):         # WavStreamDecoder to feed (and cancel the request through)
     """
-    Generates a single audio segment, optionally applies FFmpeg enhancement (de-ess, NR, norm),
-    applies gain, trimming, and padding using pydub, and saves it to a temporary file.
-    Default enhancement parameters are set based on the selected voice.
-
-    Args:
-        input_text (str): Text to synthesize.
-        voice (str): Voice model name.
-        speed (float): Speech speed.
-        api_host (str): API hostname/IP.
-        api_port (int): API port.
-        temp_dir (str): Path to temporary directory.
-        gain_factor (float, optional): Gain multiplier. Defaults to 1.0.
-        trim_end_ms (int, optional): Milliseconds to trim from the end. Defaults to 120.
-        pad_end_ms (int, optional): Milliseconds of silence to pad at the end. Defaults to 0.
-        apply_ffmpeg_enhancement (bool, optional): Whether to apply FFmpeg processing. Defaults to True.
-
+    Network stage of generate_audio_segment: gets the raw audio for one line from the TTS
+    cache or the server (OpenAI-compatible endpoint, then the legacy /speak fallback).
+    refresh_cache=True always asks the server and overwrites the cached entry with the
+    result (e.g. a redo replacing a rejected take); use_cache=False bypasses the cache.
+    on_frames receives decoded PCM as it arrives (e.g. the dev GUI's streaming preview); it
+    is not called for cache hits, and a retried request feeds it again from the start.
+    Pass decoder to cancel the request from another thread (on_frames is then ignored);
+    a cancelled request returns (None, None) without further retries or the fallback.
 
     Returns:
-        tuple: (path_to_final_file, samplerate) or (None, None) on failure.
+        tuple: (audio_bytes, decoded) where decoded is (float32 array, samplerate) if the body
+            was decoded while streaming, else None. (None, None) on failure.
     """
     # Try OpenAI-compatible endpoint first, fallback to legacy if needed
     api_url = f"http://{api_host}:{api_port}/v1/audio/speech"
@@ -179,41 +234,26 @@ def generate_audio_segment(input_text, voice, speed, api_host, api_port, temp_di
 
     print(f"\nGenerating segment for voice '{voice}' (Speed: {speed}): \"{input_text[:50]}...\"")
 
-    # --- Load Voice Configuration from YAML ---
-    voice_config = load_voice_config(voice)
-
-    # --- Determine Final Parameter Values ---
-    # Use passed value if not None, otherwise use value from loaded config
-    final_gain_factor = gain_factor if gain_factor is not None else voice_config.get('gain_factor', 1.0)
-    final_trim_end_ms = trim_end_ms if trim_end_ms is not None else voice_config.get('trim_end_ms', 0)
-    final_nr_level = nr_level if nr_level is not None else voice_config.get('nr_level', 0)
-    final_compress_thresh = compress_thresh if compress_thresh is not None else voice_config.get('compress_thresh', 1.0)
-    final_compress_ratio = compress_ratio if compress_ratio is not None else voice_config.get('compress_ratio', 1)
-    final_norm_frame_len = norm_frame_len if norm_frame_len is not None else voice_config.get('norm_frame_len', 10)
-    final_norm_gauss_size = norm_gauss_size if norm_gauss_size is not None else voice_config.get('norm_gauss_size', 3)
-    final_deesser_freq = deesser_freq if deesser_freq is not None else voice_config.get('deesser_freq', 3000)
-
-    # Determine boolean toggles (NOT from YAML, use passed value or default logic)
-    final_apply_ffmpeg = apply_ffmpeg_enhancement if apply_ffmpeg_enhancement is not None else True # Default ON
-    final_apply_deesser = apply_deesser if apply_deesser is not None else (True if voice != 'leo' else False) # Default ON except Leo
-
-    # Ensure final norm_gauss_size is odd if FFmpeg is applied
-    if final_apply_ffmpeg and final_norm_gauss_size % 2 == 0:
-        print(f"  Adjusting Norm Gauss size from {final_norm_gauss_size} to {final_norm_gauss_size - 1} (must be odd).")
-        final_norm_gauss_size -= 1
-
-    samplerate = None # Initialize samplerate
-    final_temp_path = None # Path for the final output of this function (created by mkstemp)
-    initial_temp_path = None # Path for the raw API output
-    ffmpeg_temp_path = None # Path for the FFmpeg processed output
-    processed_audio_path = None # Path to the audio file before pydub processing
-
     try:
         response = None
+        audio_content = None
+        if decoder is None:
+            decoder = WavStreamDecoder(on_frames=on_frames) # Decodes PCM while the response is still downloading
+        tts_cache = get_tts_cache() if use_cache else None
+        cache_key = None
+        if tts_cache:
+            # The legacy path talks to whatever server is at api_host:api_port, so both are part of the key
+            cache_key = tts_cache.make_key(f"openai-compatible:{api_host}:{api_port}", payload['model'], voice, speed, None, input_text)
+            audio_content = None if refresh_cache else tts_cache.get(cache_key)
+            if audio_content:
+                print(f"-> TTS cache hit ({cache_key[:12]}); skipping request.")
         try:
-            # Try OpenAI-compatible endpoint first with retry logic
-            print(f"Attempting OpenAI-compatible endpoint at {api_url}")
-            response = make_tts_request_with_retry(api_url, payload, headers, max_retries=max_retries, timeout=timeout)
+            if audio_content is None:
+                # Try OpenAI-compatible endpoint first with retry logic
+                print(f"Attempting OpenAI-compatible endpoint at {api_url}")
+                response = make_tts_request_with_retry(api_url, payload, headers, max_retries=max_retries, timeout=timeout, decoder=decoder)
+        except RequestCancelled:
+            return None, None
         except requests.exceptions.RequestException as api_err:
             print(f"!! OpenAI-compatible endpoint failed after all retries: {api_err}")
             
@@ -227,206 +267,229 @@ def generate_audio_segment(input_text, voice, speed, api_host, api_port, temp_di
             }
             try:
                 print(f"Attempting legacy endpoint at {legacy_url}")
-                response = make_tts_request_with_retry(legacy_url, legacy_payload, headers, max_retries=max_retries, timeout=timeout)
+                response = make_tts_request_with_retry(legacy_url, legacy_payload, headers, max_retries=max_retries, timeout=timeout, decoder=decoder)
+            except RequestCancelled:
+                return None, None
             except requests.exceptions.RequestException as legacy_err:
                 print(f"!! Legacy endpoint also failed after all retries: {legacy_err}")
                 print(f"!! CRITICAL: Unable to generate audio segment after all retry attempts.")
                 print(f"!! Please check TTS server status and try again.")
                 return None, None
 
-        if response.content and len(response.content) > 44: # Check for more than just header
-            # Use mkstemp for the *final* unique file name, we'll overwrite it later
-            # Ensure temp_dir is used for mkstemp
-            temp_fd, final_temp_path = tempfile.mkstemp(suffix=".wav", prefix="segment_", dir=temp_dir)
-            os.close(temp_fd)
-
-            # Create another temp file for the initial raw API output
-            # Ensure temp_dir is used for mkstemp
-            initial_fd, initial_temp_path = tempfile.mkstemp(suffix="_initial.wav", prefix="segment_", dir=temp_dir)
-            os.close(initial_fd)
-
-            try:
-                # --- 1. Save Initial API Response ---
-                with open(initial_temp_path, 'wb') as f_initial:
-                    f_initial.write(response.content)
-                print(f"-> Initial API response saved to {os.path.basename(initial_temp_path)}")
-                processed_audio_path = initial_temp_path # Default to initial if FFmpeg fails
-
-                # --- 2. FFmpeg Enhancement (Conditional) ---
-                if final_apply_ffmpeg: # Use the final determined boolean
-                    # Ensure temp_dir is used for mkstemp
-                    ffmpeg_temp_fd, ffmpeg_temp_path = tempfile.mkstemp(suffix="_ffmpeg.wav", prefix="segment_", dir=temp_dir)
-                    os.close(ffmpeg_temp_fd)
-                else:
-                    ffmpeg_temp_path = None # Ensure path is None if skipping
-                    print("  -> Skipping FFmpeg enhancement as requested.")
-
-                # Only run FFmpeg if requested and path was created
-                if final_apply_ffmpeg and ffmpeg_temp_path: # Use the final determined boolean
-                    try:
-                        # Build the ffmpeg audio filter string dynamically
-                        af_parts = []
-
-                        # Build filter chain in correct order using final parameter values
-                        filter_chain = []
-
-                        # 1. De-esser (if enabled)
-                        if final_apply_deesser: # Use final boolean
-                            filter_chain.append(f"firequalizer=gain='if(gte(f,{final_deesser_freq}),-5,0)'") # Use final freq
-
-                        # 2. Noise Reduction
-                        if final_nr_level > 0: # Only add NR if level is > 0
-                            filter_chain.append(f"afftdn=nr={final_nr_level}") # Use final level
-
-                        # 3. Compression
-                        comp_thresh_str = f"{final_compress_thresh:.3f}" # Use final thresh
-                        filter_chain.append(f"acompressor=threshold={comp_thresh_str}:ratio={final_compress_ratio}:attack=10:release=100") # Use final ratio
-
-                        # 4. Normalization (gauss size already ensured odd)
-                        filter_chain.append(f"dynaudnorm=f={final_norm_frame_len}:g={final_norm_gauss_size}") # Use final frame/gauss
-
-                        # Join all filters with commas
-                        audio_filter = ','.join(filter_chain)
-
-                        ffmpeg_command = [
-                            'ffmpeg',
-                            '-i', initial_temp_path,
-                            '-af', audio_filter,
-                            '-y', # Overwrite output
-                            ffmpeg_temp_path
-                        ]
-                        print(f"  Attempting FFmpeg enhancement: {' '.join(shlex.quote(arg) for arg in ffmpeg_command)}")
-                        result = subprocess.run(ffmpeg_command, capture_output=True, text=True, check=False)
-
-                        if result.returncode == 0 and os.path.exists(ffmpeg_temp_path) and os.path.getsize(ffmpeg_temp_path) > 44:
-                            processed_audio_path = ffmpeg_temp_path
-                            print(f"  -> SUCCESS: FFmpeg enhancement saved to: {os.path.basename(ffmpeg_temp_path)}")
-                        else:
-                            print(f"  !! Warning: FFmpeg processing failed or produced empty file. Using initial audio.")
-                            print(f"     Return Code: {result.returncode}")
-                            print(f"     Stderr: {result.stderr.strip()}")
-                            # processed_audio_path remains initial_temp_path
-                            # Clean up empty/failed ffmpeg file
-                            if os.path.exists(ffmpeg_temp_path):
-                                try: os.remove(ffmpeg_temp_path)
-                                except OSError: pass
-                            ffmpeg_temp_path = None # Mark as unused
-                    except FileNotFoundError:
-                        print(f"  !! Error: 'ffmpeg' command not found. Skipping enhancement.")
-                        processed_audio_path = initial_temp_path # Fallback
-                        ffmpeg_temp_path = None # Mark as unused
-                    except Exception as ffmpeg_e:
-                        print(f"  !! Warning: Error running FFmpeg processing: {ffmpeg_e}. Skipping enhancement.")
-                        processed_audio_path = initial_temp_path # Fallback
-                        if ffmpeg_temp_path and os.path.exists(ffmpeg_temp_path): # Clean up if created
-                            try: os.remove(ffmpeg_temp_path)
-                            except OSError: pass
-                        ffmpeg_temp_path = None # Mark as unused
-                else:
-                    # If FFmpeg was skipped, the initial path is the one to process
-                    processed_audio_path = initial_temp_path
-
-                # --- 3. Pydub Processing (Gain, Trim, Pad) ---
-                try:
-                    from pydub import AudioSegment # For audio manipulation (pip install pydub)
-                    pydub_available = True
-                except ImportError:
-                    pydub_available = False
-
-                if pydub_available:
-                    try:
-                        print(f"  Processing with pydub (Gain, Trim, Pad) on: {os.path.basename(processed_audio_path)}...")
-                        segment = AudioSegment.from_wav(processed_audio_path)
-                        samplerate = segment.frame_rate # Get samplerate from loaded segment
-
-                        # Apply Gain
-                        if final_gain_factor != 1.0 and final_gain_factor > 0: # Use final value
-                            print(f"    -> Applying gain: {final_gain_factor:.2f}x")
-                            # pydub uses dB for gain, convert factor to dB: dB = 20 * log10(factor)
-                            gain_db = 20 * np.log10(final_gain_factor) # Use final value
-                            segment = segment + gain_db # Add dB gain
-                            # Pydub handles clipping internally during export usually
-
-                        # Apply Trimming (from end)
-                        if final_trim_end_ms > 0 and len(segment) > final_trim_end_ms: # Use final value
-                            print(f"    -> Trimming {final_trim_end_ms}ms from end.") # Use final value
-                            segment = segment[:-final_trim_end_ms] # Use final value
-                        elif final_trim_end_ms > 0: # Use final value
-                             print(f"    -> Warning: Segment length ({len(segment)}ms) is less than trim duration ({final_trim_end_ms}ms). Skipping trim.") # Use final value
-
-
-                        # Apply Silence Padding (to end)
-                        if pad_end_ms > 0:
-                            print(f"    -> Padding {pad_end_ms}ms silence to end.")
-                            padding = AudioSegment.silent(duration=pad_end_ms, frame_rate=samplerate)
-                            segment = segment + padding
-                        else:
-                             print(f"    -> No end padding requested (pad_end_ms={pad_end_ms}).")
-
-
-                        # Export final processed audio to the final_temp_path (overwriting the initial empty file)
-                        print(f"  -> Exporting final processed audio to {os.path.basename(final_temp_path)}")
-                        segment.export(final_temp_path, format="wav")
-                        duration = len(segment) / 1000.0 # Duration in seconds
-                        print(f"  -> Final segment saved ({duration:.2f}s, SR: {samplerate} Hz)")
-                        return final_temp_path, samplerate # Return the path to the final overwritten file
-
-                    except Exception as pydub_e:
-                        print(f"!! Error during pydub processing: {pydub_e}")
-                        print(f"!! Falling back to using the pre-pydub audio: {os.path.basename(processed_audio_path)}")
-                        # If pydub fails, try to copy the ffmpeg/initial file to the final path
-                        try:
-                            shutil.copy2(processed_audio_path, final_temp_path)
-                            # Need to get samplerate if we didn't get it from pydub
-                            if samplerate is None:
-                                with sf.SoundFile(final_temp_path) as audio_info:
-                                    samplerate = audio_info.samplerate
-                            return final_temp_path, samplerate
-                        except Exception as copy_e:
-                             print(f"!! Error copying fallback audio: {copy_e}")
-                             return None, None # Indicate failure
-                else:
-                    # Pydub not available, copy the ffmpeg/initial file to the final path
-                    print("!! Pydub not available. Skipping gain, trim, and padding.")
-                    try:
-                        shutil.copy2(processed_audio_path, final_temp_path)
-                        # Need to get samplerate
-                        with sf.SoundFile(final_temp_path) as audio_info:
-                            samplerate = audio_info.samplerate
-                        return final_temp_path, samplerate
-                    except Exception as copy_e:
-                         print(f"!! Error copying non-pydub audio: {copy_e}")
-                         return None, None # Indicate failure
-
-            except Exception as e:
-                print(f"!! Error processing/saving segment: {e}")
-                return None, None # Indicate failure
-            finally:
-                # --- Cleanup Intermediate Files ---
-                if initial_temp_path and os.path.exists(initial_temp_path):
-                    try: os.remove(initial_temp_path)
-                    except OSError as e: print(f"  Warning: Could not remove initial temp file {initial_temp_path}: {e}")
-                if ffmpeg_temp_path and os.path.exists(ffmpeg_temp_path):
-                    try: os.remove(ffmpeg_temp_path)
-                    except OSError as e: print(f"  Warning: Could not remove ffmpeg temp file {ffmpeg_temp_path}: {e}")
-                # Do NOT remove final_temp_path here, it's the intended return value
-
-        else:
-            print(f"!! Received empty or invalid audio data (Size: {len(response.content)} bytes). Skipping segment.")
-            return None, None
+        streamed_audio = None
+        if audio_content is None:
+            audio_content = response.content
+            if decoder.header_ready:
+                streamed_audio = (decoder.audio(), decoder.samplerate)
+            if tts_cache and audio_content and len(audio_content) > 44:
+                tts_cache.put(cache_key, audio_content)
+
+        if audio_content and len(audio_content) > 44: # Check for more than just header
+            return audio_content, streamed_audio
+        print(f"!! Received empty or invalid audio data (Size: {len(audio_content) if audio_content else 0} bytes). Skipping segment.")
+        return None, None
 
     except requests.exceptions.RequestException as e:
         print(f"!! Error during API request: {e}")
         return None, None
     except Exception as e:
         print(f"!! An unexpected error occurred during generation: {e}")
-        # Clean up final_temp_path if it was created but an error occurred before return
-        if final_temp_path and os.path.exists(final_temp_path):
-             try: os.remove(final_temp_path)
-             except OSError as e: print(f"  Warning: Could not remove final temp file on error {final_temp_path}: {e}")
         return None, None
 
 
+@timed_stage('process')
+def process_audio_segment(audio_content, voice, temp_dir, decoded=None, voice_config=None,
+                          apply_deesser=None, deesser_freq=None, gain_factor=None, trim_end_ms=None,
+                          pad_end_ms=0, apply_ffmpeg_enhancement=None, nr_level=None,
+                          compress_thresh=None, compress_ratio=None, norm_frame_len=None, norm_gauss_size=None):
+    """
+    CPU stage of generate_audio_segment: resolves the voice's enhancement settings (explicit
+    arguments win over the voice YAML) and enhances, trims and pads audio_content.
+    Pass voice_config (e.g. tts_provider.get_voice_config(voice)) to use a provider's
+    settings instead of the YAML; its 'apply_deesser' entry is then honoured too.
+
+    Returns:
+        tuple: (path_to_final_file, samplerate) or (None, None) on failure.
+    """
+    if not audio_content:
+        return None, None
+
+    # --- Load Voice Configuration from YAML (unless the provider supplied one) ---
+    provider_config = voice_config is not None
+    if not provider_config:
+        voice_config = load_voice_config(voice)
+
+    # --- Determine Final Parameter Values ---
+    # Use passed value if not None, otherwise use value from loaded config
+    final_gain_factor = gain_factor if gain_factor is not None else voice_config.get('gain_factor', 1.0)
+    final_trim_end_ms = trim_end_ms if trim_end_ms is not None else voice_config.get('trim_end_ms', 0)
+    final_nr_level = nr_level if nr_level is not None else voice_config.get('nr_level', 0)
+    final_compress_thresh = compress_thresh if compress_thresh is not None else voice_config.get('compress_thresh', 1.0)
+    final_compress_ratio = compress_ratio if compress_ratio is not None else voice_config.get('compress_ratio', 1)
+    final_norm_frame_len = norm_frame_len if norm_frame_len is not None else voice_config.get('norm_frame_len', 10)
+    final_norm_gauss_size = norm_gauss_size if norm_gauss_size is not None else voice_config.get('norm_gauss_size', 3)
+    final_deesser_freq = deesser_freq if deesser_freq is not None else voice_config.get('deesser_freq', 3000)
+
+    # Determine boolean toggles (NOT from YAML, use passed value or default logic)
+    final_apply_ffmpeg = apply_ffmpeg_enhancement if apply_ffmpeg_enhancement is not None else True # Default ON
+    if apply_deesser is not None:
+        final_apply_deesser = apply_deesser
+    elif provider_config:
+        final_apply_deesser = voice_config.get('apply_deesser', True)
+    else:
+        final_apply_deesser = True if voice != 'leo' else False # Default ON except Leo
+
+    try:
+        # Enhance, gain, trim and pad in one pass; only the final segment file is written
+        final_temp_path, samplerate, applied_audio_filter = process_audio_data(audio_content, {
+            'apply_ffmpeg_enhancement': final_apply_ffmpeg,
+            'apply_deesser': final_apply_deesser,
+            'deesser_freq': final_deesser_freq,
+            'nr_level': final_nr_level,
+            'compress_thresh': final_compress_thresh,
+            'compress_ratio': final_compress_ratio,
+            'norm_frame_len': final_norm_frame_len,
+            'norm_gauss_size': final_norm_gauss_size,
+            'gain_factor': final_gain_factor,
+            'trim_end_ms': final_trim_end_ms,
+            'pad_end_ms': pad_end_ms,
+        }, temp_dir, decoded=decoded)
+    except Exception as e:
+        print(f"!! Error processing/saving segment: {e}")
+        return None, None
+    if final_temp_path is None:
+        return None, None
+    record_audio_enhancement(final_temp_path, applied_audio_filter)
+    return final_temp_path, samplerate
+
+
+def generate_audio_segment(input_text, voice, speed, api_host, api_port, temp_dir,
+                           # Parameters that can be overridden by function call
+                           apply_deesser=None, # Boolean toggle (True/False/None)
+                           deesser_freq=None,  # Explicit frequency or None
+                           gain_factor=None,   # Explicit gain or None
+                           trim_end_ms=None,   # Explicit trim or None
+                           pad_end_ms=0,       # Explicit padding (defaults to 0)
+                           apply_ffmpeg_enhancement=None, # Boolean toggle (True/False/None)
+                           nr_level=None,         # Explicit NR level or None
+                           compress_thresh=None,  # Explicit threshold or None
+                           compress_ratio=None,   # Explicit ratio or None
+                           norm_frame_len=None,   # Explicit frame len or None
+                           norm_gauss_size=None,  # Explicit gauss size or None
+                           max_retries=3,         # Maximum retry attempts
+                           timeout=180,           # Request timeout in seconds
+                           use_cache=True,        # Reuse/store raw audio in the TTS cache
+                           refresh_cache=False,   # Skip the cache lookup but store the new take
+                           on_frames=None,        # Raw PCM callback while downloading (see fetch_audio_segment)
+                           decoder=None):         # Decoder to feed / cancel through (see fetch_audio_segment)
+    """
+    Generates a single audio segment, optionally applies enhancement (de-ess, NR, compression, norm),
+    applies gain, trimming, and padding, and saves it to a temporary file (see processing.process_audio_data).
+    Default enhancement parameters are set based on the selected voice.
+    Runs fetch_audio_segment then process_audio_segment; pipelines can call the two stages separately.
+
+    Args:
+        input_text (str): Text to synthesize.
+        voice (str): Voice model name.
+        speed (float): Speech speed.
+        api_host (str): API hostname/IP.
+        api_port (int): API port.
+        temp_dir (str): Path to temporary directory.
+        gain_factor (float, optional): Gain multiplier. Defaults to 1.0.
+        trim_end_ms (int, optional): Milliseconds to trim from the end. Defaults to 120.
+        pad_end_ms (int, optional): Milliseconds of silence to pad at the end. Defaults to 0.
+        apply_ffmpeg_enhancement (bool, optional): Whether to apply FFmpeg processing. Defaults to True.
+        use_cache (bool, optional): Look up / store the raw server audio in the TTS cache. Defaults to True.
+        refresh_cache (bool, optional): Skip the lookup but still store the new audio, replacing
+            any cached take. Defaults to False.
+        on_frames (callable, optional): Called as on_frames(float32_array, samplerate) for each
+            batch of decoded, not yet enhanced, PCM while the response downloads.
+        decoder (WavStreamDecoder, optional): Decoder for the request; cancelling it stops the request.
+
+
+    Returns:
+        tuple: (path_to_final_file, samplerate) or (None, None) on failure.
+    """
+    audio_content, decoded = fetch_audio_segment(input_text, voice, speed, api_host, api_port,
+                                                 max_retries=max_retries, timeout=timeout, use_cache=use_cache,
+                                                 refresh_cache=refresh_cache, on_frames=on_frames, decoder=decoder)
+    if audio_content is None:
+        return None, None
+    return process_audio_segment(
+        audio_content, voice, temp_dir, decoded=decoded,
+        apply_deesser=apply_deesser, deesser_freq=deesser_freq, gain_factor=gain_factor,
+        trim_end_ms=trim_end_ms, pad_end_ms=pad_end_ms, apply_ffmpeg_enhancement=apply_ffmpeg_enhancement,
+        nr_level=nr_level, compress_thresh=compress_thresh, compress_ratio=compress_ratio,
+        norm_frame_len=norm_frame_len, norm_gauss_size=norm_gauss_size,
+    )
+
+
+@timed_stage('fetch')
+def fetch_audio_segment_with_provider(input_text: str, voice: str, speed: float, tts_provider: TTSProvider,
+                                      max_retries: int = 3, timeout: int = 180,
+                                      instructions: Optional[str] = None, use_cache: bool = True,
+                                      refresh_cache: bool = False, decoder: Optional[WavStreamDecoder] = None):
+    """
+    Network stage of generate_audio_segment_with_provider: raw audio from the TTS cache or the
+    provider (a single server or a PooledTTSProvider). refresh_cache=True skips the lookup and
+    overwrites the cached entry with the new audio. Cancelling `decoder` from another thread
+    stops the request (no further retries).
+
+    Returns:
+        tuple: (audio_bytes, decoded) where decoded is (float32 array, samplerate) when the
+            response was decoded while streaming, else None. (None, None) on failure.
+    """
+    print(f"\n{'='*60}")
+    print(f"TTS Provider: {tts_provider.name.upper()}")
+    print(f"Voice: {voice} | Speed: {speed}x")
+    print(f"{'='*60}")
+    
+    # Generate audio using provider
+    provider_kwargs = {}
+    if instructions and tts_provider.name == 'qwen3':
+        provider_kwargs['instructions'] = instructions
+    
+    audio_data = None
+    streamed_audio = None
+    tts_cache = get_tts_cache() if use_cache else None
+    cache_key = None
+    if tts_cache:
+        cache_key = tts_cache.make_key(tts_provider.name, getattr(tts_provider, 'model', None), voice, speed,
+                                       provider_kwargs.get('instructions'), input_text)
+        audio_data = None if refresh_cache else tts_cache.get(cache_key)
+        if audio_data:
+            try:
+                sf.info(io.BytesIO(audio_data))
+                print(f"-> TTS cache hit ({cache_key[:12]}); skipping request.")
+            except Exception as cache_e:
+                print(f"  Warning: Ignoring unreadable TTS cache entry {cache_key[:12]}: {cache_e}")
+                audio_data = None
+
+    if audio_data is None:
+        if decoder is None:
+            decoder = WavStreamDecoder() # Fed by the provider while the response downloads
+        audio_data, samplerate = tts_provider.generate_audio(
+            text=input_text,
+            voice=voice,
+            speed=speed,
+            output_format="wav",
+            max_retries=max_retries,
+            timeout=timeout,
+            decoder=decoder,
+            **provider_kwargs
+        )
+        if audio_data and decoder.header_ready:
+            streamed_audio = (decoder.audio(), decoder.samplerate)
+        if tts_cache and audio_data:
+            tts_cache.put(cache_key, audio_data)
+    
+    if audio_data is None:
+        if not decoder.cancelled: # A cancelled request was stopped on purpose
+            print("!! TTS generation failed")
+        return None, None
+    return audio_data, streamed_audio
+
+
 def generate_audio_segment_with_provider(
     input_text: str,
     voice: str,
@@ -449,6 +512,8 @@ def generate_audio_segment_with_provider(
     timeout: int = 180,
     # Provider-specific options
     instructions: Optional[str] = None,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
 ) -> Tuple[Optional[str], Optional[int]]:
     """
     Generates a single audio segment using the specified TTS provider.
@@ -476,163 +541,24 @@ def generate_audio_segment_with_provider(
         max_retries: Maximum retry attempts
         timeout: Request timeout
         instructions: Voice style/emotion instructions (Qwen3 only)
+        use_cache: Look up / store the raw provider audio in the TTS cache
+        refresh_cache: Skip the lookup but store the new audio, replacing any cached take
         
     Returns:
         Tuple of (path_to_audio_file, samplerate) or (None, None)
     """
-    print(f"\n{'='*60}")
-    print(f"TTS Provider: {tts_provider.name.upper()}")
-    print(f"Voice: {voice} | Speed: {speed}x")
-    print(f"{'='*60}")
-    
-    # Get voice configuration from provider
-    voice_config = tts_provider.get_voice_config(voice)
-    
-    # Determine final parameter values
-    final_gain_factor = gain_factor if gain_factor is not None else voice_config.get('gain_factor', 1.0)
-    final_trim_end_ms = trim_end_ms if trim_end_ms is not None else voice_config.get('trim_end_ms', 0)
-    final_nr_level = nr_level if nr_level is not None else voice_config.get('nr_level', 0)
-    final_compress_thresh = compress_thresh if compress_thresh is not None else voice_config.get('compress_thresh', 1.0)
-    final_compress_ratio = compress_ratio if compress_ratio is not None else voice_config.get('compress_ratio', 1)
-    final_norm_frame_len = norm_frame_len if norm_frame_len is not None else voice_config.get('norm_frame_len', 10)
-    final_norm_gauss_size = norm_gauss_size if norm_gauss_size is not None else voice_config.get('norm_gauss_size', 3)
-    final_deesser_freq = deesser_freq if deesser_freq is not None else voice_config.get('deesser_freq', 3000)
-    
-    final_apply_ffmpeg = apply_ffmpeg_enhancement if apply_ffmpeg_enhancement is not None else True
-    final_apply_deesser = apply_deesser if apply_deesser is not None else voice_config.get('apply_deesser', True)
-    
-    # Ensure norm_gauss_size is odd
-    if final_apply_ffmpeg and final_norm_gauss_size % 2 == 0:
-        final_norm_gauss_size -= 1
-    
-    # Generate audio using provider
-    provider_kwargs = {}
-    if instructions and tts_provider.name == 'qwen3':
-        provider_kwargs['instructions'] = instructions
-    
-    audio_data, samplerate = tts_provider.generate_audio(
-        text=input_text,
-        voice=voice,
-        speed=speed,
-        output_format="wav",
-        max_retries=max_retries,
-        timeout=timeout,
-        **provider_kwargs
-    )
-    
+    audio_data, decoded = fetch_audio_segment_with_provider(
+        input_text, voice, speed, tts_provider, max_retries=max_retries, timeout=timeout,
+        instructions=instructions, use_cache=use_cache, refresh_cache=refresh_cache)
     if audio_data is None:
-        print("!! TTS generation failed")
-        return None, None
-    
-    # Create temp file for final output
-    temp_fd, final_temp_path = tempfile.mkstemp(suffix=".wav", prefix="segment_", dir=temp_dir)
-    os.close(temp_fd)
-    
-    temp_fd, initial_temp_path = tempfile.mkstemp(suffix="_initial.wav", prefix="segment_", dir=temp_dir)
-    os.close(temp_fd)
-    
-    try:
-        # Save initial audio
-        with open(initial_temp_path, 'wb') as f:
-            f.write(audio_data)
-        print(f"-> Initial audio saved ({len(audio_data)} bytes)")
-        
-        processed_audio_path = initial_temp_path
-        ffmpeg_temp_path = None
-        
-        # Apply FFmpeg enhancements if requested
-        if final_apply_ffmpeg:
-            ffmpeg_fd, ffmpeg_temp_path = tempfile.mkstemp(suffix="_ffmpeg.wav", prefix="segment_", dir=temp_dir)
-            os.close(ffmpeg_fd)
-            
-            try:
-                filter_chain = []
-                
-                if final_apply_deesser:
-                    filter_chain.append(f"firequalizer=gain='if(gte(f,{final_deesser_freq}),-5,0)'")
-                
-                if final_nr_level > 0:
-                    filter_chain.append(f"afftdn=nr={final_nr_level}")
-                
-                comp_thresh_str = f"{final_compress_thresh:.3f}"
-                filter_chain.append(f"acompressor=threshold={comp_thresh_str}:ratio={final_compress_ratio}:attack=10:release=100")
-                filter_chain.append(f"dynaudnorm=f={final_norm_frame_len}:g={final_norm_gauss_size}")
-                
-                audio_filter = ','.join(filter_chain)
-                
-                ffmpeg_command = [
-                    'ffmpeg',
-                    '-i', initial_temp_path,
-                    '-af', audio_filter,
-                    '-y',
-                    ffmpeg_temp_path
-                ]
-                
-                print(f"  Applying FFmpeg enhancement...")
-                result = subprocess.run(ffmpeg_command, capture_output=True, text=True, check=False)
-                
-                if result.returncode == 0 and os.path.exists(ffmpeg_temp_path) and os.path.getsize(ffmpeg_temp_path) > 44:
-                    processed_audio_path = ffmpeg_temp_path
-                    print(f"  -> FFmpeg enhancement applied")
-                else:
-                    print(f"  !! FFmpeg failed, using original audio")
-                    if os.path.exists(ffmpeg_temp_path):
-                        os.remove(ffmpeg_temp_path)
-                    ffmpeg_temp_path = None
-                    
-            except Exception as e:
-                print(f"  !! FFmpeg error: {e}")
-                if ffmpeg_temp_path and os.path.exists(ffmpeg_temp_path):
-                    os.remove(ffmpeg_temp_path)
-                ffmpeg_temp_path = None
-        
-        # Apply pydub processing (gain, trim, pad)
-        try:
-            from pydub import AudioSegment
-            
-            print(f"  Processing with pydub...")
-            segment = AudioSegment.from_wav(processed_audio_path)
-            samplerate = segment.frame_rate
-            
-            if final_gain_factor != 1.0 and final_gain_factor > 0:
-                gain_db = 20 * np.log10(final_gain_factor)
-                segment = segment + gain_db
-                print(f"    -> Applied gain: {final_gain_factor:.2f}x")
-            
-            if final_trim_end_ms > 0 and len(segment) > final_trim_end_ms:
-                segment = segment[:-final_trim_end_ms]
-                print(f"    -> Trimmed {final_trim_end_ms}ms from end")
-            
-            if pad_end_ms > 0:
-                padding = AudioSegment.silent(duration=pad_end_ms, frame_rate=samplerate)
-                segment = segment + padding
-                print(f"    -> Added {pad_end_ms}ms silence")
-            
-            segment.export(final_temp_path, format="wav")
-            duration = len(segment) / 1000.0
-            print(f"  -> Final audio: {duration:.2f}s, {samplerate}Hz")
-            
-            # Cleanup
-            if initial_temp_path and os.path.exists(initial_temp_path):
-                os.remove(initial_temp_path)
-            if ffmpeg_temp_path and os.path.exists(ffmpeg_temp_path):
-                os.remove(ffmpeg_temp_path)
-            
-            return final_temp_path, samplerate
-            
-        except ImportError:
-            print("!! pydub not available, skipping audio processing")
-            shutil.copy2(processed_audio_path, final_temp_path)
-            return final_temp_path, samplerate
-            
-    except Exception as e:
-        print(f"!! Error in audio processing: {e}")
-        # Cleanup
-        for path in [final_temp_path, initial_temp_path]:
-            if path and os.path.exists(path):
-                try: os.remove(path)
-                except: pass
         return None, None
+    return process_audio_segment(
+        audio_data, voice, temp_dir, decoded=decoded, voice_config=tts_provider.get_voice_config(voice),
+        apply_deesser=apply_deesser, deesser_freq=deesser_freq, gain_factor=gain_factor,
+        trim_end_ms=trim_end_ms, pad_end_ms=pad_end_ms, apply_ffmpeg_enhancement=apply_ffmpeg_enhancement,
+        nr_level=nr_level, compress_thresh=compress_thresh, compress_ratio=compress_ratio,
+        norm_frame_len=norm_frame_len, norm_gauss_size=norm_gauss_size,
+    )
 
 
 def check_tts_health(provider_name: str = "qwen3", api_host: str = "127.0.0.1",
@@ -1,24 +1,16 @@
 import argparse
 import os
 
-# Import providers to get available voices
-from functions.tts.providers import Qwen3Provider, OrpheusProvider
+# Static voice tables (no provider instances or network clients needed to list voices)
+from functions.tts.providers.voices import QWEN3_VOICE_IDS, ORPHEUS_VOICE_IDS
+from functions.tts.providers.voices import ORPHEUS_VOICES as ORPHEUS_VOICES_BY_LANGUAGE
 
 # Define Voices for both providers
-QWEN3_VOICES = [v.id for v in Qwen3Provider().get_available_voices()]
-ORPHEUS_VOICES = [v.id for v in OrpheusProvider().get_available_voices()]
+QWEN3_VOICES = list(QWEN3_VOICE_IDS)
+ORPHEUS_VOICES = list(ORPHEUS_VOICE_IDS)
 
 # Legacy mapping for backward compatibility
-LANGUAGES_VOICES = {
-    'English': ['tara', 'leah', 'jess', 'leo', 'dan', 'mia', 'zac', 'zoe'],
-    'French': ['pierre', 'amelie', 'marie'],
-    'German': ['jana', 'thomas', 'max'],
-    'Korean': ['유나', '준서'],
-    'Hindi': ['ऋतिका'],
-    'Mandarin': ['长乐', '白芷'],
-    'Spanish': ['javi', 'sergio', 'maria'],
-    'Italian': ['pietro', 'giulia', 'carlo']
-}
+LANGUAGES_VOICES = {language: list(voices) for language, voices in ORPHEUS_VOICES_BY_LANGUAGE.items()}
 LANGUAGES = list(LANGUAGES_VOICES.keys())
 ALL_VOICES = QWEN3_VOICES + ORPHEUS_VOICES
 
@@ -57,6 +49,19 @@ def parse_tts_arguments():
                                 help='Qwen3 model to use (default: qwen3-tts-1.7b-customvoice)')
     provider_group.add_argument('--orpheus-port', type=int, default=5005,
                                 help='Port for Orpheus TTS API server (default: 5005)')
+    provider_group.add_argument('--tts-endpoints', type=str, default=None,
+                                help='Comma-separated host:port list of TTS servers (same provider) to load-balance '
+                                     'requests over, e.g. "gpu1:8000,gpu2:8000". Overrides --api-host/port.')
+    provider_group.add_argument('--tts-health-interval', type=float, default=30.0,
+                                help='Seconds between background health probes of --tts-endpoints (default: 30, 0 disables).')
+    provider_group.add_argument('--tts-breaker-cooldown', type=float, default=30.0,
+                                help='Seconds a failing or slow endpoint is taken out of rotation before it is '
+                                     'retried (default: 30).')
+    provider_group.add_argument('--tts-hedge', action='store_true',
+                                help='With several --tts-endpoints: when a line runs past the typical (p95) latency for '
+                                     'its length, send a duplicate to another endpoint and keep the first result.')
+    provider_group.add_argument('--tts-hedge-quantile', type=float, default=0.95,
+                                help='Latency quantile that triggers a hedged duplicate (default: 0.95).')
 
     # --- Input Arguments (Mutually Exclusive) ---
     group = parser.add_mutually_exclusive_group(required=True)
@@ -106,6 +111,11 @@ def parse_tts_arguments():
                              help='Path to audio file for guest voice cloning (MP3/WAV)')
     clone_group.add_argument('--guest-voice-text', type=str, default=None,
                              help='Transcript text spoken in guest voice sample (optional, improves quality)')
+    clone_group.add_argument('--voice-registry', type=str, default=None,
+                             help='JSON file remembering voices already cloned per server and sample '
+                                  '(default: outputs/cache/cloned_voices.json).')
+    clone_group.add_argument('--reclone-voices', action='store_true',
+                             help='Upload voice samples again even if the registry has a matching cloned voice.')
     parser.add_argument('--output', type=str, default='output_speech.wav',
                         help='Output filename for the generated audio (default: output_speech.wav).')
     parser.add_argument('--dev', action='store_true',
@@ -115,7 +125,34 @@ def parse_tts_arguments():
     parser.add_argument('--tts-max-retries', type=int, default=3,
                         help='Maximum number of retry attempts for failed TTS requests (default: 3).')
     parser.add_argument('--tts-timeout', type=int, default=180,
-                        help='Timeout in seconds for each TTS request (default: 180).')
+                        help='Timeout in seconds for each TTS request (default: 180). Once a few requests to an '
+                             'endpoint/voice have completed, timeouts are derived from their latency and the line length.')
+    parser.add_argument('--tts-latency-state', type=str, default=None,
+                        help='JSON file where the per-endpoint TTS latency model is kept between runs '
+                             '(default: outputs/cache/tts_latency.json).')
+    parser.add_argument('--no-adaptive-timeout', action='store_true',
+                        help='Always use --tts-timeout instead of timeouts derived from measured latency.')
+    parser.add_argument('--tts-concurrency', type=int, default=1,
+                        help='Number of script lines to synthesize concurrently (default: 1). '
+                             'Results are still assembled in script order with the same padding.')
+    parser.add_argument('--audio-workers', type=int, default=0,
+                        help='Threads that enhance/trim/pad finished lines while synthesis continues with the next ones '
+                             '(default: 0: each line is post-processed right after its synthesis, on the same thread).')
+    parser.add_argument('--tts-cache-dir', type=str, default=None,
+                        help='Directory for the on-disk cache of raw TTS audio (default: outputs/cache/tts).')
+    parser.add_argument('--tts-cache-size-mb', type=float, default=2048,
+                        help='Size cap for the TTS cache in MB; least-recently-used entries are evicted (default: 2048).')
+    parser.add_argument('--no-tts-cache', action='store_true',
+                        help='Always re-synthesize every line instead of reusing cached TTS audio.')
+    parser.add_argument('--audio-backend', choices=['numpy', 'ffmpeg', 'ffmpeg-batch'], default='numpy',
+                        help="Audio enhancement backend: 'numpy' runs de-ess/NR/compression/normalization in-process "
+                             "(default); 'ffmpeg' uses the FFmpeg subprocess + pydub chain; 'ffmpeg-batch' filters "
+                             "several segments per FFmpeg process (pair with --tts-concurrency).")
+    parser.add_argument('--ffmpeg-batch-size', type=int, default=16,
+                        help="Maximum segments per FFmpeg process with --audio-backend ffmpeg-batch (default: 16).")
+    parser.add_argument('--stage-timings', type=str, default=None,
+                        help='Write per-stage timings (fetch, process, resample, synthesis, concatenate) as JSON '
+                             'to this file when the run ends (see benchmarks/pipeline_benchmark.py).')
 
     # --- Video Generation Arguments (used when --dev is enabled) ---
     video_group = parser.add_argument_group('Video Generation Options (--dev mode only)')
@@ -133,8 +170,14 @@ def parse_tts_arguments():
                              help='CRF value for intermediate video segments (0-51, lower is better quality).')
     video_group.add_argument('--video-final-audio-bitrate', default='192k',
                              help='Bitrate for final AAC audio encoding (e.g., 128k, 192k).')
+    video_group.add_argument('--video-engine', choices=['moviepy', 'ffmpeg'], default='moviepy',
+                             help="Segment render engine: 'moviepy' (per-frame compositing) or 'ffmpeg' (one overlay filtergraph per segment, much faster for static art).")
+    video_group.add_argument('--video-single-pass', action='store_true',
+                             help='Render the episode in one FFmpeg encode (master audio + image timeline) with no intermediate segment files.')
     video_group.add_argument('--video-workers', type=int, default=None,
-                             help='Number of worker processes for video generation. Defaults to CPU count.')
+                             help='Number of worker processes for video generation. Defaults to a plan based on CPU count, resolution and memory budget.')
+    video_group.add_argument('--video-memory-budget', type=str, default=None,
+                             help='Memory the video render pool may use (e.g. 8G, 1536M). Defaults to 75%% of available RAM.')
     video_group.add_argument('--video-keep-temp', action='store_true',
                              help='Keep temporary video segment files after completion.')
 
@@ -150,6 +193,8 @@ def parse_tts_arguments():
             args.qwen3_port = args.port
         else:
             args.orpheus_port = args.port
+    else:
+        args.port = args.qwen3_port if provider == 'qwen3' else args.orpheus_port
     
     # Set default voices based on provider
     if args.host_voice is None:
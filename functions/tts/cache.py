@@ -0,0 +1,158 @@
+import os
+import hashlib
+import json
+import threading
+import uuid
+
+# Override print function to force immediate flushing for real-time output
+original_print = print
+def print(*args, **kwargs):
+    kwargs.setdefault('flush', True)
+    return original_print(*args, **kwargs)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+DEFAULT_TTS_CACHE_DIR = os.path.join(PROJECT_ROOT, 'outputs', 'cache', 'tts')
+DEFAULT_TTS_CACHE_MAX_MB = 2048
+TTS_CACHE_VERSION = 1 # Bump to invalidate every cached response
+
+
+class TTSCache:
+    """
+    Content-addressed on-disk cache of raw provider audio.
+
+    Entries are keyed by (provider, model, voice, speed, instructions, exact text) and stored
+    as <sha256>.wav. Reads refresh the file's mtime, and writes evict least-recently-used
+    entries until the cache fits in max_bytes. Writes are atomic (temp file + os.replace),
+    so concurrent synthesis threads and parallel runs can share one directory.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_TTS_CACHE_DIR, max_bytes=DEFAULT_TTS_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None # Computed lazily on first write
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(provider, model, voice, speed, instructions, text):
+        """Returns the hex key for one synthesis request."""
+        payload = json.dumps({
+            'v': TTS_CACHE_VERSION,
+            'provider': provider,
+            'model': model,
+            'voice': voice,
+            'speed': float(speed) if speed is not None else None,
+            'instructions': instructions,
+            'text': text,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def get(self, key):
+        """Returns the cached audio bytes for key, or None. A hit marks the entry as recently used."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Stores audio bytes under key, then evicts LRU entries beyond the size cap."""
+        if not data:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"  Warning: Could not write TTS cache entry {key[:12]}: {e}")
+            if os.path.exists(tmp_path):
+                try: os.remove(tmp_path)
+                except OSError: pass
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.wav'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Removes least-recently-used entries until the cache is within max_bytes. Caller holds the lock."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        self._total_bytes = total
+        if removed:
+            print(f"-> TTS cache: evicted {removed} least-recently-used entr{'y' if removed == 1 else 'ies'} ({total / (1024 * 1024):.1f} MB kept)")
+
+    def summary(self):
+        return f"{self.hits} hit(s), {self.misses} miss(es)"
+
+
+# Process-wide cache used by the generate_audio_segment* functions (None = disabled)
+_tts_cache = None
+_tts_cache_configured = False
+
+
+def configure_tts_cache(cache_dir=None, max_mb=None, enabled=True):
+    """Sets up (or disables) the process-wide TTS cache. Returns the cache or None."""
+    global _tts_cache, _tts_cache_configured
+    _tts_cache_configured = True
+    if not enabled:
+        _tts_cache = None
+        print("-> TTS cache disabled.")
+        return None
+    max_mb = DEFAULT_TTS_CACHE_MAX_MB if max_mb is None else max_mb
+    _tts_cache = TTSCache(cache_dir or DEFAULT_TTS_CACHE_DIR, int(max_mb * 1024 * 1024))
+    print(f"-> TTS cache: {_tts_cache.cache_dir} (limit {max_mb} MB)")
+    return _tts_cache
+
+
+def get_tts_cache():
+    """Returns the process-wide TTS cache, creating one with defaults on first use."""
+    if not _tts_cache_configured:
+        configure_tts_cache()
+    return _tts_cache
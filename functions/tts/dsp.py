@@ -0,0 +1,173 @@
+"""
+In-process audio enhancement chain operating on float32 NumPy arrays.
+
+Mirrors the FFmpeg chain used for TTS segments (de-esser -> noise reduction ->
+compressor -> dynamic normalizer) followed by gain, trim and pad, without any
+subprocess or intermediate file. Arrays are shaped (samples,) or (samples, channels).
+"""
+import io
+import numpy as np
+import soundfile as sf
+from scipy import signal
+from scipy.ndimage import minimum_filter1d
+
+EPS = 1e-9
+
+
+def decode_wav_bytes(audio_bytes):
+    """Decodes WAV bytes (e.g. a TTS response body) into (float32 array, samplerate)."""
+    data, samplerate = sf.read(io.BytesIO(audio_bytes), dtype='float32')
+    return data, samplerate
+
+
+def _mono_abs(audio):
+    """Per-sample peak magnitude across channels."""
+    return np.abs(audio) if audio.ndim == 1 else np.abs(audio).max(axis=1)
+
+
+def _per_sample(gain, audio):
+    """Broadcasts a (samples,) gain curve over the audio's channels."""
+    return gain if audio.ndim == 1 else gain[:, None]
+
+
+def envelope_follower(magnitude, samplerate, attack_ms, release_ms, block_ms=1.0):
+    """
+    Attack/release peak envelope of a magnitude signal. The recursion runs on 1 ms block
+    peaks (not per sample) and is interpolated back, which keeps it cheap in pure Python.
+    """
+    n = len(magnitude)
+    if n == 0:
+        return magnitude.astype(np.float32)
+    block = max(1, int(samplerate * block_ms / 1000.0))
+    n_blocks = -(-n // block)
+    padded = np.zeros(n_blocks * block, dtype=np.float32)
+    padded[:n] = magnitude
+    peaks = padded.reshape(n_blocks, block).max(axis=1)
+
+    attack = np.exp(-block_ms / max(attack_ms, EPS))
+    release = np.exp(-block_ms / max(release_ms, EPS))
+    env = np.empty(n_blocks, dtype=np.float32)
+    level = 0.0
+    for i, peak in enumerate(peaks.tolist()):
+        coeff = attack if peak > level else release
+        level = coeff * level + (1.0 - coeff) * peak
+        env[i] = level
+    centers = (np.arange(n_blocks) + 0.5) * block
+    return np.interp(np.arange(n), centers, env).astype(np.float32)
+
+
+def deess(audio, samplerate, freq, max_reduction_db=5.0, threshold_db=-30.0):
+    """
+    Sidechain de-esser: splits off the band above `freq` (high shelf) and turns it down by
+    up to max_reduction_db while its envelope is above threshold_db. Low band is untouched.
+    """
+    if freq <= 0 or freq >= samplerate / 2:
+        return audio
+    sos = signal.butter(4, freq, btype='highpass', fs=samplerate, output='sos')
+    high = signal.sosfilt(sos, audio, axis=0).astype(np.float32)
+    env = envelope_follower(_mono_abs(high), samplerate, attack_ms=1.0, release_ms=50.0)
+    over_db = 20.0 * np.log10(np.maximum(env, EPS) / 10 ** (threshold_db / 20.0))
+    reduction_db = np.clip(over_db, 0.0, max_reduction_db)
+    gain = (10 ** (-reduction_db / 20.0)).astype(np.float32)
+    return audio + high * (_per_sample(gain, audio) - 1.0)
+
+
+def _gate_channel(x, samplerate, reduction_db, n_fft, threshold_factor):
+    if len(x) < n_fft:
+        return x
+    noverlap = n_fft * 3 // 4
+    _, _, spec = signal.stft(x, fs=samplerate, nperseg=n_fft, noverlap=noverlap)
+    magnitude = np.abs(spec)
+    # Noise profile from the quietest 10% of frames (TTS output has little true silence)
+    frame_energy = magnitude.mean(axis=0)
+    quiet = frame_energy <= np.percentile(frame_energy, 10)
+    noise_profile = magnitude[:, quiet].mean(axis=1, keepdims=True)
+    floor = 10 ** (-reduction_db / 20.0)
+    mask = np.where(magnitude > noise_profile * threshold_factor, 1.0, floor)
+    # Smooth the mask over neighbouring bins/frames to avoid musical noise
+    kernel = np.ones((3, 5)) / 15.0
+    mask = signal.convolve2d(mask, kernel, mode='same', boundary='symm')
+    _, y = signal.istft(spec * mask, fs=samplerate, nperseg=n_fft, noverlap=noverlap)
+    out = np.zeros_like(x)
+    out[:min(len(x), len(y))] = y[:len(x)]
+    return out
+
+
+def spectral_gate(audio, samplerate, reduction_db, n_fft=1024, threshold_factor=1.5):
+    """Spectral-gate noise reduction: bins below the estimated noise floor are attenuated by reduction_db."""
+    if reduction_db <= 0:
+        return audio
+    if audio.ndim == 1:
+        return _gate_channel(audio, samplerate, reduction_db, n_fft, threshold_factor).astype(np.float32)
+    return np.stack([_gate_channel(audio[:, ch], samplerate, reduction_db, n_fft, threshold_factor)
+                     for ch in range(audio.shape[1])], axis=1).astype(np.float32)
+
+
+def compress(audio, samplerate, threshold, ratio, attack_ms=10.0, release_ms=100.0):
+    """Feed-forward peak compressor with the same threshold (linear) / ratio meaning as acompressor."""
+    if ratio <= 1 or threshold >= 1 or threshold <= 0:
+        return audio
+    env = envelope_follower(_mono_abs(audio), samplerate, attack_ms, release_ms)
+    gain = np.ones_like(env)
+    over = env > threshold
+    gain[over] = (threshold * (env[over] / threshold) ** (1.0 / ratio)) / env[over]
+    return audio * _per_sample(gain, audio)
+
+
+def dynamic_normalize(audio, samplerate, frame_len_ms, gauss_size, target_peak=0.95, max_gain=10.0):
+    """
+    Frame-based normalizer in the spirit of dynaudnorm: per-frame peak gains, a minimum
+    filter (so a loud frame never gets boosted by its quiet neighbours) and a Gaussian
+    smoothing window of gauss_size frames, interpolated back to per-sample gain. The
+    interpolated gain can overshoot a frame's own limit near loud transients, so it is
+    finally capped per sample to keep |output| <= target_peak.
+    """
+    n = len(audio)
+    frame = max(1, int(samplerate * frame_len_ms / 1000.0))
+    if n == 0:
+        return audio
+    n_frames = -(-n // frame)
+    padded = np.zeros(n_frames * frame, dtype=np.float32)
+    padded[:n] = _mono_abs(audio)
+    peaks = padded.reshape(n_frames, frame).max(axis=1)
+    gains = np.minimum(target_peak / np.maximum(peaks, EPS), max_gain)
+
+    size = max(1, int(gauss_size) | 1) # Odd window, like dynaudnorm's g
+    if size > 1 and n_frames > 1:
+        gains = minimum_filter1d(gains, size=size, mode='nearest')
+        window = signal.windows.gaussian(size, std=size / 6.0)
+        window /= window.sum()
+        half = size // 2
+        gains = np.convolve(np.pad(gains, half, mode='edge'), window, mode='valid')
+    centers = (np.arange(n_frames) + 0.5) * frame
+    gain = np.interp(np.arange(n), centers, gains).astype(np.float32)
+    gain = np.minimum(gain, target_peak / np.maximum(padded[:n], EPS))
+    return audio * _per_sample(gain, audio)
+
+
+def apply_gain_trim_pad(audio, samplerate, gain_factor=1.0, trim_end_ms=0, pad_end_ms=0):
+    """Gain multiplier, trim from the end (skipped if longer than the audio), then silence padding."""
+    if gain_factor != 1.0 and gain_factor > 0:
+        audio = audio * gain_factor
+    trim_samples = int(samplerate * trim_end_ms / 1000.0)
+    if trim_samples > 0 and len(audio) > trim_samples:
+        audio = audio[:-trim_samples]
+    pad_samples = int(samplerate * pad_end_ms / 1000.0)
+    if pad_samples > 0:
+        audio = np.concatenate([audio, np.zeros((pad_samples,) + audio.shape[1:], dtype=audio.dtype)])
+    return audio
+
+
+def enhance(audio, samplerate, apply_deesser=True, deesser_freq=3000, nr_level=0,
+            compress_thresh=1.0, compress_ratio=1, norm_frame_len=10, norm_gauss_size=3):
+    """Runs de-esser -> spectral gate -> compressor -> normalizer, in the FFmpeg chain's order."""
+    audio = audio.astype(np.float32, copy=False)
+    if len(audio) == 0:
+        return audio
+    if apply_deesser:
+        audio = deess(audio, samplerate, deesser_freq)
+    if nr_level > 0:
+        audio = spectral_gate(audio, samplerate, nr_level)
+    audio = compress(audio, samplerate, compress_thresh, compress_ratio)
+    audio = dynamic_normalize(audio, samplerate, norm_frame_len, norm_gauss_size)
+    return audio
@@ -11,6 +11,7 @@ from functions.tts.api import generate_audio_segment
 from functions.tts.utils import load_voice_config
 from functions.tts.args import LANGUAGES_VOICES, LANGUAGES # Import constants from args
 from functions.tts.gui import widgets # Import widgets for helper functions
+from functions.tts.gui.player import StreamingPreview
 
 # Constants (re-defined for handlers, consider centralizing if truly global)
 NO_MUSIC = "None"
@@ -714,7 +715,7 @@ def redo_segment(app_instance):
         print("  -> FFmpeg Enhancement: Disabled (including De-esser)")
     print(f"  -> Old File: {old_file_path}")
 
-    app_instance.player.stop()
+    app_instance.player.stop_all()
 
     app_instance.progress_bar.grid(**app_instance.progress_bar_grid_config)
     app_instance.progress_bar.start(10)
@@ -734,6 +735,11 @@ def _thread_generate_audio(app_instance, text, voice, original_index, old_file_p
     details = app_instance.reviewable_segment_details.get(app_instance.current_gui_selection, {})
     apply_deesser = details.get('apply_deesser', True)
     deesser_freq = details.get('deesser_freq', 5000)
+
+    # Start hearing the new take while it downloads; enhancement still runs on the full line
+    preview = StreamingPreview()
+    if preview.available:
+        app_instance.player.preview = preview
     
     new_file_path, new_sr = generate_audio_segment(
         text, voice, app_instance.speed, app_instance.api_host, app_instance.api_port, app_instance.temp_dir,
@@ -746,8 +752,11 @@ def _thread_generate_audio(app_instance, text, voice, original_index, old_file_p
         compress_thresh=compress_thresh,
         compress_ratio=compress_ratio,
         norm_frame_len=norm_frame_len,
-        norm_gauss_size=norm_gauss_size
+        norm_gauss_size=norm_gauss_size,
+        refresh_cache=True, # Redo asks the server for a fresh take and replaces the cached one
+        on_frames=preview.on_frames if preview.available else None
     )
+    preview.finish()
     app_instance.root.after(0, _finish_redo_ui, app_instance, new_file_path, original_index, old_file_path)
 
 def _finish_redo_ui(app_instance, new_file_path, original_index, old_file_path):
@@ -139,7 +139,7 @@ class TTSDevGUI:
 
         # Bind keyboard shortcuts
         self.root.bind('<Control-r>', lambda e: handlers.redo_segment(self))
-        self.root.bind('<Escape>', lambda e: self.player.stop() if self.player else None)
+        self.root.bind('<Escape>', lambda e: self.player.stop_all() if self.player else None)
 
         # Create main layout
         self.create_widgets()
@@ -3,6 +3,7 @@ from tkinter import ttk, messagebox
 import threading
 import time
 import os
+import numpy as np
 import soundfile as sf
 import pygame
 
@@ -22,6 +23,97 @@ except ImportError:
     print("Warning: 'pygame' library not found. pip install pygame")
     pygame = None
 
+class StreamingPreview:
+    """
+    Plays a TTS line while it is still downloading. Pass on_frames to generate_audio_segment:
+    decoded PCM batches are collected, converted to the mixer's format and played on a
+    pygame Channel in short Sounds queued back to back. This is the raw server audio; the
+    enhanced segment is loaded into the AudioPlayer as usual once it is ready.
+    """
+    MIN_CHUNK_SECONDS = 0.25 # Audio gathered before a Sound is queued (fewer, larger sounds = no gaps)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = [] # Decoded float32 batches not yet handed to the mixer
+        self._pending_frames = 0
+        self._samplerate = None
+        self._finished = False
+        self._stopped = False
+        self.started = time.monotonic()
+        self.first_audio_at = None
+        self.channel = None
+        self.mixer_format = pygame.mixer.get_init() if pygame else None
+        if self.mixer_format and abs(self.mixer_format[1]) == 16:
+            self.channel = pygame.mixer.find_channel(True)
+        if self.channel:
+            threading.Thread(target=self._run, name='tts-preview', daemon=True).start()
+
+    @property
+    def available(self):
+        return self.channel is not None
+
+    def on_frames(self, frames, samplerate):
+        """WavStreamDecoder callback (runs on the download thread; must not raise)."""
+        if not self.channel or self._stopped:
+            return
+        with self._lock:
+            if self._samplerate not in (None, samplerate): # A retry at another rate: start over
+                self._pending, self._pending_frames = [], 0
+            self._samplerate = samplerate
+            self._pending.append(frames)
+            self._pending_frames += len(frames)
+
+    def finish(self):
+        """No more frames will arrive; whatever is pending is still played."""
+        self._finished = True
+
+    def stop(self):
+        self._stopped = True
+        if self.channel:
+            try:
+                self.channel.stop()
+            except Exception as e:
+                print(f"StreamingPreview: Error stopping channel: {e}")
+
+    def _to_sound(self, frames, samplerate):
+        """float32 (n,) or (n, ch) -> pygame Sound in the mixer's rate and channel count."""
+        mixer_rate, _, mixer_channels = self.mixer_format
+        if frames.ndim == 1:
+            frames = frames[:, None]
+        if samplerate != mixer_rate and len(frames) > 1: # Linear interpolation is plenty for a preview
+            positions = np.arange(int(len(frames) * mixer_rate / samplerate)) * (samplerate / mixer_rate)
+            frames = np.stack([np.interp(positions, np.arange(len(frames)), frames[:, ch])
+                               for ch in range(frames.shape[1])], axis=1)
+        if frames.shape[1] != mixer_channels:
+            frames = np.repeat(frames.mean(axis=1, keepdims=True), mixer_channels, axis=1)
+        pcm = (np.clip(frames, -1.0, 1.0) * 32767).astype('<i2')
+        return pygame.mixer.Sound(buffer=pcm.tobytes())
+
+    def _run(self):
+        while not self._stopped:
+            with self._lock:
+                samplerate = self._samplerate
+                ready = samplerate is not None and (self._pending_frames >= self.MIN_CHUNK_SECONDS * samplerate
+                                                    or (self._finished and self._pending_frames))
+                if ready and self.channel.get_queue() is None:
+                    batch, self._pending, self._pending_frames = self._pending, [], 0
+                else:
+                    batch = None
+                done = self._finished and not self._pending
+            if batch:
+                try:
+                    self.channel.queue(self._to_sound(np.concatenate(batch), samplerate)) # Plays at once if idle
+                except Exception as e:
+                    print(f"StreamingPreview: Playback error, preview stopped: {e}")
+                    return
+                if self.first_audio_at is None:
+                    self.first_audio_at = time.monotonic()
+                    print(f"StreamingPreview: Playing {self.first_audio_at - self.started:.2f}s after the request started.")
+            elif done:
+                return
+            time.sleep(0.02)
+
+
 class AudioPlayer(ttk.Frame):
     def __init__(self, parent, redo_command=None, waveform_ax=None, waveform_canvas_agg=None):
         super().__init__(parent)
@@ -33,6 +125,7 @@ class AudioPlayer(ttk.Frame):
         self.current_file = None
         self.is_playing = False
         self.current_pos = 0
+        self.preview = None # StreamingPreview of a line being regenerated
 
         self.controls_frame = ttk.Frame(self)
         self.controls_frame.pack(side=tk.TOP, fill=tk.X, padx=5, pady=(5, 2))
@@ -40,7 +133,7 @@ class AudioPlayer(ttk.Frame):
         self.play_btn = ttk.Button(self.controls_frame, text="Play", width=5, command=self.toggle_play, state=tk.DISABLED)
         self.play_btn.pack(side=tk.LEFT, padx=2)
 
-        self.stop_btn = ttk.Button(self.controls_frame, text="Stop", width=5, command=self.stop, state=tk.DISABLED)
+        self.stop_btn = ttk.Button(self.controls_frame, text="Stop", width=5, command=self.stop_all, state=tk.DISABLED)
         self.stop_btn.pack(side=tk.LEFT, padx=2)
 
         self.redo_btn = ttk.Button(self.controls_frame, text="Redo", width=5, command=self.redo_command, state=tk.DISABLED)
@@ -109,6 +202,7 @@ class AudioPlayer(ttk.Frame):
             except Exception as e:
                  print(f"AudioPlayer: Error pausing music: {e}")
         else:
+            self.stop_preview() # Playing the finished segment replaces the raw preview
             try:
                 if not pygame.mixer.music.get_busy():
                      print("AudioPlayer: Music not busy, reloading and playing from start/seek pos.")
@@ -152,6 +246,16 @@ class AudioPlayer(ttk.Frame):
         else:
             self.stop_btn.configure(state=tk.DISABLED)
 
+    def stop_preview(self):
+        if self.preview:
+            self.preview.stop()
+            self.preview = None
+
+    def stop_all(self):
+        """Stop button / Escape: the loaded segment and any streaming preview."""
+        self.stop_preview()
+        self.stop()
+
     def seek_to_time(self, target_time):
         """Seeks playback to the specified time (in seconds)."""
         if not self.current_file or not pygame or not pygame.mixer.get_init():
@@ -271,4 +375,5 @@ class AudioPlayer(ttk.Frame):
         """Stop playback and cleanup resources"""
         print("AudioPlayer: Cleanup called.")
         self.is_playing = False
+        self.stop_preview()
         self.stop()
\ No newline at end of file
@@ -0,0 +1,207 @@
+import os
+import json
+import math
+import threading
+import time
+import uuid
+
+# Override print function to force immediate flushing for real-time output
+original_print = print
+def print(*args, **kwargs):
+    kwargs.setdefault('flush', True)
+    return original_print(*args, **kwargs)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+DEFAULT_LATENCY_STATE_PATH = os.path.join(PROJECT_ROOT, 'outputs', 'cache', 'tts_latency.json')
+LATENCY_STATE_VERSION = 1
+
+DECAY = 0.9             # Weight kept by older observations per new one (~10-request memory)
+MIN_SAMPLES = 3         # Below this the caller's fixed timeout is used
+SAFETY_FACTOR = 1.5     # Headroom over the predicted duration
+DEVIATIONS = 4          # Plus this many residual standard deviations (like TCP's RTO)
+MIN_SLACK = 5.0         # Seconds always added (connection setup, queueing)
+MIN_TIMEOUT = 10.0
+MAX_TIMEOUT = 1800.0    # Long lines may legitimately need far more than the 180s default
+TIMEOUT_ESCALATION = 2.0 # Each retry after a timeout waits this much longer
+SAVE_EVERY = 20         # Persist after this many new observations (and on save())
+
+
+class LatencyModel:
+    """
+    Rolling model of TTS request duration per (endpoint, voice, model).
+
+    Each key keeps exponentially-decayed sums for a weighted least-squares fit of
+    seconds = overhead + seconds_per_char * chars, plus the residual spread. Request
+    timeouts are derived from it: predicted * SAFETY_FACTOR + DEVIATIONS * spread + MIN_SLACK,
+    clamped to [MIN_TIMEOUT, MAX_TIMEOUT]. State persists across runs in a small JSON file
+    (written atomically).
+    """
+
+    def __init__(self, path=DEFAULT_LATENCY_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._entries = self._load()
+
+    @staticmethod
+    def make_key(endpoint, voice, model):
+        return f"{endpoint}|{voice}|{model or ''}"
+
+    def _load(self):
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"  Warning: Ignoring unreadable TTS latency state {self.path}: {e}")
+            return {}
+        if data.get('version') != LATENCY_STATE_VERSION:
+            return {}
+        return data.get('entries', {})
+
+    def save(self):
+        """Writes the model to its state file (no-op if nothing changed)."""
+        with self._lock:
+            if not self.path or not self._unsaved:
+                return
+            payload = {'version': LATENCY_STATE_VERSION, 'entries': self._entries}
+            self._unsaved = 0
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  Warning: Could not write TTS latency state {self.path}: {e}")
+            if os.path.exists(tmp_path):
+                try: os.remove(tmp_path)
+                except OSError: pass
+
+    def record(self, key, chars, seconds):
+        """Adds one successful request's duration."""
+        x, y = float(max(1, chars)), float(seconds)
+        with self._lock:
+            e = self._entries.get(key) or {'w': 0.0, 'sx': 0.0, 'sxx': 0.0, 'sy': 0.0, 'sxy': 0.0, 'syy': 0.0, 'n': 0}
+            for name in ('w', 'sx', 'sxx', 'sy', 'sxy', 'syy'):
+                e[name] *= DECAY
+            e['w'] += 1.0
+            e['sx'] += x
+            e['sxx'] += x * x
+            e['sy'] += y
+            e['sxy'] += x * y
+            e['syy'] += y * y
+            e['n'] += 1
+            e['updated'] = time.time()
+            self._entries[key] = e
+            self._unsaved += 1
+            save_now = self._unsaved >= SAVE_EVERY
+        if save_now:
+            self.save()
+
+    @staticmethod
+    def _fit(e):
+        """(overhead_s, seconds_per_char, residual_std) from an entry's decayed sums."""
+        w, sx, sxx, sy, sxy, syy = e['w'], e['sx'], e['sxx'], e['sy'], e['sxy'], e['syy']
+        mean_x = sx / w
+        var_x = sxx / w - mean_x * mean_x
+        slope = None
+        if var_x > (0.1 * mean_x) ** 2: # Line lengths vary enough to separate overhead from rate
+            slope = (sxy / w - mean_x * sy / w) / var_x
+            intercept = sy / w - slope * mean_x
+            if slope <= 0 or intercept < 0:
+                slope = None
+        if slope is None: # Pure rate through the origin
+            intercept, slope = 0.0, sxy / sxx
+        residual = (syy - 2 * intercept * sy - 2 * slope * sxy
+                    + intercept * intercept * w + 2 * intercept * slope * sx + slope * slope * sxx) / w
+        return intercept, slope, math.sqrt(max(0.0, residual))
+
+    def predict(self, key, chars):
+        """(expected_seconds, residual_std) for a line of `chars` characters, or None without enough data."""
+        with self._lock:
+            e = self._entries.get(key)
+            if not e or e['n'] < MIN_SAMPLES:
+                return None
+            intercept, slope, spread = self._fit(e)
+        return intercept + slope * max(1, chars), spread
+
+    def timeout_for(self, key, chars, default_timeout, attempt=0):
+        """
+        Request timeout for this line, or default_timeout until the key has MIN_SAMPLES
+        observations. Either is multiplied by TIMEOUT_ESCALATION per earlier timed-out attempt.
+        """
+        prediction = self.predict(key, chars)
+        if prediction is None:
+            # A user-supplied default above MAX_TIMEOUT is kept rather than cut down
+            return min(max(MAX_TIMEOUT, default_timeout), default_timeout * TIMEOUT_ESCALATION ** attempt)
+        expected, spread = prediction
+        timeout = expected * SAFETY_FACTOR + DEVIATIONS * spread + MIN_SLACK
+        timeout *= TIMEOUT_ESCALATION ** attempt
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, timeout))
+
+    def summary(self):
+        """One line per key: fitted overhead, rate and sample count."""
+        lines = []
+        with self._lock:
+            for key, e in sorted(self._entries.items()):
+                if e['n'] < MIN_SAMPLES:
+                    continue
+                intercept, slope, spread = self._fit(e)
+                lines.append(f"{key}: {intercept:.2f}s + {slope * 1000:.1f} ms/char (±{spread:.2f}s, {e['n']} requests)")
+        return '\n'.join(lines)
+
+
+def retry_delay(attempt, timed_out):
+    """
+    Pause before retry number `attempt`. A timed-out request already waited its full
+    (model-derived) timeout, so it is retried after 1s; connection and HTTP errors keep
+    the exponential 2**attempt backoff.
+    """
+    return 1 if timed_out else 2 ** attempt
+
+
+# Process-wide model used by the providers and make_tts_request_with_retry (None = disabled)
+_latency_model = None
+_latency_model_configured = False
+
+
+def configure_latency_model(path=None, enabled=True):
+    """Sets up (or disables) adaptive timeouts. Returns the model or None."""
+    global _latency_model, _latency_model_configured
+    _latency_model_configured = True
+    if not enabled:
+        _latency_model = None
+        print("-> Adaptive TTS timeouts disabled.")
+        return None
+    _latency_model = LatencyModel(path or DEFAULT_LATENCY_STATE_PATH)
+    return _latency_model
+
+
+def get_latency_model():
+    """Returns the process-wide latency model, creating one with defaults on first use."""
+    if not _latency_model_configured:
+        configure_latency_model()
+    return _latency_model
+
+
+def request_timeout(endpoint, voice, model, text, default_timeout, attempt=0):
+    """
+    Timeout for one TTS request: model-derived when known, else default_timeout; both grow by
+    TIMEOUT_ESCALATION per timed-out attempt. With adaptive timeouts disabled it is always default_timeout.
+    """
+    model_state = get_latency_model()
+    if model_state is None:
+        return default_timeout
+    return model_state.timeout_for(LatencyModel.make_key(endpoint, voice, model), len(text or ''), default_timeout, attempt)
+
+
+def record_latency(endpoint, voice, model, text, seconds):
+    """Feeds one successful request's duration into the process-wide model."""
+    model_state = get_latency_model()
+    if model_state is not None:
+        model_state.record(LatencyModel.make_key(endpoint, voice, model), len(text or ''), seconds)
@@ -0,0 +1,116 @@
+import concurrent.futures
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from .streaming import WavStreamDecoder
+
+
+class StopSignal:
+    """
+    Stop flag shared by the jobs of one synthesize_in_order run. Jobs take their request
+    decoders from track(); set() cancels every tracked decoder still in use, so requests
+    that are already running are aborted (no further attempts or fallbacks) instead of
+    finishing before the interpreter can exit.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._decoders = set()
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def set(self):
+        with self._lock:
+            self._event.set()
+            decoders, self._decoders = list(self._decoders), set()
+        for decoder in decoders:
+            decoder.cancel()
+
+    @contextmanager
+    def track(self):
+        """Yields a WavStreamDecoder that set() cancels while the block runs (cancelled at once if already set)."""
+        decoder = WavStreamDecoder()
+        with self._lock:
+            stopped = self._event.is_set()
+            if not stopped:
+                self._decoders.add(decoder)
+        if stopped:
+            decoder.cancel()
+        try:
+            yield decoder
+        finally:
+            with self._lock:
+                self._decoders.discard(decoder)
+
+
+def synthesize_in_order(jobs, synthesize, concurrency=1, postprocess=None, postprocess_workers=1, stop=None):
+    """
+    Runs synthesize(job) for every job with at most `concurrency` calls in flight and
+    yields (job, result) strictly in job order, as soon as each result (and all results
+    before it) is ready.
+
+    With `postprocess`, this becomes a two-stage pipeline: synthesize(job) only does the
+    network part, and postprocess(job, synthesized) runs on a separate pool of
+    `postprocess_workers` threads. A synthesis thread hands its result over and immediately
+    starts the next line, so the TTS server stays busy while earlier lines are enhanced.
+    The yielded result is then postprocess's return value.
+
+    The number of jobs started but not yet yielded is bounded too (2 x the total worker
+    count), so a slow line at the head of the script cannot make the pool run arbitrarily
+    far ahead. If the consumer stops early (e.g. sys.exit on a failed line), requests that
+    have not started yet are cancelled, and `stop` is set so running ones are aborted too.
+
+    Args:
+        jobs (list): Job descriptions, in script order.
+        synthesize (callable): Function called with one job; its return value is yielded
+            (or passed to postprocess).
+        concurrency (int): Maximum simultaneous synthesize() calls. 1 runs inline, in order,
+            unless postprocess is given.
+        postprocess (callable, optional): Function called with (job, synthesize_result).
+        postprocess_workers (int): Threads for the postprocess stage.
+        stop (StopSignal, optional): Set once the run ends; jobs should fetch through
+            stop.track() decoders so their requests are aborted then.
+    """
+    if concurrency <= 1 and postprocess is None:
+        for job in jobs:
+            yield job, synthesize(job)
+        return
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='tts')
+    post_executor = None
+    if postprocess is not None:
+        post_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, postprocess_workers),
+                                                              thread_name_prefix='tts-post')
+
+    def run_stages(job):
+        synthesized = synthesize(job)
+        if post_executor is None:
+            return synthesized
+        return post_executor.submit(postprocess, job, synthesized)
+
+    pending = deque()
+    job_iter = iter(jobs)
+    lookahead = (max(1, concurrency) + (max(1, postprocess_workers) if post_executor else 0)) * 2
+    try:
+        for job in job_iter:
+            pending.append((job, executor.submit(run_stages, job)))
+            if len(pending) >= lookahead:
+                break
+        while pending:
+            job, future = pending.popleft()
+            result = future.result()
+            if post_executor is not None:
+                result = result.result()
+            next_job = next(job_iter, None)
+            if next_job is not None:
+                pending.append((next_job, executor.submit(run_stages, next_job)))
+            yield job, result
+    finally:
+        if stop is not None:
+            stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        if post_executor is not None:
+            post_executor.shutdown(wait=False, cancel_futures=True)
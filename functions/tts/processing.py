@@ -1,4 +1,6 @@
 import os
+import threading
+import concurrent.futures
 import subprocess # Added for subprocess.run
 import shlex
 import tempfile
@@ -10,13 +12,179 @@ try:
     from pydub import AudioSegment
     pydub_available = True
 except ImportError:
-    print("Warning: 'pydub' library not found. Audio manipulation (gain, trim, padding) disabled.")
+    print("Warning: 'pydub' library not found. Gain, trim and padding disabled for the 'ffmpeg' enhancement backend.")
     pydub_available = False
 
+# functions.tts.dsp pulls in scipy.signal (~1s); it is imported on first use, not at startup
+_dsp = None
+_dsp_checked = False
+_dsp_lock = threading.Lock()
+
+
+def _get_dsp():
+    """The in-process DSP module, imported on first call, or None if its dependencies are missing."""
+    global _dsp, _dsp_checked
+    with _dsp_lock:
+        if not _dsp_checked:
+            try:
+                from functions.tts import dsp
+                _dsp = dsp
+            except ImportError as e:
+                print(f"Warning: In-process audio enhancement unavailable ({e}). Falling back to FFmpeg + pydub.")
+            _dsp_checked = True
+    return _dsp
+
+# 'numpy' runs the whole chain in-process on float32 arrays and writes one file;
+# 'ffmpeg' is the original FFmpeg subprocess + pydub path, kept as a reference/fallback;
+# 'ffmpeg-batch' keeps FFmpeg's filters but runs one FFmpeg process per batch of segments.
+ENHANCEMENT_BACKENDS = ['numpy', 'ffmpeg', 'ffmpeg-batch']
+DEFAULT_FFMPEG_BATCH_SIZE = 16
+DEFAULT_FFMPEG_BATCH_LINGER = 0.5 # Seconds a partial batch waits for more segments
+_enhancement_backend = 'numpy'
+_batch_enhancer = None
+
+
+def set_enhancement_backend(backend, batch_size=None, linger=None):
+    """
+    Selects the default backend used by process_audio_data ('numpy', 'ffmpeg' or 'ffmpeg-batch').
+    batch_size/linger configure the shared FFmpegBatchEnhancer for 'ffmpeg-batch'.
+    """
+    global _enhancement_backend, _batch_enhancer
+    if backend not in ENHANCEMENT_BACKENDS:
+        raise ValueError(f"Unknown audio enhancement backend '{backend}'. Choose from: {', '.join(ENHANCEMENT_BACKENDS)}")
+    _enhancement_backend = backend
+    if _batch_enhancer is not None:
+        _batch_enhancer.flush()
+        _batch_enhancer = None
+    if backend == 'ffmpeg-batch':
+        _batch_enhancer = FFmpegBatchEnhancer(
+            batch_size=batch_size or DEFAULT_FFMPEG_BATCH_SIZE,
+            linger=DEFAULT_FFMPEG_BATCH_LINGER if linger is None else linger)
+        print(f"-> Audio enhancement: batched FFmpeg ({_batch_enhancer.batch_size} segment(s) per process)")
+
+
+def resolve_enhancement_params(config):
+    """Fills in defaults for every enhancement parameter and makes the normalizer window odd."""
+    params = {
+        'apply_ffmpeg_enhancement': config.get('apply_ffmpeg_enhancement', True),
+        'apply_deesser': config.get('apply_deesser', True), # Default ON
+        'deesser_freq': config.get('deesser_freq', 3000),
+        'nr_level': config.get('nr_level', 0),
+        'compress_thresh': config.get('compress_thresh', 1.0),
+        'compress_ratio': config.get('compress_ratio', 1),
+        'norm_frame_len': config.get('norm_frame_len', 10),
+        'norm_gauss_size': config.get('norm_gauss_size', 3),
+        'gain_factor': config.get('gain_factor', 1.0),
+        'trim_end_ms': config.get('trim_end_ms', 0),
+        'pad_end_ms': config.get('pad_end_ms', 0),
+    }
+    if params['apply_ffmpeg_enhancement'] and params['norm_gauss_size'] % 2 == 0:
+        print(f"  Adjusting Norm Gauss size from {params['norm_gauss_size']} to {params['norm_gauss_size'] - 1} (must be odd).")
+        params['norm_gauss_size'] -= 1
+    return params
+
+
+def build_ffmpeg_filter_chain(params):
+    """Returns the FFmpeg -af chain (de-esser, NR, compressor, normalizer) for resolved params."""
+    filter_chain = []
+    if params['apply_deesser']:
+        filter_chain.append(f"firequalizer=gain='if(gte(f,{params['deesser_freq']}),-5,0)'")
+    if params['nr_level'] > 0:
+        filter_chain.append(f"afftdn=nr={params['nr_level']}")
+    comp_thresh_str = f"{params['compress_thresh']:.3f}"
+    filter_chain.append(f"acompressor=threshold={comp_thresh_str}:ratio={params['compress_ratio']}:attack=10:release=100")
+    filter_chain.append(f"dynaudnorm=f={params['norm_frame_len']}:g={params['norm_gauss_size']}")
+    return ','.join(filter_chain)
+
+
+def describe_numpy_chain(params):
+    """Signature of the in-process chain, recorded like an FFmpeg chain so the video stage can skip re-filtering."""
+    parts = []
+    if params['apply_deesser']:
+        parts.append(f"deess={params['deesser_freq']}")
+    if params['nr_level'] > 0:
+        parts.append(f"gate={params['nr_level']}")
+    parts.append(f"comp={params['compress_thresh']:.3f}:{params['compress_ratio']}")
+    parts.append(f"norm={params['norm_frame_len']}:{params['norm_gauss_size']}")
+    return 'numpy:' + ','.join(parts)
+
+
+def process_audio_data(audio_bytes, config, temp_dir, backend=None, decoded=None):
+    """
+    Enhances raw WAV bytes from a TTS response and writes the final segment.
+
+    Args:
+        audio_bytes (bytes): WAV file contents as returned by the TTS server.
+        config (dict): Processing parameters (apply_ffmpeg_enhancement, apply_deesser, deesser_freq,
+            nr_level, compress_thresh, compress_ratio, norm_frame_len, norm_gauss_size,
+            gain_factor, trim_end_ms, pad_end_ms). Missing keys use the defaults.
+        temp_dir (str): Directory for the output (and, for the ffmpeg backend, intermediate) files.
+        backend (str, optional): 'numpy', 'ffmpeg' or 'ffmpeg-batch'. Defaults to the backend set via set_enhancement_backend.
+        decoded (tuple, optional): (float32 array, samplerate) already decoded from audio_bytes,
+            e.g. by a streaming.WavStreamDecoder while the response downloaded. Skips re-decoding.
+
+    Returns:
+        tuple: (path_to_processed_file, samplerate, applied_chain) or (None, None, None) on failure.
+            applied_chain is None when no enhancement chain ran.
+    """
+    params = resolve_enhancement_params(config)
+    backend = backend or _enhancement_backend
+    if backend == 'ffmpeg-batch':
+        enhancer = _batch_enhancer or FFmpegBatchEnhancer(batch_size=1)
+        return enhancer.submit(audio_bytes, params, temp_dir).result()
+    if backend == 'numpy' and _get_dsp() is not None:
+        try:
+            return _enhance_in_memory(audio_bytes, params, temp_dir, decoded)
+        except Exception as e:
+            print(f"  !! Warning: In-process enhancement failed ({e}). Falling back to FFmpeg + pydub.")
+    return _enhance_with_ffmpeg(audio_bytes, params, temp_dir)
+
+
+def _enhance_in_memory(audio_bytes, params, temp_dir, decoded=None):
+    """Decodes (unless given `decoded`), enhances, trims and pads in memory, then writes exactly one PCM_16 WAV."""
+    dsp = _get_dsp()
+    audio, samplerate = decoded if decoded is not None else dsp.decode_wav_bytes(audio_bytes)
+    applied_chain = None
+    if params['apply_ffmpeg_enhancement']:
+        audio = dsp.enhance(
+            audio, samplerate,
+            apply_deesser=params['apply_deesser'],
+            deesser_freq=params['deesser_freq'],
+            nr_level=params['nr_level'],
+            compress_thresh=params['compress_thresh'],
+            compress_ratio=params['compress_ratio'],
+            norm_frame_len=params['norm_frame_len'],
+            norm_gauss_size=params['norm_gauss_size'],
+        )
+        applied_chain = describe_numpy_chain(params)
+        print(f"  -> Enhancement applied in-process ({applied_chain})")
+    else:
+        print("  -> Skipping enhancement as requested.")
+
+    duration_before = len(audio) / samplerate
+    trim_end_ms = params['trim_end_ms']
+    if trim_end_ms > 0 and duration_before * 1000.0 <= trim_end_ms:
+        print(f"    -> Warning: Segment length ({duration_before * 1000:.0f}ms) is less than trim duration ({trim_end_ms}ms). Skipping trim.")
+    audio = dsp.apply_gain_trim_pad(audio, samplerate, params['gain_factor'], trim_end_ms, params['pad_end_ms'])
+    np.clip(audio, -1.0, 1.0, out=audio)
+
+    final_fd, final_path = tempfile.mkstemp(suffix=".wav", prefix="segment_", dir=temp_dir)
+    os.close(final_fd)
+    try:
+        sf.write(final_path, audio, samplerate, subtype='PCM_16')
+    except Exception:
+        if os.path.exists(final_path):
+            try: os.remove(final_path)
+            except OSError: pass
+        raise
+    print(f"  -> Final segment saved ({len(audio) / samplerate:.2f}s, SR: {samplerate} Hz)")
+    return final_path, samplerate, applied_chain
+
+
 def apply_audio_enhancements(audio_path, config, temp_dir):
     """
-    Applies FFmpeg enhancements (noise reduction, compression, normalization, de-essing)
-    and pydub processing (gain, trim, padding) to an audio file.
+    Applies the enhancement chain (noise reduction, compression, normalization, de-essing)
+    and gain, trim and padding to an audio file. Thin wrapper around process_audio_data.
 
     Args:
         audio_path (str): Path to the input audio file.
@@ -26,176 +194,300 @@ def apply_audio_enhancements(audio_path, config, temp_dir):
     Returns:
         tuple: (path_to_processed_file, samplerate) or (None, None) on failure.
     """
-    processed_audio_path = audio_path
-    samplerate = None
-
     if not os.path.exists(audio_path):
         print(f"Error: Input audio file not found for processing: {audio_path}")
         return None, None
-
-    # Get samplerate from the initial audio file
     try:
-        info = sf.info(audio_path)
-        samplerate = info.samplerate
-    except Exception as e:
-        print(f"Error getting samplerate from {audio_path}: {e}")
+        with open(audio_path, 'rb') as f:
+            audio_bytes = f.read()
+    except OSError as e:
+        print(f"Error reading {audio_path}: {e}")
         return None, None
+    path, samplerate, _ = process_audio_data(audio_bytes, config, temp_dir)
+    return path, samplerate
 
-    # --- FFmpeg Enhancement (Conditional) ---
-    final_apply_ffmpeg = config.get('apply_ffmpeg_enhancement', True)
-    final_apply_deesser = config.get('apply_deesser', True) # Default ON
-    final_deesser_freq = config.get('deesser_freq', 3000)
-    final_nr_level = config.get('nr_level', 0)
-    final_compress_thresh = config.get('compress_thresh', 1.0)
-    final_compress_ratio = config.get('compress_ratio', 1)
-    final_norm_frame_len = config.get('norm_frame_len', 10)
-    final_norm_gauss_size = config.get('norm_gauss_size', 3)
 
+def _enhance_with_ffmpeg(audio_bytes, params, temp_dir):
+    """
+    Original enhancement path: writes the raw audio to disk, runs the FFmpeg filter chain in a
+    subprocess, then applies gain/trim/pad with pydub. Used for backend='ffmpeg' and as a fallback.
+    """
+    initial_fd, initial_temp_path = tempfile.mkstemp(suffix="_initial.wav", prefix="segment_", dir=temp_dir)
+    os.close(initial_fd)
     ffmpeg_temp_path = None
+    applied_chain = None
+    try:
+        with open(initial_temp_path, 'wb') as f_initial:
+            f_initial.write(audio_bytes)
+        processed_audio_path = initial_temp_path
+        samplerate = sf.info(initial_temp_path).samplerate
 
-    if final_apply_ffmpeg:
-        # Ensure final norm_gauss_size is odd
-        if final_norm_gauss_size % 2 == 0:
-            final_norm_gauss_size -= 1
-            print(f"  Adjusting Norm Gauss size from {final_norm_gauss_size + 1} to {final_norm_gauss_size} (must be odd).")
-
-        ffmpeg_temp_fd, ffmpeg_temp_path = tempfile.mkstemp(suffix="_ffmpeg.wav", prefix="segment_", dir=temp_dir)
-        os.close(ffmpeg_temp_fd)
-
-        try:
-            filter_chain = []
-
-            if final_apply_deesser:
-                filter_chain.append(f"firequalizer=gain='if(gte(f,{final_deesser_freq}),-5,0)'")
-
-            if final_nr_level > 0:
-                filter_chain.append(f"afftdn=nr={final_nr_level}")
-
-            comp_thresh_str = f"{final_compress_thresh:.3f}"
-            filter_chain.append(f"acompressor=threshold={comp_thresh_str}:ratio={final_compress_ratio}:attack=10:release=100")
-
-            filter_chain.append(f"dynaudnorm=f={final_norm_frame_len}:g={final_norm_gauss_size}")
-
-            audio_filter = ','.join(filter_chain)
-
+        # --- FFmpeg Enhancement (Conditional) ---
+        if params['apply_ffmpeg_enhancement']:
+            ffmpeg_temp_fd, ffmpeg_temp_path = tempfile.mkstemp(suffix="_ffmpeg.wav", prefix="segment_", dir=temp_dir)
+            os.close(ffmpeg_temp_fd)
+            audio_filter = build_ffmpeg_filter_chain(params)
             ffmpeg_command = [
                 'ffmpeg',
-                '-i', audio_path,
+                '-i', initial_temp_path,
                 '-af', audio_filter,
                 '-y',
                 ffmpeg_temp_path
             ]
-            print(f"  Attempting FFmpeg enhancement: {' '.join(shlex.quote(arg) for arg in ffmpeg_command)}")
-            result = subprocess.run(ffmpeg_command, capture_output=True, text=True, check=False)
+            try:
+                print(f"  Attempting FFmpeg enhancement: {' '.join(shlex.quote(arg) for arg in ffmpeg_command)}")
+                result = subprocess.run(ffmpeg_command, capture_output=True, text=True, check=False)
+                if result.returncode == 0 and os.path.exists(ffmpeg_temp_path) and os.path.getsize(ffmpeg_temp_path) > 44:
+                    processed_audio_path = ffmpeg_temp_path
+                    applied_chain = audio_filter
+                    print(f"  -> SUCCESS: FFmpeg enhancement saved to: {os.path.basename(ffmpeg_temp_path)}")
+                else:
+                    print(f"  !! Warning: FFmpeg processing failed or produced empty file. Using original audio.")
+                    print(f"     Return Code: {result.returncode}")
+                    print(f"     Stderr: {result.stderr.strip()}")
+            except FileNotFoundError:
+                print(f"  !! Error: 'ffmpeg' command not found. Skipping enhancement.")
+            except Exception as ffmpeg_e:
+                print(f"  !! Warning: Error running FFmpeg processing: {ffmpeg_e}. Skipping enhancement.")
+        else:
+            print("  -> Skipping FFmpeg enhancement as requested.")
 
-            if result.returncode == 0 and os.path.exists(ffmpeg_temp_path) and os.path.getsize(ffmpeg_temp_path) > 44:
-                processed_audio_path = ffmpeg_temp_path
-                print(f"  -> SUCCESS: FFmpeg enhancement saved to: {os.path.basename(ffmpeg_temp_path)}")
-            else:
-                print(f"  !! Warning: FFmpeg processing failed or produced empty file. Using original audio.")
-                print(f"     Return Code: {result.returncode}")
-                print(f"     Stderr: {result.stderr.strip()}")
-                if os.path.exists(ffmpeg_temp_path):
-                    try: os.remove(ffmpeg_temp_path)
-                    except OSError: pass
-                ffmpeg_temp_path = None
-        except FileNotFoundError:
-            print(f"  !! Error: 'ffmpeg' command not found. Skipping enhancement.")
-            if ffmpeg_temp_path and os.path.exists(ffmpeg_temp_path):
-                try: os.remove(ffmpeg_temp_path)
-                except OSError: pass
-            ffmpeg_temp_path = None
-        except Exception as ffmpeg_e:
-            print(f"  !! Warning: Error running FFmpeg processing: {ffmpeg_e}. Skipping enhancement.")
-            if ffmpeg_temp_path and os.path.exists(ffmpeg_temp_path):
-                try: os.remove(ffmpeg_temp_path)
-                except OSError: pass
-            ffmpeg_temp_path = None
-    else:
-        print("  -> Skipping FFmpeg enhancement as requested.")
+        final_fd, final_path = tempfile.mkstemp(suffix=".wav", prefix="segment_", dir=temp_dir)
+        os.close(final_fd)
+
+        return final_path, _finish_with_pydub(processed_audio_path, params, final_path, samplerate), applied_chain
+    except Exception as e:
+        print(f"!! Error processing/saving segment: {e}")
+        return None, None, None
+    finally:
+        for path in (initial_temp_path, ffmpeg_temp_path):
+            if path and os.path.exists(path):
+                try: os.remove(path)
+                except OSError as e: print(f"  Warning: Could not remove temp file {path}: {e}")
 
-    # --- Pydub Processing (Gain, Trim, Pad) ---
-    final_gain_factor = config.get('gain_factor', 1.0)
-    final_trim_end_ms = config.get('trim_end_ms', 0)
-    pad_end_ms = config.get('pad_end_ms', 0)
 
+def _finish_with_pydub(processed_audio_path, params, final_path, samplerate):
+    """
+    Applies gain, trim and padding with pydub and exports to final_path. If pydub is missing or
+    fails, the processed audio is copied unchanged. Returns the final samplerate.
+    """
     if pydub_available:
         try:
             print(f"  Processing with pydub (Gain, Trim, Pad) on: {os.path.basename(processed_audio_path)}...")
             segment = AudioSegment.from_wav(processed_audio_path)
             samplerate = segment.frame_rate
 
-            if final_gain_factor != 1.0 and final_gain_factor > 0:
-                print(f"    -> Applying gain: {final_gain_factor:.2f}x")
-                gain_db = 20 * np.log10(final_gain_factor)
-                segment = segment + gain_db
-
-            if final_trim_end_ms > 0 and len(segment) > final_trim_end_ms:
-                print(f"    -> Trimming {final_trim_end_ms}ms from end.")
-                segment = segment[:-final_trim_end_ms]
-            elif final_trim_end_ms > 0:
-                 print(f"    -> Warning: Segment length ({len(segment)}ms) is less than trim duration ({final_trim_end_ms}ms). Skipping trim.")
-
-            if pad_end_ms > 0:
-                print(f"    -> Padding {pad_end_ms}ms silence to end.")
-                padding = AudioSegment.silent(duration=pad_end_ms, frame_rate=samplerate)
-                segment = segment + padding
-            else:
-                 print(f"    -> No end padding requested (pad_end_ms={pad_end_ms}).")
-
-            # Create a new temp file for the final pydub output
-            pydub_temp_fd, pydub_temp_path = tempfile.mkstemp(suffix="_pydub.wav", prefix="segment_", dir=temp_dir)
-            os.close(pydub_temp_fd)
+            if params['gain_factor'] != 1.0 and params['gain_factor'] > 0:
+                print(f"    -> Applying gain: {params['gain_factor']:.2f}x")
+                segment = segment + 20 * np.log10(params['gain_factor'])
 
-            print(f"  -> Exporting final processed audio to {os.path.basename(pydub_temp_path)}")
-            segment.export(pydub_temp_path, format="wav")
-            duration = len(segment) / 1000.0
-            print(f"  -> Final segment saved ({duration:.2f}s, SR: {samplerate} Hz)")
-            
-            # Cleanup the intermediate FFmpeg file if it was created
-            if ffmpeg_temp_path and os.path.exists(ffmpeg_temp_path):
-                try: os.remove(ffmpeg_temp_path)
-                except OSError as e: print(f"  Warning: Could not remove ffmpeg temp file {ffmpeg_temp_path}: {e}")
+            if params['trim_end_ms'] > 0 and len(segment) > params['trim_end_ms']:
+                print(f"    -> Trimming {params['trim_end_ms']}ms from end.")
+                segment = segment[:-params['trim_end_ms']]
+            elif params['trim_end_ms'] > 0:
+                print(f"    -> Warning: Segment length ({len(segment)}ms) is less than trim duration ({params['trim_end_ms']}ms). Skipping trim.")
 
-            return pydub_temp_path, samplerate
+            if params['pad_end_ms'] > 0:
+                print(f"    -> Padding {params['pad_end_ms']}ms silence to end.")
+                segment = segment + AudioSegment.silent(duration=params['pad_end_ms'], frame_rate=samplerate)
 
+            segment.export(final_path, format="wav")
+            print(f"  -> Final segment saved ({len(segment) / 1000.0:.2f}s, SR: {samplerate} Hz)")
+            return samplerate
         except Exception as pydub_e:
             print(f"!! Error during pydub processing: {pydub_e}")
             print(f"!! Falling back to using the pre-pydub audio: {os.path.basename(processed_audio_path)}")
-            # If pydub fails, try to copy the ffmpeg/initial file to the final path
-            try:
-                final_fd, final_path_on_error = tempfile.mkstemp(suffix="_final_fallback.wav", prefix="segment_", dir=temp_dir)
-                os.close(final_fd)
-                shutil.copy2(processed_audio_path, final_path_on_error)
-                # Need to get samplerate if we didn't get it from pydub
-                if samplerate is None:
-                    with sf.SoundFile(final_path_on_error) as audio_info:
-                        samplerate = audio_info.samplerate
-                
-                # Cleanup the intermediate FFmpeg file if it was created
-                if ffmpeg_temp_path and os.path.exists(ffmpeg_temp_path):
-                    try: os.remove(ffmpeg_temp_path)
-                    except OSError as e: print(f"  Warning: Could not remove ffmpeg temp file {ffmpeg_temp_path}: {e}")
-
-                return final_path_on_error, samplerate
-            except Exception as copy_e:
-                 print(f"!! Error copying fallback audio: {copy_e}")
-                 return None, None
     else:
         print("!! Pydub not available. Skipping gain, trim, and padding.")
-        # If pydub is not available, the processed_audio_path (from FFmpeg or initial) is the final one.
-        # We should copy it to a new temp file to ensure it's not the original input file.
+
+    # Gain/trim/pad unavailable or failed: the FFmpeg (or raw) audio becomes the final file
+    shutil.copy2(processed_audio_path, final_path)
+    return samplerate
+
+
+def _finish_segment(processed_audio_path, params, temp_dir):
+    """Gain/trim/pad for an FFmpeg-filtered file: in NumPy when available, else pydub. Returns (path, samplerate)."""
+    final_fd, final_path = tempfile.mkstemp(suffix=".wav", prefix="segment_", dir=temp_dir)
+    os.close(final_fd)
+    dsp = _get_dsp()
+    if dsp is not None:
+        try:
+            audio, samplerate = sf.read(processed_audio_path, dtype='float32')
+            audio = dsp.apply_gain_trim_pad(audio, samplerate, params['gain_factor'], params['trim_end_ms'], params['pad_end_ms'])
+            np.clip(audio, -1.0, 1.0, out=audio)
+            sf.write(final_path, audio, samplerate, subtype='PCM_16')
+            return final_path, samplerate
+        except Exception as e:
+            print(f"  !! Warning: In-process gain/trim/pad failed ({e}). Using pydub.")
+    samplerate = sf.info(processed_audio_path).samplerate
+    return final_path, _finish_with_pydub(processed_audio_path, params, final_path, samplerate)
+
+
+class FFmpegBatchEnhancer:
+    """
+    Runs the FFmpeg enhancement chain for many segments in one FFmpeg process.
+
+    Segments are queued with submit(); once batch_size are pending (or the oldest has waited
+    `linger` seconds) a single FFmpeg invocation filters all of them, one input and one output
+    per segment with each segment's own chain in a shared filter_complex script. This pays
+    process startup and filter-graph setup once per batch instead of once per line. If the
+    batch command fails, its segments are retried one by one with the regular 'ffmpeg' path.
+
+    Thread-safe: concurrent synthesis threads (--tts-concurrency) can submit and block on their
+    Future. A linger of None disables the timer; call flush() to process a partial batch.
+    """
+
+    def __init__(self, batch_size=DEFAULT_FFMPEG_BATCH_SIZE, linger=None):
+        self.batch_size = max(1, int(batch_size))
+        self.linger = linger
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def submit(self, audio_bytes, config, temp_dir):
+        """Queues raw WAV bytes. Returns a Future resolving to (path, samplerate, applied_chain)."""
+        params = resolve_enhancement_params(config)
+        future = concurrent.futures.Future()
+        input_fd, input_path = tempfile.mkstemp(suffix="_initial.wav", prefix="segment_", dir=temp_dir)
+        with os.fdopen(input_fd, 'wb') as f:
+            f.write(audio_bytes)
+        batch = None
+        with self._lock:
+            self._pending.append((input_path, params, temp_dir, audio_bytes, future))
+            if len(self._pending) >= self.batch_size:
+                batch = self._take_pending()
+            elif self.linger is not None and self._timer is None:
+                self._timer = threading.Timer(self.linger, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._run_batch(batch)
+        return future
+
+    def flush(self):
+        """Processes whatever is pending now, even if the batch is not full."""
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self._run_batch(batch)
+
+    def _take_pending(self):
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _run_batch(self, batch):
+        filtered = [item for item in batch if item[1]['apply_ffmpeg_enhancement']]
+        outputs = {}
+        chains = {}
+        try:
+            if filtered:
+                outputs, chains = self._filter_batch(filtered)
+            for input_path, params, temp_dir, audio_bytes, future in batch:
+                if future.done():
+                    continue
+                try:
+                    if not params['apply_ffmpeg_enhancement']:
+                        print("  -> Skipping FFmpeg enhancement as requested.")
+                        path, samplerate = _finish_segment(input_path, params, temp_dir)
+                        future.set_result((path, samplerate, None))
+                    elif input_path in outputs:
+                        path, samplerate = _finish_segment(outputs[input_path], params, temp_dir)
+                        future.set_result((path, samplerate, chains[input_path]))
+                    else:
+                        future.set_result(_enhance_with_ffmpeg(audio_bytes, params, temp_dir))
+                except Exception as e:
+                    print(f"!! Error processing/saving segment: {e}")
+                    future.set_result((None, None, None))
+        finally:
+            for input_path, _, _, _, future in batch:
+                if not future.done():
+                    future.set_result((None, None, None))
+                for path in (input_path, outputs.get(input_path)):
+                    if path and os.path.exists(path):
+                        try: os.remove(path)
+                        except OSError as e: print(f"  Warning: Could not remove temp file {path}: {e}")
+
+    def _filter_batch(self, items):
+        """
+        Runs one FFmpeg process over every item. Returns ({input_path: filtered_path}, {input_path: chain})
+        for the items that produced output; items missing from the result fall back to per-segment FFmpeg.
+        """
+        temp_dir = items[0][2]
+        graph = []
+        command = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error']
+        output_args = []
+        planned = {}
+        chains = {}
+        for idx, (input_path, params, _, _, _) in enumerate(items):
+            chain = build_ffmpeg_filter_chain(params)
+            chains[input_path] = chain
+            command += ['-i', input_path]
+            graph.append(f"[{idx}:a]{chain}[out{idx}]")
+            out_fd, out_path = tempfile.mkstemp(suffix="_ffmpeg.wav", prefix="segment_", dir=temp_dir)
+            os.close(out_fd)
+            planned[input_path] = out_path
+            output_args += ['-map', f"[out{idx}]", out_path]
+
+        script_fd, script_path = tempfile.mkstemp(suffix="_filters.txt", prefix="batch_", dir=temp_dir)
+        with os.fdopen(script_fd, 'w', encoding='utf-8') as f:
+            f.write(';\n'.join(graph))
+        command += ['-filter_complex_script', script_path] + output_args
+
+        outputs = {}
+        try:
+            print(f"  Attempting batched FFmpeg enhancement of {len(items)} segment(s) in one process...")
+            result = subprocess.run(command, capture_output=True, text=True, check=False)
+            if result.returncode == 0:
+                for input_path, out_path in planned.items():
+                    if os.path.exists(out_path) and os.path.getsize(out_path) > 44:
+                        outputs[input_path] = out_path
+                print(f"  -> SUCCESS: Batched FFmpeg enhanced {len(outputs)}/{len(items)} segment(s).")
+            else:
+                print(f"  !! Warning: Batched FFmpeg failed (Return Code: {result.returncode}). Retrying segments individually.")
+                print(f"     Stderr: {result.stderr.strip()}")
+        except FileNotFoundError:
+            print(f"  !! Error: 'ffmpeg' command not found. Skipping enhancement.")
+        except Exception as ffmpeg_e:
+            print(f"  !! Warning: Error running batched FFmpeg: {ffmpeg_e}. Retrying segments individually.")
+        finally:
+            try: os.remove(script_path)
+            except OSError: pass
+            for input_path, out_path in planned.items():
+                if input_path not in outputs and os.path.exists(out_path):
+                    try: os.remove(out_path)
+                    except OSError: pass
+        return outputs, chains
+
+
+def apply_audio_enhancements_batch(audio_paths, configs, temp_dir, batch_size=DEFAULT_FFMPEG_BATCH_SIZE):
+    """
+    Batched counterpart of apply_audio_enhancements for many files at once: FFmpeg runs once per
+    batch_size segments instead of once per segment.
+
+    Args:
+        audio_paths (list): Paths to the input audio files.
+        configs (list|dict): One processing dict per path, or a single dict used for all of them.
+        temp_dir (str): Path to a temporary directory for intermediate files.
+        batch_size (int): Segments per FFmpeg invocation.
+
+    Returns:
+        list: (path_to_processed_file, samplerate) per input, (None, None) for failures.
+    """
+    if isinstance(configs, dict):
+        configs = [configs] * len(audio_paths)
+    enhancer = FFmpegBatchEnhancer(batch_size=batch_size, linger=None)
+    futures = []
+    for audio_path, config in zip(audio_paths, configs):
         try:
-            final_fd, final_path_no_pydub = tempfile.mkstemp(suffix="_final_nopydub.wav", prefix="segment_", dir=temp_dir)
-            os.close(final_fd)
-            shutil.copy2(processed_audio_path, final_path_no_pydub)
-            
-            # Cleanup the intermediate FFmpeg file if it was created
-            if ffmpeg_temp_path and os.path.exists(ffmpeg_temp_path):
-                try: os.remove(ffmpeg_temp_path)
-                except OSError as e: print(f"  Warning: Could not remove ffmpeg temp file {ffmpeg_temp_path}: {e}")
-
-            return final_path_no_pydub, samplerate
-        except Exception as copy_e:
-             print(f"!! Error copying non-pydub audio: {copy_e}")
-             return None, None
\ No newline at end of file
+            with open(audio_path, 'rb') as f:
+                audio_bytes = f.read()
+        except OSError as e:
+            print(f"Error reading {audio_path}: {e}")
+            futures.append(None)
+            continue
+        futures.append(enhancer.submit(audio_bytes, config, temp_dir))
+    enhancer.flush()
+    return [future.result()[:2] if future else (None, None) for future in futures]
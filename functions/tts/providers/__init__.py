@@ -4,11 +4,16 @@ TTS Providers module for Ecne-AI-Podcaster.
 This module provides a unified interface for multiple TTS providers:
 - Qwen3 TTS (default): High-quality voice cloning and preset speakers
 - Orpheus TTS (legacy): Original TTS provider
+
+Provider classes are imported on first use (PEP 562 module __getattr__), so importing
+functions.tts.providers.voices for voice lists does not load requests or NumPy.
 """
 
-from .base import TTSProvider, TTSVoice, TTSGenerationResult
-from .qwen3 import Qwen3Provider
-from .orpheus import OrpheusProvider
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .base import TTSProvider
 
 __all__ = [
     'TTSProvider',
@@ -16,23 +21,47 @@ __all__ = [
     'TTSGenerationResult',
     'Qwen3Provider',
     'OrpheusProvider',
+    'PooledTTSProvider',
+    'parse_endpoints',
     'get_provider',
 ]
 
-# Provider registry
+# Public name -> submodule defining it
+_LAZY_EXPORTS = {
+    'TTSProvider': 'base',
+    'TTSVoice': 'base',
+    'TTSGenerationResult': 'base',
+    'Qwen3Provider': 'qwen3',
+    'OrpheusProvider': 'orpheus',
+    'PooledTTSProvider': 'pool',
+    'parse_endpoints': 'pool',
+}
+
+# Provider registry: name -> class name (resolved lazily)
 _PROVIDERS = {
-    'qwen3': Qwen3Provider,
-    'orpheus': OrpheusProvider,
+    'qwen3': 'Qwen3Provider',
+    'orpheus': 'OrpheusProvider',
 }
 
 
-def get_provider(provider_name: str, **kwargs) -> TTSProvider:
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(f".{_LAZY_EXPORTS[name]}", __name__), name)
+        globals()[name] = value # Cache so later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_provider(provider_name: str, endpoints=None, **kwargs) -> 'TTSProvider':
     """
     Get a TTS provider instance by name.
     
     Args:
         provider_name: Name of the provider ('qwen3' or 'orpheus')
-        **kwargs: Provider-specific initialization arguments
+        endpoints: Optional list of 'host:port' strings / (host, port) tuples, or a
+            comma-separated string. When given, returns a PooledTTSProvider over them.
+        **kwargs: Provider-specific initialization arguments (pool options such as
+            health_interval/cooldown are accepted when endpoints is given)
         
     Returns:
         TTSProvider instance
@@ -47,7 +76,12 @@ def get_provider(provider_name: str, **kwargs) -> TTSProvider:
             f"Available providers: {list(_PROVIDERS.keys())}"
         )
     
-    return _PROVIDERS[provider_name](**kwargs)
+    provider_class = __getattr__(_PROVIDERS[provider_name])
+    if endpoints:
+        kwargs.pop('api_host', None)
+        kwargs.pop('api_port', None)
+        return __getattr__('PooledTTSProvider')(provider_class, __getattr__('parse_endpoints')(endpoints), **kwargs)
+    return provider_class(**kwargs)
 
 
 def list_providers() -> list[str]:
@@ -9,6 +9,8 @@ from dataclasses import dataclass
 from typing import Optional, List, Dict, Any, Tuple
 import io
 
+from ..sessions import create_session, connection_stats, DEFAULT_POOL_MAXSIZE
+
 
 @dataclass
 class TTSVoice:
@@ -46,11 +48,14 @@ class TTSProvider(ABC):
         Args:
             api_host: Hostname/IP of the TTS API server
             api_port: Port of the TTS API server
-            **kwargs: Additional provider-specific options
+            **kwargs: Additional provider-specific options. pool_maxsize sets how many
+                keep-alive connections the provider's session keeps to its server.
         """
         self.api_host = api_host
         self.api_port = api_port
         self.base_url = f"http://{api_host}:{api_port}"
+        # One keep-alive session per provider, shared by all threads using it
+        self.session = create_session(pool_maxsize=kwargs.get('pool_maxsize', DEFAULT_POOL_MAXSIZE))
         
     @property
     @abstractmethod
@@ -104,10 +109,13 @@ class TTSProvider(ABC):
             voice: Voice ID to use
             speed: Speech speed factor (0.5 to 2.0)
             output_format: Output audio format (wav, mp3, etc.)
-            **kwargs: Provider-specific parameters
+            **kwargs: Provider-specific parameters. Providers also accept
+                stream (bool, read the response incrementally; default True) and
+                decoder (streaming.WavStreamDecoder fed as audio arrives).
             
         Returns:
-            Tuple of (audio_data_bytes, sample_rate) or (None, None) on failure
+            Tuple of (audio_data_bytes, sample_rate) or (None, None) on failure.
+            sample_rate is read from the WAV header when possible.
         """
         pass
     
@@ -121,6 +129,13 @@ class TTSProvider(ABC):
         """
         pass
     
+    def request_model(self, voice_id: str) -> str:
+        """
+        Model id sent in a request for voice_id (also the model part of the latency model's key).
+        Override if the model depends on the voice.
+        """
+        return self.default_model
+    
     def get_voice_config(self, voice_id: str) -> Dict[str, Any]:
         """
         Get voice-specific configuration for audio processing.
@@ -145,6 +160,14 @@ class TTSProvider(ABC):
             'apply_deesser': True,
         }
     
+    def connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-endpoint requests / connections opened / reused for this provider's session."""
+        return connection_stats(self.session)
+    
+    def close(self):
+        """Closes the provider's pooled connections."""
+        self.session.close()
+    
     def _make_api_request(self, endpoint: str, method: str = "GET", 
                           data: Optional[Dict] = None, 
                           files: Optional[Dict] = None,
@@ -168,13 +191,13 @@ class TTSProvider(ABC):
         
         try:
             if method.upper() == "GET":
-                response = requests.get(url, timeout=timeout)
+                response = self.session.get(url, timeout=timeout)
             elif method.upper() == "POST":
                 if files:
-                    response = requests.post(url, data=data, files=files, timeout=timeout)
+                    response = self.session.post(url, data=data, files=files, timeout=timeout)
                 else:
                     headers = {"Content-Type": "application/json"}
-                    response = requests.post(url, json=data, headers=headers, timeout=timeout)
+                    response = self.session.post(url, json=data, headers=headers, timeout=timeout)
             else:
                 return False, f"Unsupported HTTP method: {method}"
             
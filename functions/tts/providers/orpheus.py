@@ -10,38 +10,11 @@ import requests
 from typing import List, Optional, Tuple, Dict, Any
 
 from .base import TTSProvider, TTSVoice, TTSGenerationResult
+from ..streaming import WavStreamDecoder, RequestCancelled, cancellable_request, read_audio_response
+from ..latency import request_timeout, record_latency, retry_delay
 
 
-# Orpheus voices organized by language
-ORPHEUS_VOICES = {
-    'English': ['tara', 'leah', 'jess', 'leo', 'dan', 'mia', 'zac', 'zoe'],
-    'French': ['pierre', 'amelie', 'marie'],
-    'German': ['jana', 'thomas', 'max'],
-    'Korean': ['유나', '준서'],
-    'Hindi': ['ऋतिका'],
-    'Mandarin': ['长乐', '白芷'],
-    'Spanish': ['javi', 'sergio', 'maria'],
-    'Italian': ['pietro', 'giulia', 'carlo']
-}
-
-# Voice metadata (gender mapping where known)
-ORPHEUS_VOICE_METADATA = {
-    'tara': {'gender': 'Female', 'description': 'Young female voice'},
-    'leah': {'gender': 'Female', 'description': 'Young female voice'},
-    'jess': {'gender': 'Female', 'description': 'Young female voice'},
-    'leo': {'gender': 'Male', 'description': 'Young male voice'},
-    'dan': {'gender': 'Male', 'description': 'Male voice'},
-    'mia': {'gender': 'Female', 'description': 'Female voice'},
-    'zac': {'gender': 'Male', 'description': 'Male voice'},
-    'zoe': {'gender': 'Female', 'description': 'Female voice'},
-    'pierre': {'gender': 'Male', 'description': 'French male'},
-    'amelie': {'gender': 'Female', 'description': 'French female'},
-    'marie': {'gender': 'Female', 'description': 'French female'},
-    'jana': {'gender': 'Female', 'description': 'German female'},
-    'thomas': {'gender': 'Male', 'description': 'German male'},
-    'max': {'gender': 'Male', 'description': 'German male'},
-}
-
+from .voices import ORPHEUS_VOICES, ORPHEUS_VOICE_METADATA
 
 class OrpheusProvider(TTSProvider):
     """
@@ -102,6 +75,8 @@ class OrpheusProvider(TTSProvider):
         output_format: str = "wav",
         max_retries: int = 3,
         timeout: int = 180,
+        stream: bool = True,
+        decoder: Optional[WavStreamDecoder] = None,
         **kwargs
     ) -> Tuple[Optional[bytes], Optional[int]]:
         """
@@ -114,6 +89,8 @@ class OrpheusProvider(TTSProvider):
             output_format: Output format (wav)
             max_retries: Number of retry attempts
             timeout: Request timeout in seconds
+            stream: Read the response in chunks, decoding PCM while it downloads
+            decoder: Optional WavStreamDecoder to feed (holds the decoded samples afterwards)
             
         Returns:
             Tuple of (audio_data_bytes, sample_rate) or (None, None)
@@ -140,43 +117,62 @@ class OrpheusProvider(TTSProvider):
         print(f"-> Orpheus TTS: Generating audio for '{voice}' (speed: {speed}x)")
         print(f"   Text: {text[:60]}{'...' if len(text) > 60 else ''}")
         
+        decoder = decoder or WavStreamDecoder()
+        endpoint = f"{self.api_host}:{self.api_port}"
+        timed_out = False
+        timeouts = 0
+        
         # Attempt request with retries
         for attempt in range(max_retries + 1):
             try:
                 if attempt > 0:
-                    wait_time = 2 ** attempt
+                    wait_time = retry_delay(attempt, timed_out)
                     print(f"   Retry attempt {attempt}/{max_retries} in {wait_time}s...")
-                    time.sleep(wait_time)
-                
-                response = requests.post(
-                    api_url,
-                    json=payload,
-                    headers=headers,
-                    timeout=timeout
-                )
+                    decoder.pause(wait_time)
                 
-                # If OpenAI endpoint fails, try legacy endpoint
-                if response.status_code == 404:
-                    legacy_url = f"{self.base_url}/speak"
-                    legacy_payload = {
-                        "text": text,
-                        "voice": voice
-                    }
-                    print(f"   Falling back to legacy endpoint: {legacy_url}")
-                    response = requests.post(
-                        legacy_url,
-                        json=legacy_payload,
+                timed_out = False
+                attempt_timeout = request_timeout(endpoint, voice, payload["model"], text, timeout, timeouts)
+                if attempt_timeout != timeout:
+                    print(f"   Timeout: {attempt_timeout:.0f}s (from recent latency on {endpoint})")
+                decoder.reset() # Drop anything a failed attempt decoded
+                started = time.monotonic()
+                with cancellable_request(decoder): # decoder.cancel() aborts the connection
+                    response = self.session.post(
+                        api_url,
+                        json=payload,
                         headers=headers,
-                        timeout=timeout
+                        timeout=attempt_timeout,
+                        stream=stream
                     )
-                
-                response.raise_for_status()
-                audio_data = response.content
+                    
+                    # If OpenAI endpoint fails, try legacy endpoint
+                    if response.status_code == 404:
+                        response.close()
+                        legacy_url = f"{self.base_url}/speak"
+                        legacy_payload = {
+                            "text": text,
+                            "voice": voice
+                        }
+                        print(f"   Falling back to legacy endpoint: {legacy_url}")
+                        response = self.session.post(
+                            legacy_url,
+                            json=legacy_payload,
+                            headers=headers,
+                            timeout=attempt_timeout,
+                            stream=stream
+                        )
+                    
+                    response.raise_for_status()
+                    # Orpheus outputs at 24000 Hz; the WAV header is authoritative when present
+                    audio_data, samplerate, _ = read_audio_response(
+                        response, stream=stream, decoder=decoder, default_samplerate=24000)
                 
                 if audio_data and len(audio_data) > 44:  # Valid WAV header
-                    print(f"   ✅ SUCCESS: Received {len(audio_data)} bytes")
-                    # Orpheus outputs at 24000 Hz
-                    return audio_data, 24000
+                    record_latency(endpoint, voice, payload["model"], text, time.monotonic() - started)
+                    first_sample = decoder.time_to_first_sample
+                    first_sample_note = f", first samples after {first_sample:.2f}s" if first_sample is not None else ""
+                    print(f"   ✅ SUCCESS: Received {len(audio_data)} bytes ({samplerate} Hz{first_sample_note})")
+                    return audio_data, samplerate
                 else:
                     raise requests.exceptions.RequestException(
                         f"Empty or invalid audio response ({len(audio_data)} bytes)"
@@ -184,6 +180,8 @@ class OrpheusProvider(TTSProvider):
                     
             except requests.exceptions.Timeout:
                 print(f"   ❌ Timeout on attempt {attempt + 1}")
+                timed_out = True
+                timeouts += 1
                 if attempt == max_retries:
                     return None, None
                     
@@ -192,7 +190,12 @@ class OrpheusProvider(TTSProvider):
                 if attempt == max_retries:
                     return None, None
                     
+            except RequestCancelled:
+                return None, None # Cancelled on purpose (e.g. a hedged duplicate won); not an error
+                    
             except requests.exceptions.RequestException as e:
+                if getattr(e, 'response', None) is not None:
+                    e.response.close() # Unread streamed error body; don't hold the pooled connection
                 print(f"   ❌ Request error on attempt {attempt + 1}: {e}")
                 if attempt == max_retries:
                     return None, None
@@ -203,11 +206,11 @@ class OrpheusProvider(TTSProvider):
         """Check if Orpheus TTS API is available."""
         try:
             # Try OpenAI-compatible endpoint first
-            response = requests.get(f"{self.base_url}/v1/models", timeout=5)
+            response = self.session.get(f"{self.base_url}/v1/models", timeout=5)
             if response.status_code == 200:
                 return True
             # Try health endpoint
-            response = requests.get(f"{self.base_url}/health", timeout=5)
+            response = self.session.get(f"{self.base_url}/health", timeout=5)
             return response.status_code == 200
         except:
             return False
@@ -0,0 +1,438 @@
+"""
+Pooled TTS provider: spreads requests over several servers of the same provider type.
+
+Routing is least-outstanding-requests among endpoints whose circuit breaker is closed.
+Endpoints that fail repeatedly, fail a health probe, or become much slower than their
+peers are ejected (circuit opened) for a cooldown, then re-admitted with a single trial
+request (half-open) that closes the circuit again on success.
+
+Optional hedging: a request still running past the p95 latency of its length class gets a
+duplicate on another healthy endpoint; the first success wins and the other is cancelled.
+"""
+
+import bisect
+import concurrent.futures
+import statistics
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple, Dict, Any
+
+from .base import TTSProvider, TTSVoice
+from ..streaming import WavStreamDecoder, RequestCancelled
+from ..latency import get_latency_model, LatencyModel
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# Hedging: line lengths are bucketed at these character counts; each bucket keeps its most
+# recent latencies and needs HEDGE_MIN_SAMPLES before its quantile is trusted
+HEDGE_LENGTH_CLASSES = (50, 150, 400, 1000)
+HEDGE_HISTORY = 200
+HEDGE_MIN_SAMPLES = 20
+Z_SCORES = {0.9: 1.2816, 0.95: 1.6449, 0.99: 2.3263} # For the latency-model fallback
+
+
+def parse_endpoints(spec, default_host="127.0.0.1"):
+    """
+    Parses endpoints given as 'host:port' / 'port' strings (comma-separated or a list)
+    into a list of (host, port) tuples.
+    """
+    if isinstance(spec, str):
+        spec = spec.split(',')
+    endpoints = []
+    for item in spec or []:
+        if isinstance(item, (tuple, list)):
+            endpoints.append((item[0], int(item[1])))
+            continue
+        item = item.strip()
+        if not item:
+            continue
+        item = item.split('://', 1)[-1].rstrip('/')
+        host, _, port = item.rpartition(':')
+        if not port.isdigit():
+            raise ValueError(f"Invalid TTS endpoint '{item}' (expected host:port)")
+        endpoints.append((host or default_host, int(port)))
+    return endpoints
+
+
+class _Endpoint:
+    """Routing and breaker state for one server."""
+
+    def __init__(self, provider: TTSProvider):
+        self.provider = provider
+        self.label = f"{provider.api_host}:{provider.api_port}"
+        self.outstanding = 0
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.open_reason = None
+        self.trial_in_flight = False
+        self.seconds_per_char = None # EWMA of request latency normalized by text length
+        self.requests = 0
+        self.failures = 0
+
+
+class PooledTTSProvider(TTSProvider):
+    """
+    TTSProvider over several endpoints of one provider type (e.g. several Qwen3 GPU boxes).
+
+    Args:
+        provider_class: Provider class for every endpoint (e.g. Qwen3Provider).
+        endpoints: List of (host, port) tuples.
+        health_interval: Seconds between background health probes (0 disables them).
+        failure_threshold: Consecutive failures that open an endpoint's circuit.
+        cooldown: Seconds an open circuit waits before a half-open trial request.
+        slow_factor: Eject an endpoint whose per-character latency exceeds this multiple of
+            the median of its peers (needs at least two endpoints with measurements).
+        hedge: Send a duplicate of a request that runs past the hedge_quantile latency of its
+            length class to another healthy endpoint (needs two or more endpoints).
+        hedge_quantile: Latency quantile that triggers a hedge (default 0.95).
+        **kwargs: Passed to every provider instance (e.g. model).
+    """
+
+    def __init__(self, provider_class, endpoints, health_interval: float = 30.0,
+                 failure_threshold: int = 3, cooldown: float = 30.0, slow_factor: float = 3.0,
+                 hedge: bool = False, hedge_quantile: float = 0.95, **kwargs):
+        if not endpoints:
+            raise ValueError("PooledTTSProvider needs at least one endpoint")
+        members = [provider_class(api_host=host, api_port=port, **kwargs) for host, port in endpoints]
+        super().__init__(members[0].api_host, members[0].api_port)
+        self.base_url = ', '.join(member.base_url for member in members)
+        self.model = getattr(members[0], 'model', None)
+        self._endpoints = [_Endpoint(member) for member in members]
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.slow_factor = slow_factor
+        self.health_interval = health_interval
+        self._voice_aliases = {} # alias -> {endpoint label: server-side voice id}
+        self.hedge = hedge and len(self._endpoints) > 1
+        self.hedge_quantile = hedge_quantile
+        self._class_latencies = [deque(maxlen=HEDGE_HISTORY) for _ in range(len(HEDGE_LENGTH_CLASSES) + 1)]
+        self.hedged_requests = 0 # Requests that got a duplicate
+        self.hedge_wins = 0      # ... where the duplicate finished first
+        self.total_requests = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+        if health_interval and health_interval > 0:
+            self._health_thread = threading.Thread(target=self._health_loop, name='tts-pool-health', daemon=True)
+            self._health_thread.start()
+
+    # --- TTSProvider interface (metadata is identical across members) ---
+
+    @property
+    def name(self) -> str:
+        return self._endpoints[0].provider.name
+
+    @property
+    def default_model(self) -> str:
+        return self._endpoints[0].provider.default_model
+
+    def request_model(self, voice_id: str) -> str:
+        return self._endpoints[0].provider.request_model(voice_id)
+
+    @property
+    def members(self) -> List[TTSProvider]:
+        return [endpoint.provider for endpoint in self._endpoints]
+
+    def get_available_voices(self) -> List[TTSVoice]:
+        return self._endpoints[0].provider.get_available_voices()
+
+    def validate_voice(self, voice_id: str) -> bool:
+        return self._endpoints[0].provider.validate_voice(voice_id)
+
+    def get_voice_config(self, voice_id: str) -> Dict[str, Any]:
+        return self._endpoints[0].provider.get_voice_config(voice_id)
+
+    def set_voice_alias(self, alias: str, voice_ids: Dict[str, str]):
+        """
+        Maps one voice name to per-endpoint voice ids (cloned voices get a different id on
+        every server). Requests for `alias` only go to endpoints present in voice_ids.
+        """
+        with self._lock:
+            self._voice_aliases[alias] = dict(voice_ids)
+
+    def health_check(self) -> bool:
+        """True if at least one endpoint is healthy."""
+        return any(self._probe(endpoint)[0] for endpoint in self._endpoints)
+
+    def check_health(self) -> Tuple[bool, str, Dict[str, Any]]:
+        """Probes every endpoint; healthy if at least one is. Unhealthy endpoints are ejected."""
+        results = {}
+        lines = []
+        for endpoint in self._endpoints:
+            healthy, message, data = self._probe(endpoint)
+            results[endpoint.label] = {'healthy': healthy, 'message': message, 'data': data}
+            lines.append(f"{endpoint.label}: {'OK' if healthy else 'DOWN'} ({message})")
+        healthy_count = sum(1 for r in results.values() if r['healthy'])
+        summary = f"{healthy_count}/{len(self._endpoints)} endpoint(s) healthy. " + '; '.join(lines)
+        return healthy_count > 0, summary, results
+
+    # --- Routing ---
+
+    def generate_audio(self, text: str, voice: str, speed: float = 1.0, output_format: str = "wav",
+                       max_retries: int = 3, **kwargs) -> Tuple[Optional[bytes], Optional[int]]:
+        """
+        Sends the request to the least-loaded available endpoint. A failed attempt moves on to
+        another endpoint right away; backoff only applies once every endpoint has been tried.
+        Cancelling the decoder (kwargs['decoder']) aborts the attempt in flight and stops retrying.
+        """
+        decoder = kwargs.setdefault('decoder', WavStreamDecoder())
+        aliases = self._voice_aliases.get(voice)
+        unsupported = {e.label for e in self._endpoints if aliases is not None and e.label not in aliases}
+        with self._lock:
+            self.total_requests += 1
+        tried = set()
+        for attempt in range(max_retries + 1):
+            if decoder.cancelled:
+                return None, None
+            endpoint = self._acquire(exclude=tried | unsupported)
+            if endpoint is None:
+                tried.clear()
+                wait_time = 2 ** attempt
+                print(f"   !! No TTS endpoint available; retrying in {wait_time}s...")
+                try:
+                    decoder.pause(wait_time)
+                except RequestCancelled:
+                    return None, None
+                endpoint = self._acquire(exclude=unsupported)
+                if endpoint is None:
+                    continue
+            tried.add(endpoint.label)
+            print(f"   -> Routed to {endpoint.label} (attempt {attempt + 1}/{max_retries + 1})")
+            call = dict(text=text, voice=voice, speed=speed, output_format=output_format, **kwargs)
+            if self.hedge:
+                result = self._hedged_call(endpoint, aliases, call, exclude=tried | unsupported)
+            else:
+                result = self._call(endpoint, aliases, call)
+            if result[0] is not None:
+                return result
+        return None, None
+
+    def _call(self, endpoint, aliases, call):
+        """One request on an already-acquired endpoint; always releases it. Returns (audio, samplerate)."""
+        started = time.monotonic()
+        result = (None, None)
+        member_call = dict(call, voice=self._member_voice(endpoint, aliases, call['voice']))
+        try:
+            result = endpoint.provider.generate_audio(max_retries=0, **member_call)
+        except Exception as e:
+            print(f"   ❌ {endpoint.label} raised: {e}")
+        finally:
+            decoder = call.get('decoder')
+            cancelled = result[0] is None and decoder is not None and decoder.cancelled
+            elapsed = time.monotonic() - started
+            # A hedge loser that was cancelled is neither a failure nor a latency sample
+            self._release(endpoint, ok=None if cancelled else result[0] is not None, elapsed=elapsed,
+                          chars=len(call['text']))
+            if result[0] is not None:
+                self._record_class_latency(len(call['text']), elapsed)
+        return result
+
+    def _hedged_call(self, endpoint, aliases, call, exclude):
+        """
+        Runs the request on `endpoint`; if it is still running after the hedge threshold, sends a
+        duplicate to another healthy endpoint and returns whichever succeeds first. Each leg
+        decodes into its own decoder; the winner's state is adopted by the caller's decoder.
+        Cancelling the caller's decoder cancels every leg.
+        """
+        caller_decoder = call.get('decoder')
+        legs = {}
+
+        def start_leg(leg_endpoint):
+            leg_decoder = WavStreamDecoder()
+            if caller_decoder is not None:
+                caller_decoder.on_cancel(leg_decoder.cancel)
+            future = concurrent.futures.Future()
+
+            def run():
+                try:
+                    future.set_result(self._call(leg_endpoint, aliases, dict(call, decoder=leg_decoder)))
+                except BaseException as e:
+                    future.set_exception(e)
+            threading.Thread(target=run, name='tts-hedge-leg', daemon=True).start()
+            legs[future] = (leg_endpoint, leg_decoder)
+            return future
+
+        primary = start_leg(endpoint)
+        threshold = self._hedge_threshold(endpoint, self._member_voice(endpoint, aliases, call['voice']),
+                                          len(call['text']))
+        if threshold is not None:
+            done, _ = concurrent.futures.wait([primary], timeout=threshold)
+            if not done:
+                backup_endpoint = self._acquire(exclude=set(exclude) | {endpoint.label}, closed_only=True)
+                if backup_endpoint is not None:
+                    with self._lock:
+                        self.hedged_requests += 1
+                    print(f"   -> Hedging: {endpoint.label} still running after {threshold:.1f}s "
+                          f"(p{self.hedge_quantile * 100:.0f}); duplicate sent to {backup_endpoint.label}")
+                    start_leg(backup_endpoint)
+
+        winner = None
+        pending = set(legs)
+        while pending and winner is None:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if winner is None and not future.exception() and future.result()[0] is not None:
+                    winner = future
+        for future in pending:
+            legs[future][1].cancel() # Aborts the loser's connection; it releases its endpoint itself
+        if winner is None:
+            return None, None
+        if winner is not primary:
+            with self._lock:
+                self.hedge_wins += 1
+            print(f"   ✅ Hedge won on {legs[winner][0].label}")
+        if caller_decoder is not None:
+            caller_decoder.adopt(legs[winner][1])
+        return winner.result()
+
+    @staticmethod
+    def _member_voice(endpoint, aliases, voice):
+        """Voice id the endpoint's server knows `voice` by (cloned voices differ per server)."""
+        return aliases[endpoint.label] if aliases else voice
+
+    def _hedge_threshold(self, endpoint, voice, chars):
+        """
+        Seconds after which a request of `chars` characters is hedged: the hedge_quantile of recent
+        latencies in its length class, else predicted + z * spread from the latency model, else None.
+        `voice` is the endpoint's own id, so the key matches what the provider records.
+        """
+        samples = list(self._class_latencies[bisect.bisect_right(HEDGE_LENGTH_CLASSES, chars)])
+        if len(samples) >= HEDGE_MIN_SAMPLES:
+            samples.sort()
+            return samples[min(len(samples) - 1, int(self.hedge_quantile * len(samples)))]
+        latency_model = get_latency_model()
+        if latency_model is None:
+            return None
+        model = endpoint.provider.request_model(voice)
+        prediction = latency_model.predict(LatencyModel.make_key(endpoint.label, voice, model), chars)
+        if prediction is None:
+            return None
+        expected, spread = prediction
+        z = Z_SCORES.get(round(self.hedge_quantile, 2), 1.6449)
+        return expected + z * spread
+
+    def _record_class_latency(self, chars, elapsed):
+        with self._lock:
+            self._class_latencies[bisect.bisect_right(HEDGE_LENGTH_CLASSES, chars)].append(elapsed)
+
+    def _available(self, endpoint, now):
+        if endpoint.state == CLOSED:
+            return True
+        if endpoint.state == OPEN and now - endpoint.opened_at >= self.cooldown:
+            endpoint.state = HALF_OPEN
+            print(f"-> TTS pool: {endpoint.label} cooldown over; sending a trial request.")
+        return endpoint.state == HALF_OPEN and not endpoint.trial_in_flight
+
+    def _acquire(self, exclude=(), closed_only=False):
+        with self._lock:
+            now = time.monotonic()
+            candidates = [e for e in self._endpoints if e.label not in exclude
+                          and (e.state == CLOSED if closed_only else self._available(e, now))]
+            if not candidates:
+                return None
+            endpoint = min(candidates, key=lambda e: (e.outstanding, e.seconds_per_char or 0.0))
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            if endpoint.state == HALF_OPEN:
+                endpoint.trial_in_flight = True
+            return endpoint
+
+    def _release(self, endpoint, ok, elapsed, chars):
+        """ok=None releases without counting a success or a failure (cancelled hedge loser)."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.trial_in_flight = False
+            if ok is None:
+                return
+            if not ok:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.state == HALF_OPEN or endpoint.consecutive_failures >= self.failure_threshold:
+                    self._open(endpoint, f"{endpoint.consecutive_failures} consecutive failure(s)")
+                return
+            endpoint.consecutive_failures = 0
+            per_char = elapsed / max(1, chars)
+            endpoint.seconds_per_char = per_char if endpoint.seconds_per_char is None else (
+                0.7 * endpoint.seconds_per_char + 0.3 * per_char)
+            if endpoint.state == HALF_OPEN:
+                endpoint.state = CLOSED
+                endpoint.open_reason = None
+                print(f"✅ TTS pool: {endpoint.label} recovered; back in rotation.")
+                return
+            peers = [e.seconds_per_char for e in self._endpoints
+                     if e is not endpoint and e.state == CLOSED and e.seconds_per_char is not None]
+            if peers and self.slow_factor and endpoint.seconds_per_char > self.slow_factor * statistics.median(peers):
+                self._open(endpoint, f"slow ({endpoint.seconds_per_char * 1000:.1f} ms/char vs peers' "
+                                     f"{statistics.median(peers) * 1000:.1f} ms/char)")
+
+    def _open(self, endpoint, reason):
+        """Ejects an endpoint unless it is the last one in rotation. Caller holds the lock."""
+        in_rotation = [e for e in self._endpoints if e.state == CLOSED and e is not endpoint]
+        if not in_rotation and endpoint.state == CLOSED and reason.startswith('slow'):
+            return # Never eject the only remaining endpoint for being slow
+        if endpoint.state != OPEN:
+            print(f"!! TTS pool: ejecting {endpoint.label} for {self.cooldown:.0f}s: {reason}")
+        endpoint.state = OPEN
+        endpoint.opened_at = time.monotonic()
+        endpoint.open_reason = reason
+        endpoint.seconds_per_char = None # Re-measure after re-admission
+
+    # --- Health probes ---
+
+    def _probe(self, endpoint):
+        provider = endpoint.provider
+        try:
+            if hasattr(provider, 'check_health'):
+                healthy, message, data = provider.check_health()
+            else:
+                healthy = provider.health_check()
+                message, data = ('healthy' if healthy else 'health check failed'), {}
+        except Exception as e:
+            healthy, message, data = False, f"health check error: {e}", {}
+        with self._lock:
+            if not healthy:
+                self._open(endpoint, f"health probe failed ({message})")
+            elif endpoint.state == OPEN and time.monotonic() - endpoint.opened_at >= self.cooldown:
+                endpoint.state = HALF_OPEN
+        return healthy, message, data
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            for endpoint in self._endpoints:
+                if endpoint.state != CLOSED or endpoint.outstanding == 0:
+                    self._probe(endpoint)
+
+    def connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """Connection reuse of every member's session, keyed by endpoint."""
+        stats = {}
+        for endpoint in self._endpoints:
+            stats.update(endpoint.provider.connection_stats())
+        return stats
+
+    def close(self):
+        """Stops the background health probes and closes every member's connections."""
+        self._stop.set()
+        for endpoint in self._endpoints:
+            endpoint.provider.close()
+        self.session.close()
+
+    def summary(self) -> str:
+        """One line per endpoint: requests, failures, state, latency and connection reuse."""
+        lines = []
+        connections = self.connection_stats()
+        with self._lock:
+            for e in self._endpoints:
+                latency = f", {e.seconds_per_char * 1000:.1f} ms/char" if e.seconds_per_char is not None else ""
+                conn = connections.get(e.label)
+                reuse = f", {conn['connections']} connection(s) for {conn['requests']} HTTP request(s)" if conn else ""
+                lines.append(f"{e.label}: {e.requests} request(s), {e.failures} failure(s), {e.state}{latency}{reuse}")
+            if self.hedge:
+                rate = 100.0 * self.hedged_requests / self.total_requests if self.total_requests else 0.0
+                lines.append(f"Hedging: {self.hedged_requests} of {self.total_requests} line(s) hedged ({rate:.1f}%), "
+                             f"{self.hedge_wins} won by the duplicate")
+        return '\n'.join(lines)
@@ -10,43 +10,11 @@ import requests
 from typing import List, Optional, Tuple, Dict, Any
 
 from .base import TTSProvider, TTSVoice, TTSGenerationResult
+from ..streaming import WavStreamDecoder, RequestCancelled, cancellable_request, read_audio_response
+from ..latency import request_timeout, record_latency, retry_delay
 
 
-# Preset speakers available in Qwen3 TTS
-QWEN3_PRESET_SPEAKERS = {
-    "Vivian": {"language": "Chinese", "gender": "Female", 
-               "description": "Bright, Sharp, Young Female"},
-    "Serena": {"language": "Chinese", "gender": "Female",
-               "description": "Warm, Soft, Young Female"},
-    "Uncle_Fu": {"language": "Chinese", "gender": "Male",
-                 "description": "Deep, Mellow, Mature Male"},
-    "Dylan": {"language": "Chinese", "gender": "Male",
-              "description": "Beijing accent, Clear, Natural Young Male"},
-    "Eric": {"language": "Chinese", "gender": "Male",
-             "description": "Sichuan accent, Lively, Husky Male"},
-    "Ryan": {"language": "English", "gender": "Male",
-             "description": "Rhythmic, Dynamic Male"},
-    "Aiden": {"language": "English", "gender": "Male",
-              "description": "Sunny, Clear American Male"},
-    "Ono_Anna": {"language": "Japanese", "gender": "Female",
-                 "description": "Light, Playful Female"},
-    "Sohee": {"language": "Korean", "gender": "Female",
-              "description": "Emotional, Warm Female"},
-}
-
-# Available models
-QWEN3_MODELS = {
-    "qwen3-tts-1.7b-base": "Base model for voice cloning",
-    "qwen3-tts-1.7b-customvoice": "Model with preset speakers",
-}
-
-# Emotion/style instructions
-QWEN3_INSTRUCTIONS = [
-    "happy", "excited", "angry", "sad", "gentle",
-    "fearful", "cold", "whisper", "surprised", "disgusted", "neutral",
-    "开心", "激动", "生气", "难过", "温柔", "恐惧", "冷酷", "低语", "惊讶", "厌恶", "平静"
-]
-
+from .voices import QWEN3_PRESET_SPEAKERS, QWEN3_INSTRUCTIONS
 
 class Qwen3Provider(TTSProvider):
     """
@@ -60,7 +28,7 @@ class Qwen3Provider(TTSProvider):
     """
     
     def __init__(self, api_host: str = "127.0.0.1", api_port: int = 8000, 
-                 model: str = "qwen3-tts-1.7b-customvoice", **kwargs):
+                 model: str = "qwen3-tts-1.7b-customvoice", server_streaming: bool = False, **kwargs):
         """
         Initialize Qwen3 TTS provider.
         
@@ -68,9 +36,12 @@ class Qwen3Provider(TTSProvider):
             api_host: Hostname of the Qwen3 TTS API
             api_port: Port of the Qwen3 TTS API (default: 8000)
             model: Model to use for synthesis
+            server_streaming: Ask the server to stream audio as it is generated
+                (sends stream=true; only for servers that support it)
         """
         super().__init__(api_host, api_port, **kwargs)
         self.model = model
+        self.server_streaming = server_streaming
         
     @property
     def name(self) -> str:
@@ -80,6 +51,10 @@ class Qwen3Provider(TTSProvider):
     def default_model(self) -> str:
         return "qwen3-tts-1.7b-customvoice"
     
+    def request_model(self, voice_id: str) -> str:
+        """Preset speakers use the configured model; cloned voices need the base model."""
+        return self.model if voice_id in QWEN3_PRESET_SPEAKERS else "qwen3-tts-1.7b-base"
+    
     def get_available_voices(self) -> List[TTSVoice]:
         """Get all preset speakers."""
         voices = []
@@ -114,7 +89,7 @@ class Qwen3Provider(TTSProvider):
             Tuple of (is_healthy, message, health_data)
         """
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=10)
+            response = self.session.get(f"{self.base_url}/health", timeout=10)
             if response.status_code != 200:
                 return False, f"Health check failed: HTTP {response.status_code}", {}
             
@@ -124,7 +99,7 @@ class Qwen3Provider(TTSProvider):
             
             # Check model status to see what's available
             try:
-                status_response = requests.get(f"{self.base_url}/v1/models/status", timeout=10)
+                status_response = self.session.get(f"{self.base_url}/v1/models/status", timeout=10)
                 if status_response.status_code == 200:
                     model_statuses = status_response.json()
                     downloaded_models = [m["model_id"] for m in model_statuses if m.get("downloaded")]
@@ -179,6 +154,8 @@ class Qwen3Provider(TTSProvider):
         max_retries: int = 3,
         timeout: int = 180,
         instructions: Optional[str] = None,
+        stream: bool = True,
+        decoder: Optional[WavStreamDecoder] = None,
         **kwargs
     ) -> Tuple[Optional[bytes], Optional[int]]:
         """
@@ -190,8 +167,11 @@ class Qwen3Provider(TTSProvider):
             speed: Speech speed (0.5 to 2.0)
             output_format: Output format (wav, mp3, ogg, opus)
             max_retries: Number of retry attempts
-            timeout: Request timeout in seconds
+            timeout: Request timeout in seconds until the latency model knows this
+                endpoint/voice/model; afterwards it is derived from the line length
             instructions: Emotion/style instruction (happy, sad, whisper, etc.)
+            stream: Read the response in chunks, decoding PCM while it downloads
+            decoder: Optional WavStreamDecoder to feed (holds the decoded samples afterwards)
             
         Returns:
             Tuple of (audio_data_bytes, sample_rate) or (None, None)
@@ -217,7 +197,7 @@ class Qwen3Provider(TTSProvider):
         
         # Use form data (multipart) as the API expects
         payload = {
-            "model": self.model if voice in QWEN3_PRESET_SPEAKERS else "qwen3-tts-1.7b-base",
+            "model": self.request_model(voice),
             "input": text,
             "voice": voice,
             "response_format": output_format.lower(),
@@ -227,34 +207,53 @@ class Qwen3Provider(TTSProvider):
         # Add optional instructions if provided
         if instructions and instructions.lower() in [i.lower() for i in QWEN3_INSTRUCTIONS]:
             payload["instructions"] = instructions
+        if stream and self.server_streaming:
+            payload["stream"] = "true"
         
         headers = {}
         
         print(f"-> Qwen3 TTS: Generating audio for '{voice}' (speed: {speed}x)")
         print(f"   Text: {text[:60]}{'...' if len(text) > 60 else ''}")
         
+        decoder = decoder or WavStreamDecoder()
+        endpoint = f"{self.api_host}:{self.api_port}"
+        timed_out = False
+        timeouts = 0
+        
         # Attempt request with retries
         for attempt in range(max_retries + 1):
             try:
                 if attempt > 0:
-                    wait_time = 2 ** attempt
+                    wait_time = retry_delay(attempt, timed_out)
                     print(f"   Retry attempt {attempt}/{max_retries} in {wait_time}s...")
-                    time.sleep(wait_time)
+                    decoder.pause(wait_time)
                 
-                response = requests.post(
-                    api_url,
-                    data=payload,
-                    headers=headers,
-                    timeout=timeout
-                )
-                response.raise_for_status()
-                
-                audio_data = response.content
+                timed_out = False
+                attempt_timeout = request_timeout(endpoint, voice, payload["model"], text, timeout, timeouts)
+                if attempt_timeout != timeout:
+                    print(f"   Timeout: {attempt_timeout:.0f}s (from recent latency on {endpoint})")
+                decoder.reset() # Drop anything a failed attempt decoded
+                started = time.monotonic()
+                with cancellable_request(decoder): # decoder.cancel() aborts the connection
+                    response = self.session.post(
+                        api_url,
+                        data=payload,
+                        headers=headers,
+                        timeout=attempt_timeout,
+                        stream=stream
+                    )
+                    response.raise_for_status()
+                    
+                    # Qwen3 outputs at 44100 Hz; the WAV header is authoritative when present
+                    audio_data, samplerate, _ = read_audio_response(
+                        response, stream=stream, decoder=decoder, default_samplerate=44100)
                 
                 if audio_data and len(audio_data) > 44:  # Valid WAV header is 44 bytes
-                    print(f"   ✅ SUCCESS: Received {len(audio_data)} bytes")
-                    # Qwen3 outputs at 44100 Hz
-                    return audio_data, 44100
+                    record_latency(endpoint, voice, payload["model"], text, time.monotonic() - started)
+                    first_sample = decoder.time_to_first_sample
+                    first_sample_note = f", first samples after {first_sample:.2f}s" if first_sample is not None else ""
+                    print(f"   ✅ SUCCESS: Received {len(audio_data)} bytes ({samplerate} Hz{first_sample_note})")
+                    return audio_data, samplerate
                 else:
                     raise requests.exceptions.RequestException(
                         f"Empty or invalid audio response ({len(audio_data)} bytes)"
@@ -262,6 +261,8 @@ class Qwen3Provider(TTSProvider):
                     
             except requests.exceptions.Timeout:
                 print(f"   ❌ Timeout on attempt {attempt + 1}")
+                timed_out = True
+                timeouts += 1
                 if attempt == max_retries:
                     return None, None
                     
@@ -270,6 +271,9 @@ class Qwen3Provider(TTSProvider):
                 if attempt == max_retries:
                     return None, None
                     
+            except RequestCancelled:
+                return None, None # Cancelled on purpose (e.g. a hedged duplicate won); not an error
+                    
             except requests.exceptions.RequestException as e:
                 error_detail = ""
                 if hasattr(e, 'response') and e.response is not None:
@@ -287,7 +291,7 @@ class Qwen3Provider(TTSProvider):
     def health_check(self) -> bool:
         """Check if Qwen3 TTS API is available."""
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=5)
+            response = self.session.get(f"{self.base_url}/health", timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 return data.get("status") == "healthy"
@@ -329,7 +333,7 @@ class Qwen3Provider(TTSProvider):
                     # This allows zero-shot voice cloning without transcript
                     data['x_vector_only'] = 'true'
                 
-                response = requests.post(api_url, data=data, files=files, timeout=60)
+                response = self.session.post(api_url, data=data, files=files, timeout=60)
                 response.raise_for_status()
                 
                 result = response.json()
@@ -341,14 +345,16 @@ class Qwen3Provider(TTSProvider):
             print(f"   ❌ Voice cloning failed: {e}")
             return None
     
-    def list_cloned_voices(self) -> List[Dict[str, Any]]:
-        """List all cloned voices."""
+    def list_cloned_voices(self, raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """List all cloned voices. With raise_errors, a failed request raises instead of returning []."""
         try:
-            response = requests.get(f"{self.base_url}/v1/voices", timeout=10)
+            response = self.session.get(f"{self.base_url}/v1/voices", timeout=10)
             response.raise_for_status()
             data = response.json()
             return data.get('voices', [])
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"   ❌ Failed to list voices: {e}")
             return []
     
@@ -0,0 +1,75 @@
+"""
+Static voice metadata for the TTS providers.
+
+Plain data only (no network client, no NumPy), so argument parsing and the GUI can list
+voices without importing or constructing a provider.
+"""
+
+# Preset speakers available in Qwen3 TTS
+QWEN3_PRESET_SPEAKERS = {
+    "Vivian": {"language": "Chinese", "gender": "Female", 
+               "description": "Bright, Sharp, Young Female"},
+    "Serena": {"language": "Chinese", "gender": "Female",
+               "description": "Warm, Soft, Young Female"},
+    "Uncle_Fu": {"language": "Chinese", "gender": "Male",
+                 "description": "Deep, Mellow, Mature Male"},
+    "Dylan": {"language": "Chinese", "gender": "Male",
+              "description": "Beijing accent, Clear, Natural Young Male"},
+    "Eric": {"language": "Chinese", "gender": "Male",
+             "description": "Sichuan accent, Lively, Husky Male"},
+    "Ryan": {"language": "English", "gender": "Male",
+             "description": "Rhythmic, Dynamic Male"},
+    "Aiden": {"language": "English", "gender": "Male",
+              "description": "Sunny, Clear American Male"},
+    "Ono_Anna": {"language": "Japanese", "gender": "Female",
+                 "description": "Light, Playful Female"},
+    "Sohee": {"language": "Korean", "gender": "Female",
+              "description": "Emotional, Warm Female"},
+}
+
+# Available models
+QWEN3_MODELS = {
+    "qwen3-tts-1.7b-base": "Base model for voice cloning",
+    "qwen3-tts-1.7b-customvoice": "Model with preset speakers",
+}
+
+# Emotion/style instructions
+QWEN3_INSTRUCTIONS = [
+    "happy", "excited", "angry", "sad", "gentle",
+    "fearful", "cold", "whisper", "surprised", "disgusted", "neutral",
+    "开心", "激动", "生气", "难过", "温柔", "恐惧", "冷酷", "低语", "惊讶", "厌恶", "平静"
+]
+
+# Orpheus voices organized by language
+ORPHEUS_VOICES = {
+    'English': ['tara', 'leah', 'jess', 'leo', 'dan', 'mia', 'zac', 'zoe'],
+    'French': ['pierre', 'amelie', 'marie'],
+    'German': ['jana', 'thomas', 'max'],
+    'Korean': ['유나', '준서'],
+    'Hindi': ['ऋतिका'],
+    'Mandarin': ['长乐', '白芷'],
+    'Spanish': ['javi', 'sergio', 'maria'],
+    'Italian': ['pietro', 'giulia', 'carlo']
+}
+
+# Voice metadata (gender mapping where known)
+ORPHEUS_VOICE_METADATA = {
+    'tara': {'gender': 'Female', 'description': 'Young female voice'},
+    'leah': {'gender': 'Female', 'description': 'Young female voice'},
+    'jess': {'gender': 'Female', 'description': 'Young female voice'},
+    'leo': {'gender': 'Male', 'description': 'Young male voice'},
+    'dan': {'gender': 'Male', 'description': 'Male voice'},
+    'mia': {'gender': 'Female', 'description': 'Female voice'},
+    'zac': {'gender': 'Male', 'description': 'Male voice'},
+    'zoe': {'gender': 'Female', 'description': 'Female voice'},
+    'pierre': {'gender': 'Male', 'description': 'French male'},
+    'amelie': {'gender': 'Female', 'description': 'French female'},
+    'marie': {'gender': 'Female', 'description': 'French female'},
+    'jana': {'gender': 'Female', 'description': 'German female'},
+    'thomas': {'gender': 'Male', 'description': 'German male'},
+    'max': {'gender': 'Male', 'description': 'German male'},
+}
+
+# Voice ids in the order the providers' get_available_voices() lists them
+QWEN3_VOICE_IDS = list(QWEN3_PRESET_SPEAKERS)
+ORPHEUS_VOICE_IDS = [voice_id for voice_list in ORPHEUS_VOICES.values() for voice_id in voice_list]
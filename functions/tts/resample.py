@@ -0,0 +1,111 @@
+"""
+Rational polyphase resampling for TTS segments.
+
+Wraps scipy.signal.resample_poly with the anti-aliasing FIR designed once per rate pair
+(it only depends on the reduced up/down factors) and adds StreamingResampler, which
+produces the same samples as the whole-signal call while being fed arbitrary blocks.
+"""
+import functools
+from math import gcd
+import numpy as np
+# scipy.signal is imported inside the functions that filter: it is slow to import and most
+# runs never resample (every segment already has the target rate)
+
+
+def rate_factors(src_rate, dst_rate):
+    """Reduced (up, down) factors that take src_rate to dst_rate."""
+    src_rate, dst_rate = int(src_rate), int(dst_rate)
+    divisor = gcd(src_rate, dst_rate)
+    return dst_rate // divisor, src_rate // divisor
+
+
+@functools.lru_cache(maxsize=32)
+def _design_filter(up, down, dtype_name):
+    """Kaiser-windowed low-pass FIR exactly as resample_poly designs it by default (not yet scaled by up)."""
+    from scipy.signal import firwin
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0))
+    taps = taps.astype(dtype_name)
+    taps.setflags(write=False)
+    return taps
+
+
+def resample_filter(src_rate, dst_rate, dtype=np.float32):
+    """Cached FIR taps for a (src_rate, dst_rate) pair. Read-only; resample_poly copies it."""
+    up, down = rate_factors(src_rate, dst_rate)
+    return _design_filter(up, down, np.dtype(dtype).name)
+
+
+def resample_audio(data, src_rate, dst_rate):
+    """
+    Resamples a whole array (samples first, any channel count) from src_rate to dst_rate.
+    Output length is ceil(len * dst / src), matching resample_poly.
+    """
+    if int(src_rate) == int(dst_rate):
+        return data
+    from scipy.signal import resample_poly
+    up, down = rate_factors(src_rate, dst_rate)
+    dtype = data.dtype if np.issubdtype(data.dtype, np.floating) else np.float64
+    return resample_poly(data, up, down, axis=0, window=resample_filter(src_rate, dst_rate, dtype))
+
+
+class StreamingResampler:
+    """
+    Block-wise polyphase resampler: feed input blocks with process(), then call flush() once.
+    The concatenated output equals resample_audio() of the concatenated input (up to
+    floating-point summation order), while only about one filter length of input is kept
+    between blocks.
+    """
+
+    def __init__(self, src_rate, dst_rate, dtype=np.float32):
+        self.up, self.down = rate_factors(src_rate, dst_rate)
+        self.passthrough = self.up == self.down
+        if self.passthrough:
+            return
+        taps = resample_filter(src_rate, dst_rate, dtype) * self.up
+        half_len = (len(taps) - 1) // 2
+        # Same centring as resample_poly: pre-pad so outputs land on the filter centre
+        pre_pad = self.down - half_len % self.down
+        self._taps = np.concatenate([np.zeros(pre_pad, dtype=taps.dtype), taps])
+        self._skip = (half_len + pre_pad) // self.down # Leading outputs that are filter delay
+        self._buffer = None
+        self._buffer_start = 0 # Absolute input index of _buffer[0]; always a multiple of `down`
+        self._next_output = self._skip # Next absolute upfirdn output index to emit
+        self._total_in = 0
+
+    def _outputs(self, last_output):
+        """Emits upfirdn outputs [_next_output, last_output) computed from the buffered input."""
+        if last_output <= self._next_output:
+            return self._buffer[:0]
+        from scipy.signal import upfirdn
+        base = self._buffer_start * self.up // self.down
+        filtered = upfirdn(self._taps, self._buffer, self.up, self.down, axis=0)
+        result = filtered[self._next_output - base:last_output - base]
+        self._next_output = last_output
+        # Drop input no later output needs, keeping the buffer start aligned to `down`
+        needed_from = max(0, -(-(self._next_output * self.down - len(self._taps) + 1) // self.up))
+        drop = (needed_from - self._buffer_start) // self.down * self.down
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._buffer_start += drop
+        return result
+
+    def process(self, block):
+        """Consumes one input block and returns every output sample that is now complete."""
+        if self.passthrough:
+            return block
+        self._buffer = block if self._buffer is None else np.concatenate([self._buffer, block])
+        self._total_in += len(block)
+        # Output m needs inputs up to floor(m * down / up)
+        last_output = (self._total_in - 1) * self.up // self.down + 1
+        return self._outputs(last_output)
+
+    def flush(self):
+        """Returns the remaining output (the filter tail past the last input sample)."""
+        if self.passthrough or self._buffer is None:
+            return np.zeros(0, dtype=np.float32)
+        n_out = -(-self._total_in * self.up // self.down)
+        tail = -(-len(self._taps) // self.up) + 1
+        self._buffer = np.concatenate([self._buffer, np.zeros((tail,) + self._buffer.shape[1:], dtype=self._buffer.dtype)])
+        return self._outputs(self._skip + n_out)
@@ -0,0 +1,209 @@
+"""
+Persistent HTTP sessions for TTS traffic.
+
+Every provider owns a requests.Session whose HTTPAdapter keeps a pool of keep-alive
+connections per endpoint, so consecutive and concurrent requests reuse TCP connections
+instead of paying a fresh connect each time. A Session is shared by all threads of a
+provider: requests only touches it for cookie handling (unused by the TTS servers), and
+urllib3's connection pools are thread-safe.
+
+connection_stats() reports, per endpoint, requests sent and TCP connects actually made
+(counted at socket level, so a server closing keep-alive connections shows up), so reuse
+can be checked under load: a healthy run shows far fewer connects than requests.
+
+abort_on_cancel(handle) lets another thread abort the requests this thread sends: the
+connection carrying them is shut down when handle.cancel() runs, also while the server
+has not answered yet (a non-streaming server sends nothing until synthesis is done).
+"""
+import socket
+import threading
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Connections kept alive per endpoint. Above this, extra concurrent requests still go
+# through (pool_block=False) but their connections are closed instead of being kept.
+DEFAULT_POOL_MAXSIZE = 32
+# Distinct endpoints (host:port) a session keeps pools for
+DEFAULT_POOL_CONNECTIONS = 8
+
+_shared_session = None
+_shared_lock = threading.Lock()
+_connect_lock = threading.Lock()
+_abort_lock = threading.Lock()
+_abort_scope = threading.local() # .handle: cancel handle of the requests this thread is sending
+
+
+class _CountingConnectMixin:
+    """Counts every socket connect on the owning pool (including reconnects of a pooled connection)."""
+
+    def connect(self):
+        super().connect()
+        pool = getattr(self, '_owner_pool', None)
+        if pool is not None:
+            with _connect_lock:
+                pool.num_tcp_connects += 1
+
+
+class _AbortableConnectionMixin:
+    """
+    Binds each request sent on this connection to the thread's abort_on_cancel handle, so
+    cancelling the handle shuts the socket down and the blocked read fails at once. The
+    binding moves with every request, so a connection handed back to the pool and reused
+    by another thread is never aborted on behalf of its previous user.
+    """
+    _abort_owner = None
+
+    def request(self, *args, **kwargs):
+        handle = getattr(_abort_scope, 'handle', None)
+        with _abort_lock:
+            self._abort_owner = handle
+        if handle is not None:
+            _abort_scope.connections.append(self)
+            handle.on_cancel(lambda: self._abort(handle))
+            if handle.cancelled:
+                raise ConnectionAbortedError("request cancelled")
+        return super().request(*args, **kwargs)
+
+    def connect(self):
+        super().connect()
+        handle = self._abort_owner
+        if handle is not None and handle.cancelled: # Cancelled before the socket existed
+            self._abort(handle)
+
+    def _abort(self, handle):
+        with _abort_lock:
+            if self._abort_owner is not handle:
+                return
+            sock = self.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _CountingHTTPConnection(_AbortableConnectionMixin, _CountingConnectMixin, HTTPConnection):
+    pass
+
+
+class _CountingHTTPSConnection(_AbortableConnectionMixin, _CountingConnectMixin, HTTPSConnection):
+    pass
+
+
+@contextmanager
+def abort_on_cancel(handle):
+    """
+    Requests sent by this thread inside the block can be aborted from another thread with
+    handle.cancel(). handle needs a `cancelled` property and on_cancel(callback), e.g.
+    streaming.WavStreamDecoder. Aborted requests fail with a connection error.
+    """
+    previous = (getattr(_abort_scope, 'handle', None), getattr(_abort_scope, 'connections', None))
+    _abort_scope.handle, _abort_scope.connections = handle, []
+    try:
+        yield
+    finally:
+        with _abort_lock:
+            for conn in _abort_scope.connections:
+                if conn._abort_owner is handle:
+                    conn._abort_owner = None
+        _abort_scope.handle, _abort_scope.connections = previous
+
+
+class _CountingPoolMixin:
+    num_tcp_connects = 0
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        conn._owner_pool = self
+        return conn
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools count TCP connects."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _CountingHTTPConnectionPool,
+                                                   'https': _CountingHTTPSConnectionPool}
+
+
+def create_session(pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_connections=DEFAULT_POOL_CONNECTIONS):
+    """
+    New requests.Session with a sized keep-alive pool for http:// and https://.
+    Transport-level retries are off: callers run their own retry/backoff loops.
+    """
+    session = requests.Session()
+    adapter = _CountingHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                   max_retries=0, pool_block=False)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    return session
+
+
+def get_shared_session():
+    """Process-wide session for code paths that have no provider (e.g. make_tts_request_with_retry)."""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
+
+
+def connection_stats(session):
+    """
+    Per-endpoint connection reuse for a session created by create_session().
+
+    Returns:
+        dict: {'host:port': {'requests': n, 'connections': n, 'reused': n}}, where
+            'connections' counts TCP connects made and 'reused' the requests that went
+            over an already-open connection.
+    """
+    stats = {}
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            label = f"{pool.host}:{pool.port}"
+            entry = stats.setdefault(label, {'requests': 0, 'connections': 0, 'reused': 0})
+            entry['requests'] += pool.num_requests
+            entry['connections'] += getattr(pool, 'num_tcp_connects', pool.num_connections)
+    for entry in stats.values():
+        entry['reused'] = max(0, entry['requests'] - entry['connections'])
+    return stats
+
+
+def format_connection_stats(stats):
+    """One line per endpoint, e.g. '127.0.0.1:8000: 40 request(s) over 4 connection(s) (90% reused)'."""
+    lines = []
+    for label, entry in sorted(stats.items()):
+        reuse = 100.0 * entry['reused'] / entry['requests'] if entry['requests'] else 0.0
+        lines.append(f"{label}: {entry['requests']} request(s) over {entry['connections']} "
+                     f"connection(s) ({reuse:.0f}% reused)")
+    return '\n'.join(lines)
+
+
+def close_shared_session():
+    """Closes the shared session's pooled connections (a new one is created on next use)."""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+            _shared_session = None
@@ -0,0 +1,282 @@
+"""
+Incremental WAV decoding for streamed TTS responses.
+
+WavStreamDecoder is fed response chunks as they arrive: it parses the RIFF header as soon
+as it is complete (so the real sample rate is known early) and converts every whole PCM
+frame to float32 immediately, so decoding overlaps the download instead of following it.
+"""
+import struct
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import requests
+
+from .sessions import abort_on_cancel
+
+STREAM_CHUNK_SIZE = 16384
+# Placeholder data sizes used by servers that write the header before the length is known
+_UNKNOWN_DATA_SIZES = (0, 0xFFFFFFFF)
+
+
+class RequestCancelled(requests.exceptions.RequestException):
+    """Raised when the request feeding a decoder was cancelled (e.g. a hedged duplicate won)."""
+
+
+class WavStreamDecoder:
+    """
+    Push-style WAV parser: call feed(chunk) for each piece of the body, then close().
+
+    Attributes set once the header is parsed: samplerate, channels, sample_width.
+    If the body is not a PCM/float WAV (e.g. mp3), `failed` is set and only the raw bytes are
+    kept, so callers can fall back to decoding the complete body.
+
+    The decoder is also the cancel handle of the request feeding it: cancel() aborts the
+    attempt in flight (see cancellable_request) and stops any further retries.
+
+    Args:
+        on_frames (callable, optional): Called as on_frames(float32_array, samplerate) for
+            each batch of decoded frames, e.g. to start playback before the line finishes.
+    """
+
+    # Cancellation state; survives reset() and adopt(): a cancelled request must not be retried
+    _CANCEL_STATE = ('_cancel_event', '_cancel_lock', '_cancel_callbacks')
+
+    def __init__(self, on_frames=None):
+        self.on_frames = on_frames
+        self._cancel_event = threading.Event()
+        self._cancel_lock = threading.Lock()
+        self._cancel_callbacks = []
+        self.reset()
+
+    def reset(self):
+        """Discards everything fed so far (e.g. before a retry of the request)."""
+        self.samplerate = None
+        self.channels = None
+        self.sample_width = None
+        self.failed = False
+        self.started_at = time.monotonic()
+        self.first_sample_at = None
+        self._raw = []
+        self._header = bytearray()
+        self._pending = b''
+        self._data_remaining = None # Bytes left in the data chunk (None = until EOF)
+        self._format_tag = None
+        self._frames = []
+        self._header_done = False
+
+    @property
+    def header_ready(self):
+        """True once the header has been parsed and PCM frames are being decoded."""
+        return self._header_done and not self.failed
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """Stops the request feeding this decoder: aborts its connection and any further attempts."""
+        with self._cancel_lock:
+            if self._cancel_event.is_set():
+                return
+            self._cancel_event.set()
+            callbacks, self._cancel_callbacks = self._cancel_callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"  Warning: Cancel callback failed: {e}")
+
+    def on_cancel(self, callback):
+        """Runs callback() when cancel() is called (right away if it already was)."""
+        with self._cancel_lock:
+            if not self._cancel_event.is_set():
+                self._cancel_callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self):
+        if self._cancel_event.is_set():
+            raise RequestCancelled("request cancelled")
+
+    def pause(self, seconds):
+        """time.sleep(seconds) for retry backoff, cut short by cancel() (raises RequestCancelled)."""
+        if self._cancel_event.wait(seconds):
+            raise RequestCancelled("request cancelled")
+
+    def adopt(self, other):
+        """Takes over another decoder's parsed header and frames (keeps this decoder's on_frames and cancel state)."""
+        kept = {key: self.__dict__[key] for key in ('on_frames',) + self._CANCEL_STATE}
+        self.__dict__.update(other.__dict__)
+        self.__dict__.update(kept)
+
+    @property
+    def time_to_first_sample(self):
+        """Seconds from decoder creation to the first decoded frame, or None."""
+        if self.first_sample_at is None:
+            return None
+        return self.first_sample_at - self.started_at
+
+    def feed(self, chunk):
+        """Consumes one chunk of the response body."""
+        if not chunk:
+            return
+        self._raw.append(chunk)
+        if self.failed:
+            return
+        if not self._header_done:
+            self._header.extend(chunk)
+            if not self._parse_header():
+                return
+            chunk = bytes(self._header)
+            self._header = bytearray()
+        self._decode(chunk)
+
+    def _parse_header(self):
+        """Walks RIFF chunks up to 'data'. Returns True once PCM data starts (leftover kept in _header)."""
+        buf = self._header
+        if len(buf) < 12:
+            return False
+        if buf[:4] != b'RIFF' or buf[8:12] != b'WAVE':
+            self.failed = True
+            return False
+        offset = 12
+        while True:
+            if len(buf) < offset + 8:
+                return False
+            chunk_id = bytes(buf[offset:offset + 4])
+            chunk_size = struct.unpack('<I', buf[offset + 4:offset + 8])[0]
+            body = offset + 8
+            if chunk_id == b'data':
+                if self.samplerate is None: # 'fmt ' must come first
+                    self.failed = True
+                    return False
+                self._data_remaining = None if chunk_size in _UNKNOWN_DATA_SIZES else chunk_size
+                del buf[:body]
+                self._header_done = True
+                return True
+            if len(buf) < body + chunk_size:
+                return False
+            if chunk_id == b'fmt ':
+                if not self._parse_fmt(bytes(buf[body:body + chunk_size])):
+                    self.failed = True
+                    return False
+            offset = body + chunk_size + (chunk_size & 1) # Chunks are word-aligned
+
+    def _parse_fmt(self, fmt):
+        if len(fmt) < 16:
+            return False
+        format_tag, channels, samplerate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if format_tag == 0xFFFE and len(fmt) >= 26: # WAVE_FORMAT_EXTENSIBLE: real tag leads the SubFormat GUID
+            format_tag = struct.unpack('<H', fmt[24:26])[0]
+        if format_tag not in (1, 3) or channels < 1 or bits not in (8, 16, 24, 32, 64):
+            return False
+        if format_tag == 3 and bits not in (32, 64):
+            return False
+        self._format_tag = format_tag
+        self.channels = channels
+        self.samplerate = samplerate
+        self.sample_width = bits // 8
+        return True
+
+    def _decode(self, data):
+        if self._data_remaining is not None:
+            data = data[:self._data_remaining]
+            self._data_remaining -= len(data)
+        data = self._pending + data
+        block = self.sample_width * self.channels
+        usable = len(data) - (len(data) % block)
+        self._pending = data[usable:]
+        if usable == 0:
+            return
+        frames = self._to_float(data[:usable])
+        if self.channels > 1:
+            frames = frames.reshape(-1, self.channels)
+        self._frames.append(frames)
+        if self.first_sample_at is None:
+            self.first_sample_at = time.monotonic()
+        if self.on_frames:
+            self.on_frames(frames, self.samplerate)
+
+    def _to_float(self, data):
+        width = self.sample_width
+        if self._format_tag == 3:
+            return np.frombuffer(data, dtype='<f4' if width == 4 else '<f8').astype(np.float32)
+        if width == 1:
+            return (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        if width == 2:
+            return np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+        if width == 3:
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+            ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+            return ints.astype(np.float32) / 8388608.0
+        return np.frombuffer(data, dtype='<i4').astype(np.float32) / 2147483648.0
+
+    def close(self):
+        """Marks the end of the body. A trailing partial frame is dropped."""
+        self._pending = b''
+
+    def body(self):
+        """The complete raw response body (for caching or fallback decoding)."""
+        return b''.join(self._raw)
+
+    def audio(self):
+        """Decoded float32 samples, shaped like soundfile output, or None if decoding failed."""
+        if not self.header_ready:
+            return None
+        if not self._frames:
+            return np.zeros((0,) if self.channels == 1 else (0, self.channels), dtype=np.float32)
+        return np.concatenate(self._frames)
+
+
+@contextmanager
+def cancellable_request(decoder):
+    """
+    Wraps one request attempt that feeds `decoder`. Raises RequestCancelled up front if the
+    decoder was already cancelled; otherwise decoder.cancel() aborts the attempt's connection
+    (also while waiting for the server's headers), and the resulting connection error is
+    raised as RequestCancelled.
+    """
+    decoder.raise_if_cancelled()
+    try:
+        with abort_on_cancel(decoder):
+            yield
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        if decoder.cancelled:
+            raise RequestCancelled("request cancelled") from e
+        raise
+
+
+def read_streamed_body(response, decoder=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Reads a `requests` response opened with stream=True chunk by chunk, feeding `decoder`
+    (a fresh WavStreamDecoder if None) as data arrives. Returns the decoder.
+    Raises RequestCancelled (after closing the response) once decoder.cancel() is called.
+    """
+    decoder = decoder or WavStreamDecoder()
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if decoder.cancelled:
+            response.close()
+            raise RequestCancelled("request cancelled")
+        decoder.feed(chunk)
+    decoder.close()
+    return decoder
+
+
+def read_audio_response(response, stream=True, decoder=None, default_samplerate=None):
+    """
+    Reads a TTS response body. With stream=True the body is consumed incrementally through
+    `decoder` (created if None). Returns (body_bytes, samplerate, decoder): the sample rate
+    comes from the WAV header, or default_samplerate if the body is not a parseable WAV.
+    """
+    decoder = decoder or WavStreamDecoder()
+    if stream:
+        read_streamed_body(response, decoder)
+    else:
+        decoder.feed(response.content)
+        decoder.close()
+    samplerate = decoder.samplerate if decoder.header_ready else default_samplerate
+    return decoder.body(), samplerate, decoder
@@ -0,0 +1,88 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Override print function to force immediate flushing for real-time output
+original_print = print
+def print(*args, **kwargs):
+    kwargs.setdefault('flush', True)
+    return original_print(*args, **kwargs)
+
+# Order stages are reported in; others follow alphabetically
+STAGE_ORDER = ('fetch', 'process', 'resample', 'synthesis', 'concatenate')
+
+
+class StageTimer:
+    """
+    Thread-safe accumulator of time spent per pipeline stage.
+
+    Stages run concurrently (several fetches and post-processing workers at once), so a
+    stage's total is busy time summed over threads and can exceed the run's wall time;
+    'synthesis' and 'concatenate' are recorded once per run and are wall-clock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self.started = time.perf_counter()
+
+    def add(self, name, seconds):
+        with self._lock:
+            entry = self._stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def snapshot(self):
+        """{'wall_seconds': s, 'stages': {name: {'calls', 'seconds', 'max_seconds'}}}"""
+        with self._lock:
+            stages = {name: dict(entry) for name, entry in self._stages.items()}
+        return {'wall_seconds': time.perf_counter() - self.started, 'stages': stages}
+
+    def summary(self):
+        """One line per stage, e.g. 'fetch: 12.40s over 40 call(s) (mean 0.31s, max 0.90s)'."""
+        stages = self.snapshot()['stages']
+        names = [n for n in STAGE_ORDER if n in stages] + sorted(n for n in stages if n not in STAGE_ORDER)
+        lines = []
+        for name in names:
+            entry = stages[name]
+            mean = entry['seconds'] / entry['calls']
+            lines.append(f"{name}: {entry['seconds']:.2f}s over {entry['calls']} call(s) "
+                         f"(mean {mean:.2f}s, max {entry['max_seconds']:.2f}s)")
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2)
+        except OSError as e:
+            print(f"  Warning: Could not write stage timings to {path}: {e}")
+
+
+# Process-wide timer fed by the api fetch/process stages and podcast_builder
+_stage_timer = StageTimer()
+
+
+def get_stage_timer():
+    return _stage_timer
+
+
+def timed_stage(name):
+    """Decorator that adds every call's duration to the process-wide timer under `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _stage_timer.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
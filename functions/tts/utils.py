@@ -4,7 +4,7 @@ import numpy as np
 import soundfile as sf
 import tempfile
 import shutil
-from scipy.signal import resample # For resampling in concatenate_wavs
+from functions.tts.resample import StreamingResampler # Polyphase resampling for mismatched segments
 
 # Override print function to force immediate flushing for real-time output
 original_print = print
@@ -74,8 +74,64 @@ def generate_silence(duration_s, samplerate, temp_dir):
         if os.path.exists(temp_path): os.remove(temp_path)
         return None
 
+CONCAT_BLOCK_FRAMES = 65536 # Frames per read/write block when streaming segments into the output
+
+
+def _downmix(data, channels):
+    """Reduces a (frames, channels) block to mono the same way for every block of a file."""
+    if channels == 2:
+        return np.mean(data, axis=1)
+    if channels != 1 and data.ndim > 1:
+        return data[:, 0]
+    return data
+
+
+def _resampled_blocks(blocks, src_rate, dst_rate):
+    """Yields polyphase-resampled blocks (same samples as resampling the whole signal)."""
+    resampler = StreamingResampler(src_rate, dst_rate)
+    for block in blocks:
+        out = resampler.process(block)
+        if len(out):
+            yield out
+    tail = resampler.flush()
+    if len(tail):
+        yield tail
+
+
+def resample_wav_file(filepath, target_samplerate):
+    """
+    Resamples a WAV file in place to target_samplerate (polyphase, streamed block by block),
+    keeping its channel count and subtype. Returns True on success.
+    """
+    try:
+        info = sf.info(filepath)
+        if info.samplerate == target_samplerate:
+            return True
+        temp_fd, temp_path = tempfile.mkstemp(suffix=".wav", prefix="resampled_", dir=os.path.dirname(os.path.abspath(filepath)))
+        os.close(temp_fd)
+        try:
+            with sf.SoundFile(temp_path, 'w', samplerate=target_samplerate, channels=info.channels, subtype=info.subtype) as out:
+                blocks = sf.blocks(filepath, blocksize=CONCAT_BLOCK_FRAMES, dtype='float32')
+                for block in _resampled_blocks(blocks, info.samplerate, target_samplerate):
+                    out.write(block)
+            os.replace(temp_path, filepath)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return True
+    except Exception as e:
+        print(f"!! Error resampling {os.path.basename(filepath)} to {target_samplerate} Hz: {e}")
+        return False
+
+
 def concatenate_wavs(file_list, output_filename, target_samplerate):
-    """Concatenates a list of WAV files into a single output file."""
+    """
+    Concatenates a list of WAV files into a single mono PCM_16 output file.
+
+    Streams into the output with sf.SoundFile block by block; segments at another samplerate
+    are downmixed and polyphase-resampled per block, so peak memory does not grow with
+    episode (or segment) length.
+    """
     if not file_list:
          print("!! Error: No segment files provided for concatenation.")
          return False
@@ -97,60 +153,66 @@ def concatenate_wavs(file_list, output_filename, target_samplerate):
              return False # Cannot proceed without a samplerate
 
     print(f"\nConcatenating {len(valid_files)} valid segments into {output_filename} (Target SR: {target_samplerate} Hz)...")
-    output_data = []
-    target_channels = 1 # Assume mono
-
-    for i, filepath in enumerate(valid_files):
-        print(f"-> Processing file {i+1}/{len(valid_files)}: {os.path.basename(filepath)}")
-        try:
-            # Check samplerate and resample if needed
-            info = sf.info(filepath)
-            data, sr = sf.read(filepath, dtype='float32')
-            
-            if info.samplerate != target_samplerate:
-                print(f"-> Resampling {os.path.basename(filepath)} from {info.samplerate} Hz to {target_samplerate} Hz...")
-                # Calculate resampling ratio
-                ratio = target_samplerate / info.samplerate
-                n_samples = int(len(data) * ratio)
-                
-                # Use scipy's resample function for high-quality resampling
-                data = resample(data, n_samples)
-                print(f"-> Resampling complete. New length: {len(data)/target_samplerate:.2f}s")
-
-            # Convert to mono if necessary
-            if info.channels == 2:
-                print(f"-> Converting {os.path.basename(filepath)} to mono.")
-                data = np.mean(data, axis=1)
-            elif info.channels != 1:
-                 print(f"!! Warning: Unexpected channel count ({info.channels}) in {os.path.basename(filepath)}. Attempting to process first channel.")
-                 # Attempt to take the first channel if more than 2? Or skip? Let's try taking first.
-                 if data.ndim > 1: data = data[:, 0]
-
-
-            output_data.append(data)
-            # Duration calculation here might be slightly off if we manipulated channels
-            # Let's calculate duration based on output samples / target_sr
-            print(f"-> Appended {os.path.basename(filepath)} ({len(data)/target_samplerate:.2f}s)")
-
-        except Exception as e:
-            print(f"!! Error reading/processing {os.path.basename(filepath)}: {e}")
-            print("!! Skipping problematic file.")
-            continue # Skip file on error
-
-    if not output_data:
-        print("!! No valid audio data to concatenate after processing.")
-        return False
-
-    print("Concatenating final audio data...")
-    final_audio = np.concatenate(output_data)
-    final_duration = len(final_audio) / target_samplerate
-    print(f"Final audio length: {final_duration:.2f}s")
+    output = None # Opened on the first successfully read block
+    frames_written = 0
+    writing = False # Distinguishes output errors (fatal) from unreadable segments (skipped)
 
     try:
-        print(f"Writing final audio to {output_filename}...")
-        sf.write(output_filename, final_audio, target_samplerate, subtype='PCM_16')
+        for i, filepath in enumerate(valid_files):
+            print(f"-> Processing file {i+1}/{len(valid_files)}: {os.path.basename(filepath)}")
+            segment_frames = 0
+            try:
+                info = sf.info(filepath)
+                if info.channels == 2:
+                    print(f"-> Converting {os.path.basename(filepath)} to mono.")
+                elif info.channels != 1:
+                    print(f"!! Warning: Unexpected channel count ({info.channels}) in {os.path.basename(filepath)}. Attempting to process first channel.")
+
+                blocks = (_downmix(block, info.channels)
+                          for block in sf.blocks(filepath, blocksize=CONCAT_BLOCK_FRAMES, dtype='float32'))
+                if info.samplerate != target_samplerate:
+                    print(f"-> Resampling {os.path.basename(filepath)} from {info.samplerate} Hz to {target_samplerate} Hz...")
+                    blocks = _resampled_blocks(blocks, info.samplerate, target_samplerate)
+
+                for block in blocks:
+                    writing = True
+                    if output is None:
+                        output = sf.SoundFile(output_filename, 'w', samplerate=target_samplerate, channels=1, subtype='PCM_16')
+                    output.write(block)
+                    writing = False
+                    segment_frames += len(block)
+
+            except Exception as e:
+                if writing:
+                    raise
+                print(f"!! Error reading/processing {os.path.basename(filepath)}: {e}")
+                print("!! Skipping problematic file.")
+                if segment_frames:
+                    print(f"!! {segment_frames/target_samplerate:.2f}s of it had already been written.")
+                frames_written += segment_frames
+                continue # Skip file on error
+
+            frames_written += segment_frames
+            print(f"-> Appended {os.path.basename(filepath)} ({segment_frames/target_samplerate:.2f}s)")
+
+        if output is None:
+            print("!! No valid audio data to concatenate after processing.")
+            return False
+
+        output.close()
+        final_duration = frames_written / target_samplerate
+        print(f"Final audio length: {final_duration:.2f}s")
         print(f"\n✅ Concatenated audio saved successfully to '{output_filename}' ({final_duration:.2f}s)")
         return True
     except Exception as e:
         print(f"!! Error writing final concatenated file '{output_filename}': {e}")
+        if output is not None:
+            try:
+                output.close()
+            except Exception:
+                pass
+            try:
+                os.remove(output_filename)
+            except OSError:
+                pass
         return False
\ No newline at end of file
@@ -0,0 +1,156 @@
+import os
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+# Override print function to force immediate flushing for real-time output
+original_print = print
+def print(*args, **kwargs):
+    kwargs.setdefault('flush', True)
+    return original_print(*args, **kwargs)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+DEFAULT_VOICE_REGISTRY_PATH = os.path.join(PROJECT_ROOT, 'outputs', 'cache', 'cloned_voices.json')
+VOICE_REGISTRY_VERSION = 1 # Bump to forget every recorded clone
+
+
+def hash_sample_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a voice sample's bytes (the path and mtime don't matter, only the content)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VoiceCloneRegistry:
+    """
+    Local record of voices already cloned on TTS servers, so a run reuses them instead of
+    uploading the same sample again.
+
+    Entries are keyed by (server endpoint, sample file hash, transcript, x_vector_only) and
+    map to the server's voice_id. The file is a small JSON document written atomically
+    (temp file + os.replace). A recorded id is only trusted after the server still lists it;
+    each endpoint's voice list is fetched at most once per registry instance.
+    """
+
+    def __init__(self, path=DEFAULT_VOICE_REGISTRY_PATH):
+        self.path = path
+        self.reused = 0
+        self.cloned = 0
+        self._lock = threading.Lock()
+        self._server_voices = {} # endpoint -> set of voice ids, or None if listing failed
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"  Warning: Ignoring unreadable voice registry {self.path}: {e}")
+            return {}
+        if data.get('version') != VOICE_REGISTRY_VERSION:
+            return {}
+        return data.get('voices', {})
+
+    def _save(self):
+        """Writes the registry atomically. Caller holds the lock."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': VOICE_REGISTRY_VERSION, 'voices': self._entries}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  Warning: Could not write voice registry {self.path}: {e}")
+            if os.path.exists(tmp_path):
+                try: os.remove(tmp_path)
+                except OSError: pass
+
+    @staticmethod
+    def make_key(endpoint, sample_hash, transcript, x_vector_only):
+        """Returns the hex key for one (server, sample, transcript, mode) combination."""
+        payload = json.dumps({
+            'endpoint': endpoint,
+            'sample': sample_hash,
+            'transcript': transcript or None,
+            'x_vector_only': bool(x_vector_only),
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def lookup(self, key):
+        """Recorded voice_id for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry.get('voice_id') if entry else None
+
+    def record(self, key, voice_id, **details):
+        """Stores voice_id under key (details such as endpoint/sample path are kept for reference)."""
+        with self._lock:
+            self._entries[key] = dict(details, voice_id=voice_id, created=time.time())
+            self._save()
+
+    def forget(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def server_has_voice(self, endpoint, voice_id, list_voices):
+        """
+        True if the server at endpoint still lists voice_id, False if it does not, and None
+        if the list could not be fetched. list_voices() returns the server's voice dicts and
+        is called once per endpoint.
+        """
+        with self._lock:
+            known = endpoint in self._server_voices
+            voices = self._server_voices.get(endpoint)
+        if not known:
+            try:
+                listed = list_voices()
+                voices = {v.get('voice_id') or v.get('id') for v in listed if isinstance(v, dict)}
+            except Exception as e:
+                print(f"  Warning: Could not list cloned voices on {endpoint}: {e}")
+                voices = None
+            with self._lock:
+                self._server_voices[endpoint] = voices
+        if voices is None:
+            return None
+        return voice_id in voices
+
+    def get_or_clone(self, endpoint, sample_path, transcript, list_voices, clone, force=False):
+        """
+        Returns a voice_id for the sample on endpoint, cloning only on a registry miss or when
+        the server no longer has the recorded voice. clone() performs the upload and returns
+        the new voice_id or None. If the server's list is unavailable, a recorded id is reused.
+        force=True always clones and replaces the recorded id.
+        """
+        x_vector_only = not transcript
+        key = self.make_key(endpoint, hash_sample_file(sample_path), transcript, x_vector_only)
+        voice_id = None if force else self.lookup(key)
+        if voice_id:
+            present = self.server_has_voice(endpoint, voice_id, list_voices)
+            if present is not False:
+                with self._lock:
+                    self.reused += 1
+                note = "" if present else " (server list unavailable; not verified)"
+                print(f"  -> Reusing cloned voice {voice_id} on {endpoint}{note}")
+                return voice_id
+            print(f"  -> {endpoint} no longer has cloned voice {voice_id}; cloning again.")
+            self.forget(key)
+        voice_id = clone()
+        if voice_id:
+            with self._lock:
+                self.cloned += 1
+                if self._server_voices.get(endpoint) is not None:
+                    self._server_voices[endpoint].add(voice_id)
+            self.record(key, voice_id, endpoint=endpoint, sample_path=os.path.abspath(sample_path),
+                        x_vector_only=x_vector_only)
+        return voice_id
+
+    def summary(self):
+        return f"{self.reused} reused, {self.cloned} cloned"
@@ -6,14 +6,32 @@ import sys
 import json
 import shutil # For copying files and rmtree
 import datetime
+import time
 
 # Import modular functions and classes
-from functions.tts.api import generate_audio_segment
-from functions.tts.utils import generate_silence, concatenate_wavs
+from functions.tts.api import generate_audio_segment, fetch_audio_segment, process_audio_segment, get_audio_enhancement
+from functions.tts.api import get_tts_provider, fetch_audio_segment_with_provider
+from functions.tts.utils import generate_silence, concatenate_wavs, resample_wav_file
 from functions.tts.args import parse_tts_arguments
-from functions.tts.gui.main_window import dev_mode_process # Import dev_mode_process
-from functions.generate_podcast_video import main as generate_video # Import video generation
-import requests
+from functions.tts.pipeline import synthesize_in_order, StopSignal
+from functions.tts.cache import configure_tts_cache
+from functions.tts.latency import configure_latency_model
+from functions.tts.processing import set_enhancement_backend
+from functions.tts.sessions import get_shared_session, connection_stats, format_connection_stats
+from functions.tts.timing import get_stage_timer
+from functions.tts.voice_registry import VoiceCloneRegistry, DEFAULT_VOICE_REGISTRY_PATH
+
+# The dev GUI (Tk, pygame, matplotlib) and the video renderer (MoviePy) are imported only
+# when --dev / video output is used, so plain synthesis runs and --help start fast
+def dev_mode_process(*args, **kwargs):
+    from functions.tts.gui.main_window import dev_mode_process as _dev_mode_process
+    return _dev_mode_process(*args, **kwargs)
+
+
+def generate_video(*args, **kwargs):
+    from functions.generate_podcast_video import main as _generate_video
+    return _generate_video(*args, **kwargs)
+
 
 def clone_voice_for_podcast(api_host, api_port, voice_sample_path, voice_sample_text=None, voice_name="Cloned Voice"):
     """
@@ -35,7 +53,7 @@ def clone_voice_for_podcast(api_host, api_port, voice_sample_path, voice_sample_
                 data['x_vector_only'] = 'true'
             
             print(f"  -> Cloning voice from {voice_sample_path}...")
-            response = requests.post(
+            response = get_shared_session().post(
                 f"{api_url}/v1/voices",
                 files=files,
                 data=data,
@@ -89,6 +107,18 @@ def main():
     temp_dir = TEMP_AUDIO_DIR
     print(f"Using temporary audio directory: {temp_dir}")
     print(f"Saving final outputs to: {OUTPUT_DIR}")
+    tts_cache = configure_tts_cache(args.tts_cache_dir, args.tts_cache_size_mb, enabled=not args.no_tts_cache)
+    latency_model = configure_latency_model(args.tts_latency_state, enabled=not args.no_adaptive_timeout)
+    if args.audio_backend == 'ffmpeg-batch':
+        # Lines are enhanced as they are synthesized, so a batch can never hold more segments
+        # than there are threads waiting on it (post-processing workers, or synthesis threads)
+        enhancing_threads, limit_flag = (args.audio_workers, '--audio-workers') if args.audio_workers else (args.tts_concurrency, '--tts-concurrency')
+        batch_size = max(1, min(args.ffmpeg_batch_size, enhancing_threads))
+        if batch_size < args.ffmpeg_batch_size:
+            print(f"-> FFmpeg batch size capped at {batch_size} by {limit_flag} {enhancing_threads}.")
+        set_enhancement_backend(args.audio_backend, batch_size=batch_size)
+    else:
+        set_enhancement_backend(args.audio_backend)
 
     all_segment_files = []
     reviewable_indices = []
@@ -97,8 +127,22 @@ def main():
     target_sr = None
     dev_mode_process_result = None # To be accessible in the wider scope
 
+    # Several servers: route script lines through a health-aware pool instead of one host/port
+    tts_pool = None
+    if args.tts_hedge and not args.tts_endpoints:
+        print("!! --tts-hedge needs at least two --tts-endpoints; hedging disabled.")
+    if args.tts_endpoints:
+        tts_pool = get_tts_provider(args.tts_provider, endpoints=args.tts_endpoints, model=args.qwen3_model,
+                                    health_interval=args.tts_health_interval, cooldown=args.tts_breaker_cooldown,
+                                    hedge=args.tts_hedge, hedge_quantile=args.tts_hedge_quantile)
+        is_healthy, message, _ = tts_pool.check_health()
+        if not is_healthy:
+            print(f"!! No TTS endpoint is healthy: {message}")
+            sys.exit(1)
+        print(f"✅ TTS pool: {message}")
+
     # Check Qwen3 API health before proceeding
-    if args.tts_provider == 'qwen3' or args.tts_provider is None:
+    if tts_pool is None and (args.tts_provider == 'qwen3' or args.tts_provider is None):
         from functions.tts.providers import Qwen3Provider
         api_port = args.qwen3_port if hasattr(args, 'qwen3_port') else (args.port if hasattr(args, 'port') else 8000)
         
@@ -131,35 +175,43 @@ def main():
     
     # Handle Voice Cloning (if voice samples are provided)
     if args.tts_provider == 'qwen3' or args.tts_provider is None:
-        # Clone Host Voice if sample provided
-        if hasattr(args, 'host_voice_sample') and args.host_voice_sample:
-            print("\n=== Cloning Host Voice ===")
-            cloned_host_id = clone_voice_for_podcast(
-                args.api_host, api_port,
-                args.host_voice_sample,
-                args.host_voice_text if hasattr(args, 'host_voice_text') else None,
-                "Host Voice"
-            )
-            if cloned_host_id:
-                args.host_voice = cloned_host_id
-                print(f"   Host voice set to cloned ID: {cloned_host_id}")
-            else:
-                print("   ⚠️  Failed to clone host voice, using preset voice instead")
-        
-        # Clone Guest Voice if sample provided
-        if hasattr(args, 'guest_voice_sample') and args.guest_voice_sample:
-            print("\n=== Cloning Guest Voice ===")
-            cloned_guest_id = clone_voice_for_podcast(
-                args.api_host, api_port,
-                args.guest_voice_sample,
-                args.guest_voice_text if hasattr(args, 'guest_voice_text') else None,
-                "Guest Voice"
-            )
-            if cloned_guest_id:
-                args.guest_voice = cloned_guest_id
-                print(f"   Guest voice set to cloned ID: {cloned_guest_id}")
+        # Cloned voice ids are per server, so with a pool every endpoint gets its own clone
+        clone_targets = tts_pool.members if tts_pool else [provider]
+        voice_registry = VoiceCloneRegistry(args.voice_registry or DEFAULT_VOICE_REGISTRY_PATH)
+        for role, sample_attr, text_attr, voice_attr in (("Host", 'host_voice_sample', 'host_voice_text', 'host_voice'),
+                                                         ("Guest", 'guest_voice_sample', 'guest_voice_text', 'guest_voice')):
+            if not getattr(args, sample_attr, None):
+                continue
+            print(f"\n=== Cloning {role} Voice ===")
+            cloned_ids = {}
+            for target in clone_targets:
+                endpoint = f"{target.api_host}:{target.api_port}"
+                upload = lambda target=target: clone_voice_for_podcast(
+                    target.api_host, target.api_port,
+                    getattr(args, sample_attr),
+                    getattr(args, text_attr, None),
+                    f"{role} Voice"
+                )
+                try:
+                    cloned_id = voice_registry.get_or_clone(
+                        endpoint, getattr(args, sample_attr), getattr(args, text_attr, None),
+                        lambda target=target: target.list_cloned_voices(raise_errors=True), upload,
+                        force=args.reclone_voices)
+                except OSError as e:
+                    print(f"  ❌ Cannot read voice sample {getattr(args, sample_attr)}: {e}")
+                    cloned_id = None
+                if cloned_id:
+                    cloned_ids[endpoint] = cloned_id
+            if cloned_ids:
+                cloned_id = next(iter(cloned_ids.values()))
+                if tts_pool:
+                    tts_pool.set_voice_alias(cloned_id, cloned_ids)
+                setattr(args, voice_attr, cloned_id)
+                print(f"   {role} voice set to cloned ID: {cloned_id}")
             else:
-                print("   ⚠️  Failed to clone guest voice, using preset voice instead")
+                print(f"   ⚠️  Failed to clone {role.lower()} voice, using preset voice instead")
+        if voice_registry.reused or voice_registry.cloned:
+            print(f"-> Cloned voices: {voice_registry.summary()}")
     
     try:
         if args.input:
@@ -251,7 +303,9 @@ def main():
             PADDING_SPEAKER_CHANGE_MS = 750
             PADDING_SAME_SPEAKER_MS = 100
 
-            first_segment_generated = False
+            # Build the ordered list of TTS requests first (incl. guest sentence breakup) so
+            # they can be synthesized concurrently and collected back in script order.
+            synthesis_jobs = []
             for idx, segment_data in enumerate(parsed_segments):
                 speaker = segment_data['speaker']
                 dialogue = segment_data['dialogue']
@@ -264,9 +318,9 @@ def main():
                         pad_ms = PADDING_SPEAKER_CHANGE_MS
                     else:
                         pad_ms = PADDING_SAME_SPEAKER_MS
-                    print(f"  Segment {idx+1} (Line {line_num}): Next speaker is '{next_speaker}'. Padding = {pad_ms}ms")
+                    progress_message = f"  Segment {idx+1} (Line {line_num}): Next speaker is '{next_speaker}'. Padding = {pad_ms}ms"
                 else:
-                    print(f"  Segment {idx+1} (Line {line_num}): Last segment. Padding = 0ms")
+                    progress_message = f"  Segment {idx+1} (Line {line_num}): Last segment. Padding = 0ms"
 
                 # Guest breakup logic - skip if single speaker mode (no guest)
                 if speaker == "guest" and args.guest_breakup and not is_single_speaker:
@@ -299,63 +353,117 @@ def main():
                         if not combined_text: continue
 
                         sub_pad_ms = PADDING_SAME_SPEAKER_MS if sub_idx < num_sub_segments - 1 else pad_ms
-
-                        voice = args.guest_voice
-                        temp_file, generated_sr = generate_audio_segment(
-                            combined_text, voice, args.speed, args.api_host, args.port, temp_dir,
-                            pad_end_ms=sub_pad_ms, max_retries=args.tts_max_retries, timeout=args.tts_timeout
-                        )
-
-                        if temp_file:
-                            if not first_segment_generated:
-                                target_sr = generated_sr
-                                print(f"--- Target sample rate set to {target_sr} Hz ---")
-                                first_segment_generated = True
-                            elif generated_sr != target_sr:
-                                print(f"!! Warning: Samplerate mismatch ({generated_sr} Hz) for sub-segment {sub_idx+1} of line {line_num}. Skipping.")
-                                if os.path.exists(temp_file): os.remove(temp_file)
-                                continue
-
-                            current_index = len(all_segment_files)
-                            all_segment_files.append(temp_file)
-                            reviewable_indices.append(current_index)
-                            text_segments_for_dev.append((combined_text, voice, sub_pad_ms))
-                        else:
-                            print(f"!! CRITICAL ERROR: Failed to generate sub-segment {sub_idx+1} for line {line_num} after all retries.")
-                            print(f"!! This will result in an incomplete podcast. Please check TTS server and try again.")
-                            print(f"!! Stopping podcast generation to avoid incomplete output.")
-                            sys.exit(1)  # Exit with error rather than creating incomplete podcast
+                        synthesis_jobs.append({
+                            'text': combined_text, 'voice': args.guest_voice, 'pad_ms': sub_pad_ms,
+                            'line_num': line_num, 'sub_idx': sub_idx, 'progress_message': progress_message
+                        })
+                        progress_message = None # Report the line once, with its first chunk
                 else:
                     # For single speaker mode, always use host voice
                     if is_single_speaker:
                         voice = args.host_voice
                     else:
                         voice = args.host_voice if speaker == "host" else args.guest_voice
-                    
-                    temp_file, generated_sr = generate_audio_segment(
-                        dialogue, voice, args.speed, args.api_host, args.port, temp_dir,
-                        pad_end_ms=pad_ms, max_retries=args.tts_max_retries, timeout=args.tts_timeout
-                    )
+                    synthesis_jobs.append({
+                        'text': dialogue, 'voice': voice, 'pad_ms': pad_ms,
+                        'line_num': line_num, 'sub_idx': None, 'progress_message': progress_message
+                    })
+
+            tts_concurrency = max(1, getattr(args, 'tts_concurrency', 1) or 1)
+            if tts_concurrency > 1:
+                print(f"Synthesizing {len(synthesis_jobs)} TTS requests with up to {tts_concurrency} in flight...")
+
+            # Aborts requests still running if generation stops early (see the sys.exit calls below)
+            stop = StopSignal()
+            audio_workers = max(0, getattr(args, 'audio_workers', 0) or 0)
+            if audio_workers:
+                # Two-stage pipeline: network fetches keep going while a worker pool enhances finished lines
+                print(f"Post-processing on {audio_workers} worker(s) while synthesis continues...")
+
+                def synthesize_job(job):
+                    with stop.track() as decoder:
+                        if tts_pool:
+                            return fetch_audio_segment_with_provider(
+                                job['text'], job['voice'], args.speed, tts_pool,
+                                max_retries=args.tts_max_retries, timeout=args.tts_timeout, decoder=decoder
+                            )
+                        return fetch_audio_segment(
+                            job['text'], job['voice'], args.speed, args.api_host, args.port,
+                            max_retries=args.tts_max_retries, timeout=args.tts_timeout, decoder=decoder
+                        )
+
+                def postprocess_job(job, fetched):
+                    audio_content, decoded = fetched
+                    if audio_content is None:
+                        return None, None
+                    voice_config = tts_pool.get_voice_config(job['voice']) if tts_pool else None
+                    return process_audio_segment(audio_content, job['voice'], temp_dir, decoded=decoded,
+                                                 voice_config=voice_config, pad_end_ms=job['pad_ms'])
+
+                segment_results = synthesize_in_order(synthesis_jobs, synthesize_job, tts_concurrency,
+                                                      postprocess=postprocess_job, postprocess_workers=audio_workers,
+                                                      stop=stop)
+            else:
+                def synthesize_job(job):
+                    if tts_pool:
+                        with stop.track() as decoder:
+                            audio_content, decoded = fetch_audio_segment_with_provider(
+                                job['text'], job['voice'], args.speed, tts_pool,
+                                max_retries=args.tts_max_retries, timeout=args.tts_timeout, decoder=decoder
+                            )
+                        if audio_content is None:
+                            return None, None
+                        return process_audio_segment(audio_content, job['voice'], temp_dir, decoded=decoded,
+                                                     voice_config=tts_pool.get_voice_config(job['voice']),
+                                                     pad_end_ms=job['pad_ms'])
+                    with stop.track() as decoder:
+                        return generate_audio_segment(
+                            job['text'], job['voice'], args.speed, args.api_host, args.port, temp_dir,
+                            pad_end_ms=job['pad_ms'], max_retries=args.tts_max_retries, timeout=args.tts_timeout,
+                            decoder=decoder
+                        )
+
+                segment_results = synthesize_in_order(synthesis_jobs, synthesize_job, tts_concurrency, stop=stop)
 
-                    if temp_file:
-                        if not first_segment_generated:
-                            target_sr = generated_sr
-                            print(f"--- Target sample rate set to {target_sr} Hz ---")
-                            first_segment_generated = True
-                        elif generated_sr != target_sr:
-                            print(f"!! Warning: Samplerate mismatch ({generated_sr} Hz) for line {line_num}. Skipping segment.")
-                            if os.path.exists(temp_file): os.remove(temp_file)
-                            continue
-
-                        current_index = len(all_segment_files)
-                        all_segment_files.append(temp_file)
-                        reviewable_indices.append(current_index)
-                        text_segments_for_dev.append((dialogue, voice, pad_ms))
+            stage_timer = get_stage_timer()
+            synthesis_started = time.perf_counter()
+            first_segment_generated = False
+            for job, (temp_file, generated_sr) in segment_results:
+                line_num = job['line_num']
+                sub_idx = job['sub_idx']
+                if job['progress_message']:
+                    print(job['progress_message'])
+
+                if temp_file:
+                    if not first_segment_generated:
+                        target_sr = generated_sr
+                        print(f"--- Target sample rate set to {target_sr} Hz ---")
+                        first_segment_generated = True
+                    elif generated_sr != target_sr:
+                        segment_label = f"sub-segment {sub_idx+1} of line {line_num}" if sub_idx is not None else f"line {line_num}"
+                        print(f"-> Samplerate mismatch ({generated_sr} Hz) for {segment_label}. Resampling to {target_sr} Hz.")
+                        with stage_timer.stage('resample'):
+                            resampled = resample_wav_file(temp_file, target_sr)
+                        if not resampled:
+                            print(f"!! CRITICAL ERROR: Could not resample {segment_label}.")
+                            print(f"!! Stopping podcast generation to avoid incomplete output.")
+                            segment_results.close()
+                            sys.exit(1)
+
+                    current_index = len(all_segment_files)
+                    all_segment_files.append(temp_file)
+                    reviewable_indices.append(current_index)
+                    text_segments_for_dev.append((job['text'], job['voice'], job['pad_ms']))
+                else:
+                    if sub_idx is not None:
+                        print(f"!! CRITICAL ERROR: Failed to generate sub-segment {sub_idx+1} for line {line_num} after all retries.")
                     else:
                         print(f"!! CRITICAL ERROR: Failed to generate segment for line {line_num} after all retries.")
-                        print(f"!! This will result in an incomplete podcast. Please check TTS server and try again.")
-                        print(f"!! Stopping podcast generation to avoid incomplete output.")
-                        sys.exit(1)  # Exit with error rather than creating incomplete podcast
+                    print(f"!! This will result in an incomplete podcast. Please check TTS server and try again.")
+                    print(f"!! Stopping podcast generation to avoid incomplete output.")
+                    segment_results.close()  # Cancel queued requests/post-processing before exiting
+                    sys.exit(1)  # Exit with error rather than creating incomplete podcast
+            stage_timer.add('synthesis', time.perf_counter() - synthesis_started)
 
             if args.dev:
                 if reviewable_indices:
@@ -375,7 +483,8 @@ def main():
                 final_audio_filename = f"{os.path.splitext(os.path.basename(args.script))[0]}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
                 final_output_path = os.path.join(FINAL_AUDIO_OUTPUT_DIR, final_audio_filename)
                 print(f"Saving concatenated audio to: {final_output_path}")
-                success = concatenate_wavs(all_segment_files, final_output_path, target_sr)
+                with get_stage_timer().stage('concatenate'):
+                    success = concatenate_wavs(all_segment_files, final_output_path, target_sr)
             else:
                 print("!! No audio segments were generated successfully for the script.")
 
@@ -400,6 +509,10 @@ def main():
                 for idx, segment in enumerate(dev_mode_process_result):
                     original_audio_path = segment.get('audio_path')
                     segment_type = segment.get('type', 'unknown')
+                    # Tell the video stage this audio already went through the TTS FFmpeg chain
+                    enhancement = get_audio_enhancement(original_audio_path)
+                    if enhancement and not segment.get('audio_enhancement'):
+                        segment['audio_enhancement'] = enhancement
                     is_temporary = original_audio_path and os.path.abspath(TEMP_AUDIO_DIR) in os.path.abspath(original_audio_path)
                     if is_temporary and os.path.exists(original_audio_path):
                         try:
@@ -437,8 +550,11 @@ def main():
                         fps=args.video_fps,
                         intermediate_preset=args.video_intermediate_preset,
                         intermediate_crf=args.video_intermediate_crf,
+                        engine=args.video_engine,
+                        single_pass=args.video_single_pass,
                         final_audio_bitrate=args.video_final_audio_bitrate,
                         workers=args.video_workers,
+                        memory_budget=args.video_memory_budget,
                         keep_temp_files=args.video_keep_temp,
                         temp_output_dir=podcast_archive_dir
                     )
@@ -466,6 +582,22 @@ def main():
         except Exception as e:
             print(f"!! Warning: Error cleaning up temporary audio directory {TEMP_AUDIO_DIR}: {e}")
 
+        if tts_cache:
+            print(f"TTS cache: {tts_cache.summary()}")
+        if tts_pool:
+            print(f"TTS pool:\n{tts_pool.summary()}")
+            tts_pool.close()
+        if latency_model:
+            latency_model.save()
+        stage_summary = get_stage_timer().summary()
+        if stage_summary:
+            print(f"Stage timings:\n{stage_summary}")
+        if args.stage_timings:
+            get_stage_timer().write_json(args.stage_timings)
+        shared_connections = connection_stats(get_shared_session())
+        if shared_connections:
+            print(f"TTS connections:\n{format_connection_stats(shared_connections)}")
+
         # Pygame mixer quit is now handled in main_window.py's on_closing or run()
         # if pygame and pygame.mixer.get_init():
         #     print("Quitting pygame mixer...")
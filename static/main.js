@@ -708,6 +708,22 @@ document.addEventListener('DOMContentLoaded', function() {
                         </div>
                     `;
                 }
+            } else if (data.type === 'video_segment_progress' && processType === 'podcast_builder') {
+                const percentage = Math.round((data.completed / data.total) * 100);
+                let etaText = '';
+                if (data.eta_seconds !== null && data.eta_seconds !== undefined && data.completed < data.total) {
+                    const etaMinutes = Math.floor(data.eta_seconds / 60);
+                    const etaSeconds = Math.round(data.eta_seconds % 60).toString().padStart(2, '0');
+                    etaText = ` - about ${etaMinutes}:${etaSeconds} remaining`;
+                }
+                if (progressMessageElement) {
+                    progressMessageElement.innerHTML = `
+                        Rendering video segment ${data.completed} of ${data.total} (${percentage}%)${etaText}
+                        <div style="width: 100%; background-color: #f0f0f0; border-radius: 5px; margin-top: 5px;">
+                            <div style="width: ${percentage}%; background-color: #28a745; height: 20px; border-radius: 5px; transition: width 0.3s ease;"></div>
+                        </div>
+                    `;
+                }
             } else if (data.type === 'processing_update' && processType === 'podcast_builder') {
                 if (progressMessageElement) progressMessageElement.textContent = data.message;
             } else if (data.type === 'gui_active' && processType === 'podcast_builder') {